@@ -1,28 +1,68 @@
 import os
 import re
+import json
 import base64
 import pytz
-import csv
 import bcrypt
+import hashlib
+import hmac
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from io import StringIO
-from flask import Response, send_from_directory
+from flask import Response, send_from_directory, send_file
 from werkzeug.utils import secure_filename
 
 # Load env vars before anything else
 load_dotenv() 
 
 from flask import Flask, render_template, request, jsonify, session, redirect
-from db_config import init_db_pool, execute_query, test_connection
+import db_config
+import metrics
+
+# Time every query; must run before any module imports the db_config helpers
+metrics.instrument_db(db_config)
+
+from db_config import init_db_pool, execute_query, test_connection, pool_stats, replica_stats, read_only
+from photo_utils import process_photo, PHOTO_VARIANTS
+from cache import ByteLRUCache, TTLCache
+from photo_store import get_photo_store, PhotoRecord
+from photo_archive import get_photo_archive
+import queries
+from pass_numbers import reserve_pass_number, insert_visitor, release_pass_number, PassNumberRejected
+from occupancy import OccupancyRegistry
+from events import EventBroker
+from mobile_index import MobileIndex
+import rollups
+import visit_analytics
+from streaming import csv_chunks, gzip_chunks
+from slow_queries import SlowQueryLog
 
 app = Flask(__name__)
+metrics.init_app(app)
 
 # [SECURE] Load Configuration
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "fallback_dev_key")
 
-# Photo configuration - now using database BLOB storage
+# Photo configuration - backend selected by PHOTO_STORE (see photo_store.py)
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+photo_store = get_photo_store()
+photo_archive = get_photo_archive()
+
+# Pillow work (decode, resize, re-encode) runs here, overlapping the visitor INSERT
+photo_executor = ThreadPoolExecutor(max_workers=int(os.getenv("PHOTO_WORKERS", 2)),
+                                    thread_name_prefix='photo')
+PHOTO_PROCESS_TIMEOUT = 15  # seconds
+
+# Let a fronting web server (nginx/Apache) send filesystem photos directly
+app.config['USE_X_SENDFILE'] = os.getenv("USE_X_SENDFILE", "0") == "1"
+
+# Photos never change after entry, so browsers may cache them for a year
+PHOTO_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+photo_cache = ByteLRUCache(int(os.getenv("PHOTO_CACHE_MAX_BYTES", 64 * 1024 * 1024)))
+
+# check_visitor results by mobile; book_visitor and entry invalidate their mobile
+lookup_cache = TTLCache(int(os.getenv("LOOKUP_CACHE_SIZE", 5000)),
+                        int(os.getenv("LOOKUP_CACHE_TTL", 60)))
 
 # NEW: Define IST Timezone
 IST = pytz.timezone('Asia/Kolkata')
@@ -53,6 +93,71 @@ def connect_to_db():
 # Initialize database on startup
 connect_to_db()
 
+# Slow or badly planned statements, with their EXPLAIN (see slow_queries.py)
+slow_query_log = SlowQueryLog(db_config.get_db_connection,
+                              threshold_ms=int(os.getenv("SLOW_QUERY_MS", 200)),
+                              capacity=int(os.getenv("SLOW_QUERY_LOG_SIZE", 200)))
+metrics.add_query_observer(slow_query_log.observe)
+
+# Visitors currently inside, served from memory (see occupancy.py)
+occupancy = OccupancyRegistry(lambda: execute_query(queries.ACTIVE_VISITORS, fetch=True))
+occupancy.reconcile()
+# One reconciler per process, started again in each forked worker on first use
+occupancy.start_reconciler(int(os.getenv("OCCUPANCY_RECONCILE_SECONDS", 60)))
+
+# Live dashboard updates over Server-Sent Events (see events.py)
+events = EventBroker(queue_size=int(os.getenv("EVENT_QUEUE_SIZE", 100)))
+
+metrics.register_gauge('gatepass_active_visitors', 'Visitors currently inside', lambda: len(occupancy))
+metrics.register_gauge('gatepass_event_clients', 'Connected live-update dashboards',
+                       lambda: events.stats()['clients'])
+metrics.register_gauge('gatepass_photo_cache_bytes', 'Bytes held by the photo cache',
+                       lambda: photo_cache.current_bytes)
+metrics.register_gauge('gatepass_photo_cache_hit_rate', 'Photo cache hit rate',
+                       lambda: photo_cache.stats()['hit_rate'])
+metrics.register_gauge('gatepass_lookup_cache_hit_rate', 'check_visitor cache hit rate',
+                       lambda: lookup_cache.stats()['hit_rate'])
+for stat, help_text in (('in_use', 'Database connections checked out'),
+                        ('idle', 'Database connections idle in the pool'),
+                        ('timeouts', 'Checkouts that gave up waiting for a connection (total)'),
+                        ('connect_errors', 'Failed attempts to open a database connection (total)'),
+                        ('ping_failures', 'Idle connections found dead by pre-ping (total)'),
+                        ('retries', 'Statements retried after a transient error (total)')):
+    metrics.register_gauge(f'gatepass_db_pool_{stat}', help_text,
+                           lambda stat=stat: pool_stats()[stat])
+# Only reported when DB_REPLICA_HOST is set (the gauge is skipped on None)
+metrics.register_gauge('gatepass_db_replica_lag_seconds', 'Replica lag at the last check',
+                       lambda: replica_stats()['lag_seconds'])
+metrics.register_gauge('gatepass_db_replica_available', 'Read-only queries go to the replica (1) or primary (0)',
+                       lambda: int(replica_stats()['available']))
+metrics.register_gauge('gatepass_db_replica_fallbacks', 'Read-only queries sent to the primary instead (total)',
+                       lambda: replica_stats()['primary_fallbacks'])
+
+# Known mobiles for /api/suggest_mobile (see mobile_index.py)
+mobile_index = MobileIndex()
+SUGGEST_MIN_PREFIX = 3
+SUGGEST_MAX_LIMIT = 20
+
+def load_mobile_index():
+    """Build the mobile prefix index from past visits and pending bookings"""
+    try:
+        rows = list(queries.iter_query(queries.MOBILE_INDEX_VISITS))
+        rows.extend(queries.iter_query(queries.MOBILE_INDEX_BOOKINGS))
+        mobile_index.load(rows)
+        print(f"📱 Mobile index loaded: {len(mobile_index)} numbers")
+    except Exception as e:
+        print(f"⚠️ Mobile index load failed: {e}")
+
+# Loaded in the background so a large visitors table doesn't delay startup
+# (and again in a forked worker that inherited an unfinished load)
+mobile_index.start_loader(load_mobile_index)
+
+def active_visitor_rows():
+    """Active visitors, most recent first - from the registry once it has loaded"""
+    if occupancy.loaded:
+        return occupancy.list()
+    return execute_query(queries.ACTIVE_VISITORS, fetch=True)
+
 def get_dept_from_email(email):
     try:
         local_part = email.split('@')[0]
@@ -61,21 +166,21 @@ def get_dept_from_email(email):
     except:
         return "STAFF"
 
-def save_photo_to_blob(image_bytes):
-    """Return photo data and MIME type for database storage"""
+def save_photo_to_blob(visitor_id, processed):
+    """Store a processed photo (see photo_utils.process_photo) and its variants in the photo store"""
     try:
-        # Determine MIME type based on image header
-        if image_bytes.startswith(b'\xff\xd8\xff'):
-            mime_type = 'image/jpeg'
-        elif image_bytes.startswith(b'\x89PNG'):
-            mime_type = 'image/png'
-        else:
-            mime_type = 'image/jpeg'  # Default
+        if not photo_store.save(visitor_id, 'full', processed['full'], 'image/jpeg',
+                                original_size=processed['original_size']):
+            return False
+        
+        for variant in ('thumb', 'medium'):
+            photo_store.save(visitor_id, variant, processed[variant], 'image/jpeg')
         
-        return image_bytes, mime_type
+        print(f"📷 Visitor {visitor_id} photo: {processed['original_size'] // 1024} KB -> {len(processed['full']) // 1024} KB")
+        return True
     except Exception as e:
         print(f"❌ Photo processing error: {e}")
-        return None, None
+        return False
 
 def format_time(time_value):
     """Convert timedelta or time to formatted string"""
@@ -193,6 +298,7 @@ def change_password():
         return jsonify({'status': 'error', 'message': 'Failed to update password.'})
 
 @app.route('/dashboard')
+@read_only()
 def dashboard():
     if 'user' not in session:
         return redirect('/')
@@ -207,16 +313,14 @@ def dashboard():
     
     elif role == 'Admin':
         # Get recent visitors (last 20)
-        visitors_raw = execute_query(
-            "SELECT * FROM visitors ORDER BY created_at DESC LIMIT 20",
-            fetch=True
-        )
+        visitors_raw = execute_query(queries.RECENT_VISITORS, fetch=True)
         
         # Format data for display
         visitors_data = []
         for row in visitors_raw or []:
             visitors_data.append({
                 'id': row['id'],
+                'pass_number': row['pass_number'] or row['id'],
                 'date': row['date'].strftime('%d-%m-%Y') if row['date'] else '',
                 'in_time': format_time(row['in_time']),
                 'mobile': row['mobile'],
@@ -226,17 +330,14 @@ def dashboard():
                 'laptop': row['laptop'] or '-',
                 'to_meet': row['to_meet'],
                 'department': row['department'],
-                'photo_url': f'/api/photo/{row["id"]}' if row.get('photo_data') else '',
+                'photo_url': f'/api/photo/{row["id"]}',
                 'out_time': format_time(row['out_time']),
                 'entered_by': row['entered_by'] or '',
                 'vehicle_number': row['vehicle_number'] or '-'
             })
         
         # Get active visitors (not exited)
-        active_raw = execute_query(
-            "SELECT * FROM visitors WHERE out_time IS NULL ORDER BY created_at DESC",
-            fetch=True
-        )
+        active_raw = active_visitor_rows()
         
         active_visitors = []
         for row in active_raw or []:
@@ -249,20 +350,14 @@ def dashboard():
                 'company': row['company'] or '',
                 'to_meet': row['to_meet'],
                 'department': row['department'],
-                'photo_url': f'/api/photo/{row["id"]}' if row.get('photo_data') else ''
+                'photo_url': f'/api/photo/{row["id"]}'
             })
         
         # Get pending bookings
-        upcoming_bookings = execute_query(
-            "SELECT * FROM bookings WHERE status = 'Pending' ORDER BY booking_time DESC",
-            fetch=True
-        )
+        upcoming_bookings = execute_query(queries.PENDING_BOOKINGS, fetch=True)
         
         # Get completed bookings
-        past_bookings = execute_query(
-            "SELECT * FROM bookings WHERE status != 'Pending' ORDER BY booking_time DESC LIMIT 50",
-            fetch=True
-        )
+        past_bookings = execute_query(queries.PAST_BOOKINGS, fetch=True)
         
         return render_template(
             'admin_dashboard.html',
@@ -283,11 +378,7 @@ def book_visitor():
     mobile = str(data.get('mobile')).strip()
     
     # Check for duplicate pending bookings
-    duplicate = execute_query(
-        "SELECT * FROM bookings WHERE visitor_mobile = %s AND status = 'Pending'",
-        (mobile,),
-        fetch=True
-    )
+    duplicate = execute_query(queries.PENDING_BOOKING_EXISTS, (mobile,), fetch=True)
     
     if duplicate:
         return jsonify({'status': 'error', 'message': 'Duplicate: Visitor has pending booking.'})
@@ -321,171 +412,305 @@ def book_visitor():
     )
     
     result = execute_query(query, params)
+    lookup_cache.invalidate(mobile)
     if result:
+        mobile_index.record(mobile, data['name'], data.get('company', '-'), params[0].replace(tzinfo=None))
+        events.publish('booking_created', booking_json({
+            'booking_time': params[0],
+            'host_name': host_name,
+            'host_department': host_dept,
+            'visitor_mobile': mobile,
+            'visitor_name': data['name'],
+            'purpose': data['purpose'],
+            'company': data.get('company', '-'),
+            'vehicle_number': data.get('vehicle', '-')
+        }))
         return jsonify({'status': 'success'})
     else:
         return jsonify({'status': 'error', 'message': 'Database error'})
 
+def booking_json(row):
+    """Pending booking as sent to the security dashboard"""
+    return {
+        'time': row['booking_time'].strftime("%Y-%m-%d %H:%M:%S") if row['booking_time'] else '',
+        'booked_by': row['host_name'],
+        'dept': row['host_department'],
+        'mobile': row['visitor_mobile'],
+        'visitor': row['visitor_name'],
+        'purpose': row['purpose'],
+        'company': row['company'] or '-',
+        'vehicle_number': row['vehicle_number'] or '-'
+    }
+
 @app.route('/api/get_today_bookings', methods=['GET'])
 def get_today_bookings():
     if session.get('role') != 'Security':
         return jsonify([])
     
-    bookings = execute_query(
-        "SELECT * FROM bookings WHERE status = 'Pending' ORDER BY booking_time DESC",
-        fetch=True
-    )
+    bookings = execute_query(queries.PENDING_BOOKINGS, fetch=True)
     
     if not bookings:
         return jsonify([])
     
-    result = []
-    for row in bookings:
-        result.append({
-            'time': row['booking_time'].strftime("%Y-%m-%d %H:%M:%S") if row['booking_time'] else '',
-            'booked_by': row['host_name'],
-            'dept': row['host_department'],
-            'mobile': row['visitor_mobile'],
-            'visitor': row['visitor_name'],
-            'purpose': row['purpose'],
-            'company': row['company'] or '-',
-            'vehicle_number': row['vehicle_number'] or '-'
-        })
-    
-    return jsonify(result)
+    return jsonify([booking_json(row) for row in bookings])
+
+FILTER_PAGE_SIZE = 100
+FILTER_MAX_PAGE_SIZE = 500
+CURSOR_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def encode_cursor(row):
+    """Opaque pagination cursor for the last row of a page"""
+    key = [row['date'].strftime(CURSOR_TIME_FORMAT), row['in_time'].strftime(CURSOR_TIME_FORMAT), row['id']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Return (date, in_time, id) from a cursor, or None if it is malformed"""
+    try:
+        date, in_time, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return date, in_time, int(row_id)
+    except Exception:
+        return None
+
+FILTER_HEADERS = ['Date', 'In Time', 'Mobile', 'Name', 'Designation', 'Company',
+                  'Laptop', 'To Meet', 'Department', 'Photo', 'Out Time', 'Entered By', 'Vehicle', 'ID', 'Pass No']
+
+def filter_record(row):
+    """Format one visitor row for filter_data and search (list format for compatibility)"""
+    return [
+        row['date'].strftime("%d-%m-%Y"),
+        format_time(row['in_time']),
+        row['mobile'],
+        row['name'],
+        row['designation'] or '',
+        row['company'] or '',
+        row['laptop'] or '-',
+        row['to_meet'],
+        row['department'],
+        'Photo in Database',
+        format_time(row['out_time']),
+        row['entered_by'] or '',
+        row['vehicle_number'] or '-',
+        row['id'],  # Add ID at index 13
+        row['pass_number'] or row['id']
+    ]
 
 @app.route('/api/admin/filter_data', methods=['POST'])
+@read_only()
 def filter_data():
+    """Visitors in a date range, newest first, one keyset page at a time"""
     if session.get('role') != 'Admin':
         return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
     
     data = request.json
     start_date = data.get('from')
     end_date = data.get('to')
+    cursor = data.get('cursor')
     
-    query = """
-        SELECT * FROM visitors 
-        WHERE date >= %s AND date <= %s 
-        ORDER BY date DESC, in_time DESC
-    """
+    try:
+        page_size = min(max(int(data.get('page_size', FILTER_PAGE_SIZE)), 1), FILTER_MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Invalid page size'}), 400
     
-    filtered_rows = execute_query(query, (start_date, end_date), fetch=True)
+    # Fetch one extra row to know whether another page exists
+    if cursor:
+        key = decode_cursor(cursor)
+        if key is None:
+            return jsonify({'status': 'error', 'message': 'Invalid cursor'}), 400
+        last_date, last_in_time, last_id = key
+        filtered_rows = execute_query(
+            queries.VISITORS_IN_RANGE_NEXT_PAGE,
+            (start_date, end_date, last_date, last_date, last_in_time, last_in_time, last_id, page_size + 1),
+            fetch=True
+        )
+    else:
+        filtered_rows = execute_query(
+            queries.VISITORS_IN_RANGE_FIRST_PAGE,
+            (start_date, end_date, page_size + 1),
+            fetch=True
+        )
     
     if filtered_rows is None:
         return jsonify({'status': 'error', 'message': 'Database error'}), 500
     
-    # Convert to list format for compatibility
-    data_list = []
-    for row in filtered_rows:
-        data_list.append([
-            row['date'].strftime("%d-%m-%Y"),
-            format_time(row['in_time']),
-            row['mobile'],
-            row['name'],
-            row['designation'] or '',
-            row['company'] or '',
-            row['laptop'] or '-',
-            row['to_meet'],
-            row['department'],
-            'Photo in Database',
-            format_time(row['out_time']),
-            row['entered_by'] or '',
-            row['vehicle_number'] or '-',
-            row['id']  # Add ID at index 13
-        ])
-    
-    headers = ['Date', 'In Time', 'Mobile', 'Name', 'Designation', 'Company', 
-               'Laptop', 'To Meet', 'Department', 'Photo', 'Out Time', 'Entered By', 'Vehicle', 'ID']
+    has_more = len(filtered_rows) > page_size
+    filtered_rows = filtered_rows[:page_size]
     
-    return jsonify({
+    response = {
         'status': 'success',
-        'headers': headers,
-        'data': data_list
-    })
+        'headers': FILTER_HEADERS,
+        'data': [filter_record(row) for row in filtered_rows],
+        'next_cursor': encode_cursor(filtered_rows[-1]) if has_more else None
+    }
+    
+    # The total costs a range scan, so it is only computed on request
+    if data.get('include_total'):
+        count = execute_query(queries.COUNT_VISITORS_IN_RANGE, (start_date, end_date), fetch=True)
+        response['total'] = count[0]['total'] if count else None
+    
+    return jsonify(response)
+
+SEARCH_MIN_TERM = int(os.getenv("SEARCH_MIN_TERM", 3))  # innodb_ft_min_token_size
+SEARCH_MAX_TERMS = 8
+# InnoDB's default full-text stopwords - a required stopword would match nothing
+SEARCH_STOPWORDS = {'about', 'are', 'com', 'for', 'from', 'how', 'that', 'the', 'this',
+                    'was', 'what', 'when', 'where', 'who', 'will', 'with', 'und', 'www'}
+
+def search_terms(text):
+    """Turn free text into a BOOLEAN MODE query: every word required, prefix-matched"""
+    words = [w for w in re.findall(r"\w+", text or '')
+             if len(w) >= SEARCH_MIN_TERM and w.lower() not in SEARCH_STOPWORDS]
+    return ' '.join(f'+{w}*' for w in words[:SEARCH_MAX_TERMS])
+
+@app.route('/api/admin/search', methods=['POST'])
+@read_only()
+def search_visitors():
+    """Ranked full-text search over visitor history, optionally within a date range"""
+    if session.get('role') != 'Admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+    
+    data = request.json
+    terms = search_terms(data.get('q'))
+    if not terms:
+        return jsonify({'status': 'error',
+                        'message': f'Enter at least one word of {SEARCH_MIN_TERM} or more characters'}), 400
+    
+    start_date = data.get('from')
+    end_date = data.get('to')
+    try:
+        page = max(int(data.get('page', 1)), 1)
+        page_size = min(max(int(data.get('page_size', FILTER_PAGE_SIZE)), 1), FILTER_MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return jsonify({'status': 'error', 'message': 'Invalid page'}), 400
+    
+    # Fetch one extra row to know whether another page exists
+    paging = (page_size + 1, (page - 1) * page_size)
+    if start_date and end_date:
+        rows = execute_query(queries.VISITOR_SEARCH_IN_RANGE,
+                             (terms, terms, start_date, end_date) + paging, fetch=True)
+    else:
+        rows = execute_query(queries.VISITOR_SEARCH, (terms, terms) + paging, fetch=True)
+    
+    if rows is None:
+        return jsonify({'status': 'error', 'message': 'Database error'}), 500
+    
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    
+    response = {
+        'status': 'success',
+        'headers': FILTER_HEADERS + ['Score'],
+        'data': [filter_record(row) + [round(float(row['score']), 3)] for row in rows],
+        'page': page,
+        'next_page': page + 1 if has_more else None
+    }
+    
+    if data.get('include_total'):
+        if start_date and end_date:
+            count = execute_query(queries.COUNT_VISITOR_SEARCH_IN_RANGE,
+                                  (terms, start_date, end_date), fetch=True)
+        else:
+            count = execute_query(queries.COUNT_VISITOR_SEARCH, (terms,), fetch=True)
+        response['total'] = count[0]['total'] if count else None
+    
+    return jsonify(response)
+
+REPORT_HEADERS = ['Date', 'In Time', 'Mobile', 'Name', 'Designation', 'Company',
+                  'Laptop', 'To Meet', 'Department', 'Photo URL', 'Out Time', 'Entered By', 'Vehicle']
+
+def report_record(row):
+    """Format one visitor row for the CSV report"""
+    return [
+        row['date'].strftime("%d-%m-%Y"),
+        format_time(row['in_time']),
+        row['mobile'],
+        row['name'],
+        row['designation'] or '',
+        row['company'] or '',
+        row['laptop'] or '-',
+        row['to_meet'],
+        row['department'],
+        'Photo in Database',
+        format_time(row['out_time']),
+        row['entered_by'] or '',
+        row['vehicle_number'] or '-'
+    ]
 
 @app.route('/api/admin/download_report', methods=['GET'])
+@read_only()
 def download_report():
+    """Stream the visitor report as CSV (gzip when the client accepts it, ?gzip=0 to disable)"""
     if session.get('role') != 'Admin':
         return "Unauthorized", 403
     
     start_date = request.args.get('from')
     end_date = request.args.get('to')
     
-    query = """
-        SELECT * FROM visitors 
-        WHERE date >= %s AND date <= %s 
-        ORDER BY date DESC, in_time DESC
-    """
+    # Rows come straight off a server-side cursor and go out in chunks
+    rows = queries.iter_query(queries.VISITORS_IN_RANGE, (start_date, end_date))
+    body = csv_chunks(REPORT_HEADERS, rows, report_record)
     
-    rows = execute_query(query, (start_date, end_date), fetch=True)
-    
-    si = StringIO()
-    cw = csv.writer(si)
-    
-    # Header row
-    cw.writerow(['Date', 'In Time', 'Mobile', 'Name', 'Designation', 'Company', 
-                 'Laptop', 'To Meet', 'Department', 'Photo URL', 'Out Time', 'Entered By', 'Vehicle'])
-    
-    # Data rows
-    for row in rows:
-        cw.writerow([
-            row['date'].strftime("%d-%m-%Y"),
-            format_time(row['in_time']),
-            row['mobile'],
-            row['name'],
-            row['designation'] or '',
-            row['company'] or '',
-            row['laptop'] or '-',
-            row['to_meet'],
-            row['department'],
-            'Photo in Database',
-            format_time(row['out_time']),
-            row['entered_by'] or '',
-            row['vehicle_number'] or '-'
-        ])
-    
-    output = si.getvalue()
-    return Response(
-        output,
-        mimetype="text/csv",
-        headers={"Content-disposition": f"attachment; filename=Visitor_Report_{start_date}_to_{end_date}.csv"}
-    )
+    headers = {"Content-disposition": f"attachment; filename=Visitor_Report_{start_date}_to_{end_date}.csv"}
+    if request.args.get('gzip', '1') != '0' and 'gzip' in request.accept_encodings:
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    
+    return Response(body, mimetype="text/csv", headers=headers)
 
 @app.route('/api/check_visitor', methods=['GET'])
 def check_visitor():
-    mobile = request.args.get('mobile')
+    """Autofill lookup by mobile: pending booking first, else the last visit"""
+    mobile = (request.args.get('mobile') or '').strip()
+    if not mobile:
+        return jsonify({'found': False})
     
-    # Check bookings first
-    booking = execute_query(
-        "SELECT * FROM bookings WHERE visitor_mobile = %s AND status = 'Pending' ORDER BY booking_time DESC LIMIT 1",
-        (mobile,),
-        fetch=True
-    )
+    result = lookup_cache.get(mobile)
+    if result is None:
+        result = lookup_visitor(mobile)
+        if result is None:
+            return jsonify({'found': False})
+        lookup_cache.put(mobile, result)
     
-    if booking:
-        row = booking[0]
-        return jsonify({
+    return jsonify(result)
+
+@app.route('/api/suggest_mobile', methods=['GET'])
+def suggest_mobile():
+    """Known visitors whose mobile starts with prefix, most recent visit first"""
+    if 'user' not in session:
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 401
+    
+    prefix = (request.args.get('prefix') or '').strip()
+    if len(prefix) < SUGGEST_MIN_PREFIX or not prefix.isdigit():
+        return jsonify({'suggestions': []})
+    
+    limit = min(max(request.args.get('limit', 8, type=int), 1), SUGGEST_MAX_LIMIT)
+    return jsonify({'suggestions': mobile_index.suggest(prefix, limit)})
+
+def lookup_visitor(mobile):
+    """Answer check_visitor with a single query; None on database error"""
+    rows = execute_query(queries.VISITOR_LOOKUP_BY_MOBILE, (mobile, mobile), fetch=True)
+    if rows is None:
+        return None
+    
+    by_source = {row['source']: row for row in rows}
+    
+    if 'booking' in by_source:
+        row = by_source['booking']
+        return {
             'found': True,
             'is_booking': True,
-            'name': row['visitor_name'],
+            'name': row['name'],
             'purpose': row['purpose'],
-            'booked_by': row['host_name'],
-            'department': row['host_department'],
+            'booked_by': row['booked_by'],
+            'department': row['department'],
             'company': row['company'] or '-',
             'vehicle': row['vehicle_number'] or '',
-            'to_meet': row['host_name']
-        })
-    
-    # Check previous visits
-    visitor = execute_query(
-        "SELECT * FROM visitors WHERE mobile = %s ORDER BY created_at DESC LIMIT 1",
-        (mobile,),
-        fetch=True
-    )
+            'to_meet': row['to_meet']
+        }
     
-    if visitor:
-        row = visitor[0]
-        return jsonify({
+    if 'visit' in by_source:
+        row = by_source['visit']
+        return {
             'found': True,
             'is_booking': False,
             'name': row['name'],
@@ -495,18 +720,36 @@ def check_visitor():
             'to_meet': row['to_meet'],
             'department': row['department'],
             'vehicle': row['vehicle_number'] or ''
-        })
+        }
     
-    return jsonify({'found': False})
+    return {'found': False}
 
 @app.route('/api/get_next_id', methods=['GET'])
 def get_next_id():
-    try:
-        result = execute_query("SELECT COUNT(*) as count FROM visitors", fetch=True)
-        next_id = result[0]['count'] + 1 if result else 1
-        return jsonify({'next_id': next_id})
-    except:
+    """Reserve the pass number to print; /api/entry consumes it as pass_number"""
+    if session.get('role') != 'Security':
         return jsonify({'next_id': '---'})
+    
+    next_id = reserve_pass_number()
+    return jsonify({'next_id': next_id if next_id else '---'})
+
+def read_entry_request():
+    """Return (fields, photo_bytes) for an entry submitted in any supported format
+
+    - multipart/form-data: visitor fields as form fields, photo as the 'photo' file
+    - image/jpeg or image/png body: the photo itself, visitor fields in the query string
+    - application/json (older clients): fields plus 'image' as a base64 data URL
+    """
+    if request.mimetype == 'multipart/form-data':
+        photo = request.files.get('photo')
+        return request.form, photo.read() if photo else b''
+    
+    if request.mimetype in ('image/jpeg', 'image/png'):
+        return request.args, request.get_data(cache=False)
+    
+    data = request.json
+    header, encoded = data['image'].split(",", 1)
+    return data, base64.b64decode(encoded)
 
 @app.route('/api/entry', methods=['POST'])
 def entry():
@@ -514,57 +757,121 @@ def entry():
         return jsonify({'error': 'Unauthorized'})
     
     try:
-        data = request.json
-        image_data = data['image']
-        header, encoded = image_data.split(",", 1)
-        image_bytes = base64.b64decode(encoded)
+        data, image_bytes = read_entry_request()
+        # One form for the row, the registry and the caches; exit looks visitors up by it
+        mobile = str(data['mobile']).strip()
         
         now = datetime.now(IST)
-        filename = f"{now.strftime('%d-%m-%Y')}_{data['mobile']}_{now.strftime('%H%M%S')}.jpg"
+        filename = f"{now.strftime('%d-%m-%Y')}_{mobile}_{now.strftime('%H%M%S')}.jpg"
         
-        # Process photo for database storage
-        photo_data, mime_type = save_photo_to_blob(image_bytes)
-        
-        if not photo_data:
+        if not image_bytes:
             return jsonify({'status': 'error', 'message': 'Photo processing failed.'})
         
+        # Normalize the photo in the background while the visitor row is written
+        photo_future = photo_executor.submit(process_photo, image_bytes)
+        
+        # Use the number already printed on the pass, or reserve one now
+        pass_number = data.get('pass_number')
+        if pass_number not in (None, '', '---'):
+            try:
+                pass_number = int(pass_number)
+            except (TypeError, ValueError):
+                photo_future.cancel()
+                return jsonify({'status': 'error', 'message': 'Invalid pass number.'})
+        else:
+            pass_number = reserve_pass_number()
+            if not pass_number:
+                photo_future.cancel()
+                return jsonify({'status': 'error', 'message': 'Could not allocate pass number.'})
+        
         # Insert visitor entry
         query = """
             INSERT INTO visitors (date, in_time, mobile, name, designation, company, laptop,
-                                 to_meet, department, photo_data, photo_mime_type, entered_by, vehicle_number)
+                                 to_meet, department, photo_mime_type, entered_by, vehicle_number, pass_number)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
         params = (
             now.date(),
             now,
-            data['mobile'],
+            mobile,
             data['name'],
             data['designation'],
             data['company'],
             data.get('laptop', '-'),
             data['to_meet'],
             data['department'],
-            photo_data,
-            mime_type,
+            'image/jpeg',
             session['user'],
-            data.get('vehicle', '-')
+            data.get('vehicle', '-'),
+            pass_number
         )
         
-        visitor_id = execute_query(query, params)
+        # Consumes the reservation with the insert: a reused or expired number writes nothing
+        try:
+            visitor_id = insert_visitor(query, params, pass_number)
+        except PassNumberRejected:
+            photo_future.cancel()
+            return jsonify({'status': 'error', 'message': 'Pass number was not reserved, has expired or is already used.'})
+        
+        if visitor_id:
+            try:
+                processed = photo_future.result(timeout=PHOTO_PROCESS_TIMEOUT)
+            except Exception as e:
+                print(f"❌ Photo processing error: {e}")
+                processed = None
+            
+            if not processed or not save_photo_to_blob(visitor_id, processed):
+                # Don't leave a visitor row behind without its photo
+                execute_query("DELETE FROM visitors WHERE id = %s", (visitor_id,))
+                release_pass_number(visitor_id)
+                lookup_cache.invalidate(mobile)
+                return jsonify({'status': 'error', 'message': 'Photo processing failed.'})
         
         if visitor_id:
             # Update booking status if exists
             execute_query(
                 "UPDATE bookings SET status = 'Arrived' WHERE visitor_mobile = %s AND status = 'Pending'",
-                (data['mobile'],)
+                (mobile,)
             )
+            # Only now: a check_visitor before the booking update commits would re-cache it as Pending
+            lookup_cache.invalidate(mobile)
+            
+            # visitors is partitioned and cannot carry the FULLTEXT index; search reads this copy
+            if not execute_query(queries.INSERT_VISITOR_SEARCH,
+                                 (visitor_id, params[0], data['name'], data['company'], data['designation'],
+                                  data['to_meet'], data['department'], data.get('vehicle', '-'))):
+                print(f"⚠️ Search index update failed for visitor {visitor_id}")
+            
+            # Stored without tzinfo, like the TIMESTAMP values read back from MySQL
+            in_time = now.replace(tzinfo=None)
+            visitor_row = {
+                'id': visitor_id,
+                'date': in_time,
+                'in_time': in_time,
+                'out_time': None,
+                'mobile': mobile,
+                'name': data['name'],
+                'designation': data['designation'],
+                'company': data['company'],
+                'laptop': data.get('laptop', '-'),
+                'to_meet': data['to_meet'],
+                'department': data['department'],
+                'entered_by': session['user'],
+                'vehicle_number': data.get('vehicle', '-'),
+                'pass_number': pass_number
+            }
+            occupancy.add(visitor_row)
+            rollups.record_entry(in_time, data['department'], data['to_meet'])
+            mobile_index.record(mobile, data['name'], data['company'], in_time)
+            events.publish('visitor_entered', active_visitor_json(visitor_row))
             
             # Create photo URL for the visitor
-            photo_url = f'/api/photo/{visitor_id}'
+            photo_url = f'/api/photo/{visitor_id}?size=medium'
             
             return jsonify({
                 'status': 'success',
-                'pass_id': visitor_id,
+                'pass_id': pass_number,
+                'visitor_id': visitor_id,
                 'date': now.strftime("%d-%m-%Y"),
                 'in_time': now.strftime("%I:%M %p"),
                 'photo': photo_url
@@ -582,20 +889,14 @@ def exit_visitor():
     mobile = str(data.get('mobile')).strip()
     
     try:
-        # Find latest entry without exit time
-        visitor = execute_query(
-            "SELECT * FROM visitors WHERE mobile = %s AND out_time IS NULL ORDER BY created_at DESC LIMIT 1",
-            (mobile,),
-            fetch=True
-        )
+        # Find latest entry without exit time (registry first, then the database
+        # in case the entry was made by another process since the last reconcile)
+        visitor = occupancy.find_by_mobile(mobile)
+        visitor = [visitor] if visitor else execute_query(queries.ACTIVE_VISIT_BY_MOBILE, (mobile,), fetch=True)
         
         if not visitor:
             # Check if already exited
-            last_visit = execute_query(
-                "SELECT * FROM visitors WHERE mobile = %s ORDER BY created_at DESC LIMIT 1",
-                (mobile,),
-                fetch=True
-            )
+            last_visit = execute_query(queries.LAST_VISIT_BY_MOBILE, (mobile,), fetch=True)
             if last_visit and last_visit[0]['out_time']:
                 return jsonify({
                     'status': 'error',
@@ -605,10 +906,23 @@ def exit_visitor():
         
         # Update exit time
         out_time = datetime.now(IST)
-        execute_query(
-            "UPDATE visitors SET out_time = %s WHERE id = %s",
-            (out_time, visitor[0]['id'])
-        )
+        if not rollups.set_out_time(visitor[0]['id'], out_time, only_if_inside=True):
+            # Exited meanwhile (another desk or worker), or the write failed
+            last_visit = execute_query(queries.LAST_VISIT_BY_MOBILE, (mobile,), fetch=True)
+            if last_visit and last_visit[0]['id'] == visitor[0]['id'] and last_visit[0]['out_time']:
+                # The registry may still list them if the exit happened in another process
+                occupancy.remove(visitor[0]['id'])
+                return jsonify({
+                    'status': 'error',
+                    'message': f"Already OUT (Time: {last_visit[0]['out_time'].strftime('%I:%M %p')})"
+                })
+            return jsonify({'status': 'error', 'message': 'Database error'})
+        occupancy.remove(visitor[0]['id'])
+        events.publish('visitor_exited', {
+            'id': visitor[0]['id'],
+            'mobile': mobile,
+            'out_time': out_time.strftime("%I:%M %p")
+        })
         
         return jsonify({
             'status': 'success',
@@ -619,6 +933,18 @@ def exit_visitor():
         print(f"Exit Error: {e}")
         return jsonify({'status': 'error', 'message': str(e)})
 
+def active_visitor_json(visitor):
+    """Active visitor as sent to the dashboards"""
+    return {
+        'id': visitor['id'],
+        'name': visitor['name'],
+        'company': visitor['company'] or '-',
+        'to_meet': visitor['to_meet'],
+        'department': visitor['department'],
+        'entry_time': format_time(visitor['in_time']),
+        'mobile': visitor['mobile']
+    }
+
 @app.route('/api/get_active_visitors', methods=['GET'])
 def get_active_visitors():
     """Get all visitors currently inside (no exit time)"""
@@ -626,31 +952,12 @@ def get_active_visitors():
         return jsonify([])
     
     try:
-        query = """
-            SELECT id, name, company, to_meet, department, in_time, mobile
-            FROM visitors
-            WHERE out_time IS NULL
-            ORDER BY in_time DESC
-        """
-        
-        active_visitors = execute_query(query, fetch=True)
+        active_visitors = active_visitor_rows()
         
         if not active_visitors:
             return jsonify([])
         
-        result = []
-        for visitor in active_visitors:
-            result.append({
-                'id': visitor['id'],
-                'name': visitor['name'],
-                'company': visitor['company'] or '-',
-                'to_meet': visitor['to_meet'],
-                'department': visitor['department'],
-                'entry_time': format_time(visitor['in_time']),
-                'mobile': visitor['mobile']
-            })
-        
-        return jsonify(result)
+        return jsonify([active_visitor_json(visitor) for visitor in active_visitors])
     
     except Exception as e:
         print(f"Get Active Visitors Error: {e}")
@@ -693,11 +1000,16 @@ def checkout_visitor():
             # Use current time
             out_time = datetime.now(IST)
         
-        # Update exit time
-        execute_query(
-            "UPDATE visitors SET out_time = %s WHERE id = %s",
-            (out_time, visitor_id)
-        )
+        # Update exit time (a visitor already out gets their time corrected)
+        result = rollups.set_out_time(int(visitor_id), out_time)
+        if not result:
+            return jsonify({'status': 'error', 'message': 'Visitor not found or database error'})
+        row = occupancy.remove(int(visitor_id))
+        events.publish('visitor_exited', {
+            'id': int(visitor_id),
+            'mobile': row['mobile'] if row else None,
+            'out_time': out_time.strftime("%I:%M %p")
+        })
         
         return jsonify({
             'status': 'success',
@@ -708,28 +1020,222 @@ def checkout_visitor():
         print(f"Checkout Error: {e}")
         return jsonify({'status': 'error', 'message': str(e)})
 
-# Photo serving route
-@app.route('/api/photo/<int:visitor_id>')
-def get_visitor_photo(visitor_id):
-    """Serve visitor photo from database"""
-    try:
+def load_legacy_photo(visitor_id, size):
+    """Read a photo still stored inline in visitors (not yet moved by migrate_photos_to_store.py)"""
+    if size == 'full':
+        photo_data = execute_query(queries.LEGACY_PHOTO, (visitor_id,), fetch=True)
+    else:
+        # Variants are always JPEG; fall back to the original for rows not yet backfilled
         photo_data = execute_query(
-            "SELECT photo_data, photo_mime_type FROM visitors WHERE id = %s AND photo_data IS NOT NULL",
+            f"""
+                SELECT COALESCE(photo_{size}, photo_data) AS photo_data,
+                       IF(photo_{size} IS NULL, photo_mime_type, 'image/jpeg') AS photo_mime_type
+                FROM visitors WHERE id = %s AND photo_data IS NOT NULL
+            """,
             (visitor_id,),
             fetch=True
         )
+    
+    if not photo_data:
+        return None
+    
+    photo_row = photo_data[0]
+    content = photo_row['photo_data']
+    return PhotoRecord(content, None, photo_row['photo_mime_type'] or 'image/jpeg',
+                       hashlib.sha256(content).hexdigest(), len(content))
+
+def load_visitor_photo(visitor_id, size):
+    """Return a PhotoRecord for a visitor photo, or None if missing
+
+    Looks in the photo store, then the cold archive, falling back from a missing
+    variant to the full photo and finally to the legacy inline columns.
+    """
+    for variant in (size, 'full') if size != 'full' else ('full',):
+        record = photo_store.load(visitor_id, variant) or photo_archive.load(visitor_id, variant)
+        if record is not None:
+            return record
+    return load_legacy_photo(visitor_id, size)
+
+@app.route('/api/events')
+def event_stream():
+    """Server-Sent Events: visitor_entered, visitor_exited, booking_created"""
+    if session.get('role') not in ['Security', 'Admin']:
+        return "Unauthorized", 403
+    
+    subscriber = events.subscribe()
+    return Response(
+        events.stream(subscriber),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Photo serving route
+@app.route('/api/photo/<int:visitor_id>')
+def get_visitor_photo(visitor_id):
+    """Serve visitor photo from the photo store (?size=thumb|medium|full, default full)"""
+    size = request.args.get('size', 'full')
+    if size not in PHOTO_VARIANTS:
+        return "Invalid size", 400
+    
+    try:
+        cache_key = (visitor_id, size)
+        photo = photo_cache.get(cache_key)
+        for attempt in range(2):
+            if photo is None:
+                photo = load_visitor_photo(visitor_id, size)
+                if photo is None:
+                    return "Photo not found", 404
+                # Filesystem photos are cached as metadata only; the file itself is sent with sendfile
+                photo_cache.put(cache_key, photo, len(photo.data) if photo.data is not None else 512)
+            
+            etag = photo.sha256[:32]
+            headers = {'ETag': f'"{etag}"', 'Cache-Control': PHOTO_CACHE_CONTROL}
+            
+            if etag in request.if_none_match:
+                return Response(status=304, headers=headers)
+            
+            if not photo.path:
+                return Response(photo.data, mimetype=photo.mime_type, headers=headers)
+            
+            try:
+                response = send_file(photo.path, mimetype=photo.mime_type, conditional=False, etag=False)
+            except FileNotFoundError:
+                # Replaced by recompaction or archiving after its path was cached; look it up again
+                photo_cache.invalidate(cache_key)
+                photo = None
+                continue
+            response.headers.update(headers)
+            return response
         
-        if not photo_data:
-            return "Photo not found", 404
-        
-        photo_row = photo_data[0]
-        return Response(
-            photo_row['photo_data'], 
-            mimetype=photo_row['photo_mime_type'] or 'image/jpeg'
-        )
+        return "Photo not found", 404
     except Exception as e:
         return "Error loading photo", 500
 
+ANALYTICS_MAX_DAYS = 3660  # ten years of daily rollups
+ANALYTICS_TOP = 10
+
+@app.route('/api/admin/analytics', methods=['GET'])
+@read_only()
+def analytics():
+    """Traffic, department/host/hour breakdowns and dwell times - read from rollups only"""
+    if session.get('role') != 'Admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+    
+    try:
+        today = datetime.now(IST).date()
+        end_day = datetime.strptime(request.args['to'], "%Y-%m-%d").date() if request.args.get('to') else today
+        start_day = (datetime.strptime(request.args['from'], "%Y-%m-%d").date() if request.args.get('from')
+                     else end_day.replace(day=1))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Dates must be YYYY-MM-DD'}), 400
+    
+    if start_day > end_day or (end_day - start_day).days > ANALYTICS_MAX_DAYS:
+        return jsonify({'status': 'error', 'message': 'Invalid date range'}), 400
+    
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in rollups.PERIOD_FORMATS:
+        return jsonify({'status': 'error', 'message': 'granularity must be day or month'}), 400
+    top = min(max(request.args.get('top', ANALYTICS_TOP, type=int), 1), 100)
+    
+    result = {
+        'traffic': rollups.traffic(start_day, end_day, granularity),
+        'departments': rollups.breakdown('department', start_day, end_day, top),
+        'hosts': rollups.breakdown('host', start_day, end_day, top),
+        'hours': rollups.breakdown('hour', start_day, end_day)
+    }
+    if any(value is None for value in result.values()):
+        return jsonify({'status': 'error', 'message': 'Database error'}), 500
+    
+    totals = rollups.breakdown('total', start_day, end_day)
+    result.update({
+        'status': 'success',
+        'from': start_day.isoformat(),
+        'to': end_day.isoformat(),
+        'granularity': granularity,
+        'summary': rollups.summary(totals[0] if totals else {'visits': 0, 'exits': 0, 'dwell_seconds': 0})
+    })
+    return jsonify(result)
+
+@app.route('/api/admin/analytics/visits', methods=['GET'])
+@read_only()
+def visit_reports():
+    """Dwell distribution, hour x weekday heatmap and department overstays (see visit_analytics.py)"""
+    if session.get('role') != 'Admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+    
+    try:
+        start_day = datetime.strptime(request.args['from'], "%Y-%m-%d").date()
+        end_day = datetime.strptime(request.args['to'], "%Y-%m-%d").date()
+    except (KeyError, ValueError):
+        return jsonify({'status': 'error', 'message': 'from and to are required (YYYY-MM-DD)'}), 400
+    if start_day > end_day:
+        return jsonify({'status': 'error', 'message': 'Invalid date range'}), 400
+    
+    overstay_minutes = request.args.get('overstay_minutes', type=int)
+    percentile = min(max(request.args.get('percentile', 95, type=int), 50), 99)
+    
+    try:
+        frame = visit_analytics.build_frame(queries.iter_query(queries.VISIT_FRAME, (start_day, end_day)))
+    except Exception as e:
+        print(f"❌ Visit analytics error: {e}")
+        return jsonify({'status': 'error', 'message': 'Database error'}), 500
+    
+    now_s = visit_analytics.wall_clock_seconds(datetime.now(IST).replace(tzinfo=None))
+    return jsonify({
+        'status': 'success',
+        'from': start_day.isoformat(),
+        'to': end_day.isoformat(),
+        'visits': len(frame),
+        'dwell': visit_analytics.dwell_distribution(frame),
+        'heatmap': visit_analytics.hour_weekday_heatmap(frame),
+        'overstays': visit_analytics.department_overstays(frame, now_s, overstay_minutes, percentile)
+    })
+
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; unset = Admin sessions only.
+# Not keyed on the client address: behind a reverse proxy every client is 127.0.0.1.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+def metrics_token_ok():
+    header = request.headers.get('Authorization', '')
+    if not METRICS_TOKEN or not header.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(header[len('Bearer '):].encode(), METRICS_TOKEN.encode())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint - Admin session or a scraper with METRICS_TOKEN"""
+    if session.get('role') != 'Admin' and not metrics_token_ok():
+        return "Forbidden", 403
+    
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/admin/slow_queries', methods=['GET'])
+def slow_queries():
+    """Recent slow statements and first-seen bad plans, newest first"""
+    if session.get('role') != 'Admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+    
+    return jsonify({
+        'status': 'success',
+        'stats': slow_query_log.stats(),
+        'entries': slow_query_log.entries()
+    })
+
+@app.route('/api/admin/cache_stats', methods=['GET'])
+@app.route('/api/admin/photo_cache_stats', methods=['GET'])
+def cache_stats():
+    if session.get('role') != 'Admin':
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+    
+    return jsonify({
+        'status': 'success',
+        'photo_cache': photo_cache.stats(),
+        'lookup_cache': lookup_cache.stats(),
+        'mobile_index': mobile_index.stats(),
+        'db_pool': pool_stats(),
+        'db_replica': replica_stats()
+    })
+
 if __name__ == '__main__':
     # Test database connection on startup
     if test_connection():
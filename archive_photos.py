@@ -0,0 +1,195 @@
+"""
+Move visitor photos older than PHOTO_ARCHIVE_AFTER_DAYS into the cold archive
+Works a whole month of entries at a time, oldest first, for months that ended
+before the cutoff. Each month's photos are streamed into a new ZIP file under
+PHOTO_ARCHIVE_PATH (written as .tmp, verified, then renamed); only then are
+their visitor_photos rows marked archived and their bytes cleared, batch by
+batch. Archived photos keep being served by /api/photo (see photo_archive.py).
+
+Safe to re-run: months with nothing left to archive are skipped, and a month
+interrupted before its rows were marked is archived again into a new file
+(the earlier file is then unreferenced and can be deleted).
+"""
+
+import os
+import time
+import zipfile
+import argparse
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db_config import execute_query, get_db_connection
+from queries import iter_query
+from photo_store import get_photo_store, FilesystemPhotoStore, PendingRemovals
+from photo_archive import get_photo_archive, member_name
+import partitions
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("PHOTO_ARCHIVE_AFTER_DAYS", 365))
+
+# Params: month start, next month start - reads one visitors partition
+MONTH_PHOTOS = """
+    SELECT p.visitor_id, p.variant, p.mime_type, p.sha256, p.data
+    FROM visitors v
+    JOIN visitor_photos p ON p.visitor_id = v.id
+    WHERE v.date >= %s AND v.date < %s AND p.archived_in IS NULL
+    ORDER BY p.visitor_id, p.variant
+"""
+
+COUNT_MONTH_PHOTOS = """
+    SELECT COUNT(*) AS photos, COALESCE(SUM(p.byte_size), 0) AS bytes
+    FROM visitors v
+    JOIN visitor_photos p ON p.visitor_id = v.id
+    WHERE v.date >= %s AND v.date < %s AND p.archived_in IS NULL
+"""
+
+# Skips a photo replaced since it was read (its sha256 no longer matches)
+MARK_ARCHIVED = """
+    UPDATE visitor_photos SET data = NULL, archived_in = %s
+    WHERE visitor_id = %s AND variant = %s AND sha256 = %s AND archived_in IS NULL
+"""
+
+
+def photo_bytes(store, row):
+    if row['data'] is not None:
+        return row['data']
+    if isinstance(store, FilesystemPhotoStore):
+        path = store.path_for(row['sha256'], row['mime_type'])
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return f.read()
+    return None
+
+
+def write_archive(archive, store, month):
+    """Stream a month's photos into a new archive file
+
+    Returns (file name, [(visitor_id, variant, sha256, mime_type)], bytes);
+    the name is None when there was nothing to archive.
+    """
+    name = f"visitor_photos_{month:%Y_%m}_{datetime.now():%Y%m%d%H%M%S}.zip"
+    path = archive.path_for(name)
+    tmp_path = path + '.tmp'
+    os.makedirs(archive.root, exist_ok=True)
+
+    photos, stored_bytes = [], 0
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for row in iter_query(MONTH_PHOTOS, (month, partitions.add_months(month, 1))):
+            data = photo_bytes(store, row)
+            if data is None:
+                print(f"⚠️ Visitor {row['visitor_id']} ({row['variant']}): photo bytes missing, skipped")
+                continue
+            zf.writestr(member_name(row['visitor_id'], row['variant'], row['mime_type']), data)
+            photos.append((row['visitor_id'], row['variant'], row['sha256'], row['mime_type']))
+            stored_bytes += len(data)
+
+    if not photos:
+        os.unlink(tmp_path)
+        return None, [], 0
+
+    # Read every entry back (CRC check) before any row points at the file
+    with zipfile.ZipFile(tmp_path) as zf:
+        bad_entry = zf.testzip()
+    if bad_entry:
+        os.unlink(tmp_path)
+        raise RuntimeError(f"Archive verification failed at {bad_entry}")
+    os.replace(tmp_path, path)
+    return name, photos, stored_bytes
+
+
+def mark_archived(name, photos, store, removals, batch_size, pause):
+    """Point the rows at the archive file and clear their bytes, batch by batch"""
+    marked = 0
+    for start in range(0, len(photos), batch_size):
+        batch = photos[start:start + batch_size]
+        connection = get_db_connection()
+        if not connection:
+            raise RuntimeError("No database connection")
+        cursor = connection.cursor()
+        try:
+            cursor.executemany(MARK_ARCHIVED, [(name, visitor_id, variant, sha256)
+                                               for visitor_id, variant, sha256, _ in batch])
+            marked += cursor.rowcount
+            connection.commit()
+        finally:
+            cursor.close()
+            connection.close()
+
+        if isinstance(store, FilesystemPhotoStore):
+            # The app may still hold the old path; delete after the grace period
+            for _, _, sha256, mime_type in batch:
+                removals.add(sha256, mime_type)
+            removals.remove_due()
+
+        # Give the live gate room between batches
+        if pause:
+            time.sleep(pause)
+    return marked
+
+
+def first_month():
+    rows = execute_query("SELECT MIN(date) AS first FROM visitors", fetch=True)
+    if not rows or rows[0]['first'] is None:
+        return None
+    return rows[0]['first'].date().replace(day=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old visitor photos into the cold archive")
+    parser.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS,
+                        help=f"Archive months that ended this many days ago (default: {ARCHIVE_AFTER_DAYS})")
+    parser.add_argument('--batch-size', type=int, default=500, help="Rows marked per batch (default: 500)")
+    parser.add_argument('--pause', type=float, default=0.2, help="Seconds to sleep between batches (default: 0.2)")
+    parser.add_argument('--dry-run', action='store_true', help="Only count the photos each month would move")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🧊 PHOTO ARCHIVE{' (DRY RUN)' if args.dry_run else ''}")
+    print("=" * 60)
+
+    cutoff = date.today() - timedelta(days=args.older_than_days)
+    # Last month that ended on or before the cutoff
+    last_month = partitions.add_months(cutoff.replace(day=1), -1)
+    start = first_month()
+    store = get_photo_store()
+    archive = get_photo_archive()
+
+    started = time.perf_counter()
+    files, moved, moved_bytes = 0, 0, 0
+    removals = PendingRemovals(store)
+    try:
+        for month in partitions.months_between(start, last_month) if start else []:
+            if args.dry_run:
+                counts = execute_query(COUNT_MONTH_PHOTOS, (month, partitions.add_months(month, 1)), fetch=True)
+                if counts and counts[0]['photos']:
+                    print(f"   {month:%Y-%m}: {counts[0]['photos']} photos, "
+                          f"{int(counts[0]['bytes']) / 1024 / 1024:.1f} MB")
+                    moved += counts[0]['photos']
+                    moved_bytes += int(counts[0]['bytes'])
+                continue
+
+            name, photos, stored_bytes = write_archive(archive, store, month)
+            if name is None:
+                continue
+            marked = mark_archived(name, photos, store, removals, args.batch_size, args.pause)
+            files += 1
+            moved += marked
+            moved_bytes += stored_bytes
+            print(f"✅ {month:%Y-%m}: {marked} photos ({stored_bytes / 1024 / 1024:.1f} MB) -> {name}")
+    finally:
+        removals.flush()
+
+    print(f"\n📊 Archive Summary:")
+    print(f"   Cutoff: entries before {partitions.add_months(last_month, 1):%Y-%m-%d}")
+    if not args.dry_run:
+        print(f"   Archive files written: {files}")
+    print(f"   Photos {'to move' if args.dry_run else 'moved'}: {moved}")
+    print(f"   Data: {moved_bytes / 1024 / 1024:.1f} MB")
+    print(f"   Time: {time.perf_counter() - started:.1f}s")
+    if moved and not args.dry_run and not isinstance(store, FilesystemPhotoStore):
+        print("💡 Run 'OPTIMIZE TABLE visitor_photos;' off-hours to reclaim the freed space")
+
+
+if __name__ == "__main__":
+    main()
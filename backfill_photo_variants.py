@@ -0,0 +1,91 @@
+"""
+Backfill thumbnail and medium photo variants for existing visitors
+Run this once after migrate_photos_to_store.py. Archived photos are skipped;
+their bytes have left the store.
+"""
+
+import time
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db_config import execute_query
+from photo_store import get_photo_store
+from photo_utils import make_photo_variants
+
+
+def backfill(batch_size, pause):
+    """Generate missing variants in visitor id order, one batch at a time"""
+    store = get_photo_store()
+    last_id = 0
+    updated = 0
+    skipped = 0
+    failed = 0
+
+    while True:
+        rows = execute_query(
+            """
+                SELECT p.visitor_id, p.archived_in FROM visitor_photos p
+                LEFT JOIN visitor_photos t ON t.visitor_id = p.visitor_id AND t.variant = 'thumb'
+                LEFT JOIN visitor_photos m ON m.visitor_id = p.visitor_id AND m.variant = 'medium'
+                WHERE p.variant = 'full' AND p.visitor_id > %s
+                  AND (t.visitor_id IS NULL OR m.visitor_id IS NULL)
+                ORDER BY p.visitor_id LIMIT %s
+            """,
+            (last_id, batch_size),
+            fetch=True
+        )
+        if not rows:
+            break
+
+        for row in rows:
+            last_id = row['visitor_id']
+            if row['archived_in'] is not None:
+                skipped += 1
+                continue
+            try:
+                photo_bytes, _ = store.load_bytes(last_id, 'full')
+                if photo_bytes is None:
+                    # Archived since the batch was read
+                    skipped += 1
+                    continue
+                variants = make_photo_variants(photo_bytes)
+            except Exception as e:
+                print(f"⚠️  Visitor {last_id}: {e}")
+                failed += 1
+                continue
+
+            for variant, variant_bytes in variants.items():
+                store.save(last_id, variant, variant_bytes, 'image/jpeg')
+            updated += 1
+
+        print(f"✅ Processed up to visitor {last_id} ({updated} updated, {skipped} skipped, {failed} failed)")
+
+        # Give the live gate room between batches
+        if pause:
+            time.sleep(pause)
+
+    return updated, skipped, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill photo size variants")
+    parser.add_argument('--batch-size', type=int, default=100, help="Rows per batch (default: 100)")
+    parser.add_argument('--pause', type=float, default=0.5, help="Seconds to sleep between batches (default: 0.5)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🖼️  PHOTO VARIANT BACKFILL")
+    print("=" * 60)
+
+    updated, skipped, failed = backfill(args.batch_size, args.pause)
+
+    print(f"\n📊 Backfill Summary:")
+    print(f"   Updated: {updated}")
+    print(f"   Skipped (archived): {skipped}")
+    print(f"   Failed: {failed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Latency benchmark for the vectorized visit analytics (visit_analytics.py)
+Builds a frame from synthetic rows shaped like queries.VISIT_FRAME, times each
+report, and compares the dwell distribution and heatmap with equivalent
+per-row Python loops. The reports must finish within --target-ms (default
+500 ms for 1M rows); the exit code is 1 if they do not.
+
+Usage:
+    python benchmarks/bench_analytics.py                  # 1M rows
+    python benchmarks/bench_analytics.py --rows 200000 --skip-loops
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import visit_analytics
+from visit_analytics import build_frame, wall_clock_seconds
+
+DEPARTMENTS = ['CSE', 'IT', 'ECE', 'EEE', 'MECH', 'CIVIL', 'AIDS', 'AIML', 'Science and Humanities', 'ADMIN']
+START = datetime(2023, 6, 1)
+
+
+def synthetic_rows(count, inside=200):
+    """Rows over three years of gate traffic; the last `inside` visitors have not exited"""
+    rng = np.random.default_rng(42)
+    day = rng.integers(0, 3 * 365, count)
+    hour = np.clip(rng.normal(12, 2.5, count), 7, 20)
+    in_s = wall_clock_seconds(START) + day * 86400 + (hour * 3600).astype(np.int64)
+    dwell = rng.lognormal(4, 0.7, count) * 60  # median ~55 minutes
+    out_s = in_s + dwell.astype(np.int64)
+    depts = rng.integers(0, len(DEPARTMENTS), count)
+    hosts = rng.integers(0, 300, count)
+    for i in range(count):
+        yield {
+            'id': i + 1,
+            'in_s': int(in_s[i]),
+            'out_s': None if i >= count - inside else int(out_s[i]),
+            'department': DEPARTMENTS[depts[i]],
+            'to_meet': f"Dr. Host {hosts[i]}",
+        }
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+# --- Per-row equivalents, for comparison ---
+
+def loop_dwell_distribution(rows):
+    minutes = sorted(max(r['out_s'] - r['in_s'], 0) / 60 for r in rows if r['out_s'] is not None)
+    edges = visit_analytics.DWELL_BINS_MINUTES
+    counts = [0] * len(edges)
+    for m in minutes:
+        for b in range(len(edges) - 1, -1, -1):
+            if m >= edges[b]:
+                counts[b] += 1
+                break
+    return counts, minutes[int(len(minutes) * 0.95)]
+
+
+def loop_heatmap(rows):
+    counts = [[0] * 24 for _ in range(7)]
+    for r in rows:
+        moment = visit_analytics.EPOCH + timedelta(seconds=r['in_s'])
+        counts[moment.weekday()][moment.hour] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Visit analytics latency benchmark")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--target-ms', type=float, default=500, help="Budget for all reports (default: 500)")
+    parser.add_argument('--skip-loops', action='store_true', help="Don't time the per-row Python versions")
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.rows))
+    frame, build_ms = timed(build_frame, rows)
+    now_s = int(frame.in_s.max()) + 3600
+
+    dwell, dwell_ms = timed(visit_analytics.dwell_distribution, frame)
+    heatmap, heatmap_ms = timed(visit_analytics.hour_weekday_heatmap, frame)
+    overstays, overstay_ms = timed(visit_analytics.department_overstays, frame, now_s)
+    reports_ms = dwell_ms + heatmap_ms + overstay_ms
+
+    print(f"Rows: {len(frame)}")
+    print(f"{'Step':<28} {'Time (ms)':>10}")
+    print(f"{'build_frame (from rows)':<28} {build_ms:>10.1f}")
+    print(f"{'dwell_distribution':<28} {dwell_ms:>10.1f}")
+    print(f"{'hour_weekday_heatmap':<28} {heatmap_ms:>10.1f}")
+    print(f"{'department_overstays':<28} {overstay_ms:>10.1f}")
+    print(f"{'reports total':<28} {reports_ms:>10.1f}")
+
+    if not args.skip_loops:
+        (_, loop_p95), loop_dwell_ms = timed(loop_dwell_distribution, rows)
+        loop_counts, loop_heatmap_ms = timed(loop_heatmap, rows)
+        assert loop_counts == heatmap['counts'], "heatmap mismatch"
+        print(f"{'loop dwell_distribution':<28} {loop_dwell_ms:>10.1f}")
+        print(f"{'loop hour_weekday_heatmap':<28} {loop_heatmap_ms:>10.1f}")
+        print(f"p95 dwell: vectorized {dwell['p95_minutes']} min, loop {loop_p95:.1f} min")
+
+    print(f"Top overstay department: {overstays[0]['department']} ({overstays[0]['overstays']} visits)")
+    ok = reports_ms <= args.target_ms
+    print(f"{'✅' if ok else '❌'} Reports {reports_ms:.0f} ms (target {args.target_ms:.0f} ms)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
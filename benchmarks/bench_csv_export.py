@@ -0,0 +1,130 @@
+"""
+Peak-memory benchmark for the CSV visitor report
+Compares the streaming export (server-side cursor + chunked CSV) with the old
+approach (fetch every row, build the whole CSV in a StringIO) on synthetic rows.
+
+Usage:
+    python benchmarks/bench_csv_export.py                 # 10k, 100k, 1M rows
+    python benchmarks/bench_csv_export.py --rows 50000 --gzip
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import resource
+import subprocess
+from io import StringIO
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from streaming import csv_chunks, gzip_chunks
+
+HEADERS = ['Date', 'In Time', 'Mobile', 'Name', 'Designation', 'Company',
+           'Laptop', 'To Meet', 'Department', 'Photo URL', 'Out Time', 'Entered By', 'Vehicle']
+DEPARTMENTS = ['CSE', 'IT', 'ECE', 'EEE', 'MECH', 'CIVIL', 'AIDS', 'AIML']
+
+
+def synthetic_rows(count):
+    """Yield visitor rows shaped like the VISITORS_IN_RANGE result"""
+    rng = random.Random(42)
+    start = datetime(2025, 6, 1, 8, 0)
+    for i in range(count):
+        in_time = start + timedelta(minutes=i)
+        yield {
+            'id': i + 1,
+            'date': in_time,
+            'in_time': in_time,
+            'mobile': f"9{rng.randrange(10**9):09d}",
+            'name': f"Visitor {i}",
+            'designation': 'Manager',
+            'company': f"Company {rng.randrange(500)}",
+            'laptop': '-',
+            'to_meet': f"Dr. Host {rng.randrange(200)}",
+            'department': rng.choice(DEPARTMENTS),
+            'out_time': in_time + timedelta(minutes=rng.randrange(15, 240)),
+            'entered_by': 'security',
+            'vehicle_number': 'TN 37 AB 1234',
+        }
+
+
+def to_record(row):
+    return [
+        row['date'].strftime("%d-%m-%Y"),
+        row['in_time'].strftime("%I:%M %p"),
+        row['mobile'],
+        row['name'],
+        row['designation'],
+        row['company'],
+        row['laptop'],
+        row['to_meet'],
+        row['department'],
+        'Photo in Database',
+        row['out_time'].strftime("%I:%M %p"),
+        row['entered_by'],
+        row['vehicle_number'],
+    ]
+
+
+def run_stream(count, use_gzip):
+    body = csv_chunks(HEADERS, synthetic_rows(count), to_record)
+    if use_gzip:
+        body = gzip_chunks(body)
+    sent = 0
+    for chunk in body:
+        sent += len(chunk)
+    return sent
+
+
+def run_buffered(count, use_gzip):
+    rows = list(synthetic_rows(count))  # fetch=True
+    si = StringIO()
+    cw = csv.writer(si)
+    cw.writerow(HEADERS)
+    for row in rows:
+        cw.writerow(to_record(row))
+    output = si.getvalue()
+    return len(output)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def child(mode, count, use_gzip):
+    started = time.perf_counter()
+    sent = run_stream(count, use_gzip) if mode == 'stream' else run_buffered(count, use_gzip)
+    elapsed = time.perf_counter() - started
+    print(f"{peak_rss_mb():.1f} {elapsed:.2f} {sent}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV export peak-RSS benchmark")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--modes', nargs='+', default=['stream', 'buffered'], choices=['stream', 'buffered'])
+    parser.add_argument('--gzip', action='store_true', help="Gzip the streamed output")
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'ROWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]), args.gzip)
+        return
+
+    print(f"{'Mode':<10} {'Rows':>10} {'Peak RSS (MB)':>14} {'Time (s)':>9} {'Bytes out':>12}")
+    for count in args.rows:
+        for mode in args.modes:
+            # Each run gets its own process so peak RSS is not shared between runs
+            cmd = [sys.executable, os.path.abspath(__file__), '--child', mode, str(count)]
+            if args.gzip:
+                cmd.append('--gzip')
+            rss, elapsed, sent = subprocess.check_output(cmd, text=True).split()
+            print(f"{mode:<10} {count:>10} {float(rss):>14.1f} {float(elapsed):>9.2f} {int(sent):>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+"""
+Gate-rush load test: replay mixed traffic against a running app over HTTP
+Each worker thread logs in as a security guard and as the admin (its own
+cookie jars), then picks routes at random by weight for --duration seconds.
+Latency percentiles and throughput are reported per route and saved as JSON,
+so runs before and after a change can be compared.
+
+Seed a scratch database and start the app first (see seed_loadtest.py):
+    python app.py
+    python benchmarks/loadtest.py --concurrency 16 --duration 60
+    python benchmarks/loadtest.py --mix check_visitor=50,entry=20,exit=20,get_active_visitors=10
+    python benchmarks/loadtest.py --compare results/before.json results/after.json
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import platform
+import threading
+import http.cookiejar
+import urllib.error
+import urllib.request
+from io import BytesIO
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from PIL import Image
+
+MOBILE_BASE = 9000000000  # seeded mobiles are MOBILE_BASE + n
+
+DEFAULT_MIX = {
+    'login': 2,
+    'check_visitor': 30,
+    'entry': 10,
+    'exit': 8,
+    'get_active_visitors': 20,
+    'admin_dashboard': 5,
+    'filter_data': 5,
+    'download_report': 1,
+}
+
+
+def webcam_like_photo(seed):
+    """A 640x480 JPEG about the size of a dashboard capture (~60-120 KB)"""
+    rng = random.Random(seed)
+    base = Image.radial_gradient('L').resize((640, 480)).convert('RGB')
+    noise = Image.effect_noise((640, 480), rng.randint(20, 40)).convert('RGB')
+    tint = Image.new('RGB', (640, 480), tuple(rng.randrange(256) for _ in range(3)))
+    image = Image.blend(Image.blend(base, noise, 0.35), tint, 0.3)
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=92)
+    return buffer.getvalue()
+
+
+class Client:
+    """One logged-in browser session"""
+
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, path, body=None, content_type='application/json'):
+        """Return (status, bytes read); the whole body is read, as a browser would
+
+        JSON answers with "status": "error" (the app's usual failure reply, sent
+        with HTTP 200) are reported as status 'app_error'.
+        """
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+        req = urllib.request.Request(self.base_url + path, data=body)
+        if body is not None:
+            req.add_header('Content-Type', content_type)
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                data = response.read()
+                status = response.status
+                if response.headers.get_content_type() == 'application/json':
+                    reply = json.loads(data)
+                    if isinstance(reply, dict) and (reply.get('status') == 'error' or 'error' in reply):
+                        status = 'app_error'
+                return status, len(data)
+        except urllib.error.HTTPError as e:
+            return e.code, len(e.read())
+
+    def login(self):
+        return self.request('/api/login', {'username': self.username, 'password': self.password})
+
+
+def multipart(fields, photo):
+    """multipart/form-data body like the security dashboard's FormData upload"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="photo"; filename="capture.jpg"\r\n'
+                 f'Content-Type: image/jpeg\r\n\r\n'.encode() + photo + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class Scenario:
+    """The routes the load test can hit; each returns (status, bytes)"""
+
+    def __init__(self, args):
+        self.args = args
+        self.photos = [webcam_like_photo(seed) for seed in range(8)]
+        self.inside = []  # mobiles entered by this run, waiting to exit
+        self.lock = threading.Lock()
+        self.today = date.today()
+
+    def known_mobile(self, rng):
+        # Mostly returning visitors, some first-timers
+        if rng.random() < 0.8:
+            return str(MOBILE_BASE + rng.randrange(self.args.mobiles))
+        return str(8000000000 + rng.randrange(10 ** 9))
+
+    def date_range(self, rng, days):
+        end = self.today - timedelta(days=rng.randrange(0, self.args.days))
+        return (end - timedelta(days=days - 1)).isoformat(), end.isoformat()
+
+    def login(self, security, admin, rng):
+        return security.login()
+
+    def check_visitor(self, security, admin, rng):
+        return security.request(f'/api/check_visitor?mobile={self.known_mobile(rng)}')
+
+    def entry(self, security, admin, rng):
+        mobile = self.known_mobile(rng)
+        fields = {
+            'mobile': mobile, 'name': f'Load Visitor {mobile[-5:]}', 'designation': 'Visitor',
+            'company': 'LoadTest', 'laptop': '-', 'vehicle': '-', 'to_meet': f'Dr. Host {rng.randrange(200)}',
+            'department': 'CSE'
+        }
+        body, content_type = multipart(fields, rng.choice(self.photos))
+        result = security.request('/api/entry', body, content_type)
+        if result[0] == 200:
+            with self.lock:
+                self.inside.append(mobile)
+        return result
+
+    def exit(self, security, admin, rng):
+        with self.lock:
+            mobile = self.inside.pop(rng.randrange(len(self.inside))) if self.inside else self.known_mobile(rng)
+        return security.request('/api/exit', {'mobile': mobile})
+
+    def get_active_visitors(self, security, admin, rng):
+        return security.request('/api/get_active_visitors')
+
+    def admin_dashboard(self, security, admin, rng):
+        return admin.request('/dashboard')
+
+    def filter_data(self, security, admin, rng):
+        start, end = self.date_range(rng, 7)
+        return admin.request('/api/admin/filter_data', {'from': start, 'to': end, 'include_total': True})
+
+    def download_report(self, security, admin, rng):
+        start, end = self.date_range(rng, 30)
+        return admin.request(f'/api/admin/download_report?from={start}&to={end}')
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def worker(scenario, mix, args, deadline, seed, samples):
+    rng = random.Random(seed)
+    security = Client(args.base_url, f'{args.security_prefix}{seed % args.guards}', args.password)
+    admin = Client(args.base_url, args.admin, args.password)
+    if security.login()[0] != 200 or admin.login()[0] != 200:
+        samples['_login_failed'].append(0)
+        return
+
+    routes, weights = zip(*mix.items())
+    while time.monotonic() < deadline:
+        route = rng.choices(routes, weights)[0]
+        started = time.perf_counter()
+        try:
+            status, size = getattr(scenario, route)(security, admin, rng)
+        except Exception:
+            status, size = 'error', 0
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        samples[route].append((elapsed_ms, status, size))
+
+
+def summarize(samples, wall_seconds):
+    routes = {}
+    for route, entries in sorted(samples.items()):
+        if route.startswith('_'):
+            continue
+        latencies = sorted(ms for ms, _, _ in entries)
+        errors = sum(1 for _, status, _ in entries if status != 200)
+        routes[route] = {
+            'requests': len(entries),
+            'errors': errors,
+            'throughput_rps': round(len(entries) / wall_seconds, 2),
+            'p50_ms': round(percentile(latencies, 50), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+            'p99_ms': round(percentile(latencies, 99), 1),
+            'max_ms': round(latencies[-1], 1),
+            'mean_bytes': int(sum(size for _, _, size in entries) / len(entries)),
+        }
+    total = sum(route['requests'] for route in routes.values())
+    return routes, {'requests': total, 'throughput_rps': round(total / wall_seconds, 2)}
+
+
+def print_table(routes, totals):
+    print(f"\n{'Route':<22} {'Reqs':>7} {'Errs':>5} {'RPS':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, r in routes.items():
+        print(f"{route:<22} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+    print(f"{'TOTAL':<22} {totals['requests']:>7} {'':>5} {totals['throughput_rps']:>8.1f}")
+
+
+def compare(before_path, after_path):
+    with open(before_path, 'r', encoding='utf-8') as f:
+        before = json.load(f)
+    with open(after_path, 'r', encoding='utf-8') as f:
+        after = json.load(f)
+
+    print(f"{'Route':<22} {'p50 before':>10} {'p50 after':>10} {'p95 before':>10} {'p95 after':>10} {'p95 change':>10}")
+    for route in sorted(set(before['routes']) | set(after['routes'])):
+        b, a = before['routes'].get(route), after['routes'].get(route)
+        if not b or not a:
+            print(f"{route:<22} {'(only in one run)':>54}")
+            continue
+        change = (a['p95_ms'] - b['p95_ms']) / b['p95_ms'] * 100 if b['p95_ms'] else 0
+        print(f"{route:<22} {b['p50_ms']:>10.1f} {a['p50_ms']:>10.1f} {b['p95_ms']:>10.1f} "
+              f"{a['p95_ms']:>10.1f} {change:>+9.1f}%")
+    print(f"Throughput: {before['totals']['throughput_rps']} -> {after['totals']['throughput_rps']} req/s")
+
+
+def parse_mix(text):
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(','):
+        route, _, weight = part.partition('=')
+        if route not in DEFAULT_MIX:
+            raise SystemExit(f"❌ Unknown route '{route}'. Choose from: {', '.join(DEFAULT_MIX)}")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-traffic load test for the gate pass app")
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=8, help="Worker threads (default: 8)")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run (default: 30)")
+    parser.add_argument('--mix', help="route=weight,... (default: " +
+                        ','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()) + ")")
+    parser.add_argument('--admin', default='loadtest_admin', help="Admin username")
+    parser.add_argument('--security-prefix', default='loadtest_security_', help="Security usernames prefix")
+    parser.add_argument('--guards', type=int, default=10, help="Security accounts to spread workers over")
+    parser.add_argument('--password', default='loadtest')
+    parser.add_argument('--mobiles', type=int, default=8000, help="Seeded distinct mobiles (match the seed)")
+    parser.add_argument('--days', type=int, default=365, help="Seeded days of history (match the seed)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--label', default='', help="Free text saved with the results")
+    parser.add_argument('--output', help="JSON results path (default: benchmarks/results/loadtest-<time>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    mix = parse_mix(args.mix)
+    scenario = Scenario(args)
+    samples = defaultdict(list)
+
+    print("=" * 60)
+    print(f"🏁 LOAD TEST: {args.concurrency} workers x {args.duration:.0f}s against {args.base_url}")
+    print("=" * 60)
+
+    started = time.monotonic()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=worker, args=(scenario, mix, args, deadline, args.seed + i, samples))
+               for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.monotonic() - started
+
+    if samples.get('_login_failed'):
+        print(f"⚠️  {len(samples['_login_failed'])} workers could not log in (seeded? right --password?)")
+    routes, totals = summarize(samples, wall_seconds)
+    print_table(routes, totals)
+
+    result = {
+        'label': args.label,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'config': {
+            'base_url': args.base_url, 'concurrency': args.concurrency, 'duration': args.duration,
+            'mix': mix, 'seed': args.seed
+        },
+        'environment': {'python': platform.python_version(), 'platform': platform.platform()},
+        'wall_seconds': round(wall_seconds, 2),
+        'totals': totals,
+        'routes': routes,
+    }
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results',
+                                         f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
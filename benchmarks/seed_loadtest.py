@@ -0,0 +1,216 @@
+"""
+Seed a local MySQL database for load testing (see loadtest.py)
+Creates load-test members, a history of visitors spread over --days (with
+photos in the configured PHOTO_STORE for the most recent --photos visitors),
+visitors still inside, and pending bookings. Run it before starting the app, so
+the occupancy registry and the mobile index load the seeded data.
+
+Point .env (or the environment) at a scratch database first; the script
+refuses to run unless DB_NAME contains "loadtest" (override with --force):
+    DB_NAME=visitor_management_loadtest python migrate.py
+    DB_NAME=visitor_management_loadtest python benchmarks/seed_loadtest.py --visitors 100000
+
+Every seeded member has the password given by --password (default: loadtest).
+Mobiles are 9000000000 + n for n < --mobiles, so loadtest.py can hit known ones.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+import bcrypt
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+from db_config import execute_query, get_db_connection
+from photo_store import get_photo_store
+from photo_utils import process_photo
+from queries import columns, VISITOR_SEARCH_COLUMNS
+from loadtest import MOBILE_BASE, webcam_like_photo
+
+DEPARTMENTS = ['CSE', 'IT', 'ECE', 'EEE', 'MECH', 'CIVIL', 'AIDS', 'AIML', 'Science and Humanities']
+DESIGNATIONS = ['Visitor', 'Parent', 'Vendor', 'Guest Lecturer', 'Interview Candidate']
+COMPANIES = ['Infosys', 'TCS', 'Wipro', 'Zoho', 'Cognizant', 'HCL', 'Bosch', 'L&T', '-']
+INSERT_VISITOR = """
+    INSERT INTO visitors (date, in_time, out_time, mobile, name, designation, company, laptop,
+                          to_meet, department, photo_mime_type, entered_by, vehicle_number, pass_number)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'image/jpeg', %s, %s, %s)
+"""
+INSERT_BOOKING = """
+    INSERT INTO bookings (booking_time, booked_by_email, host_name, host_department,
+                          visitor_mobile, visitor_name, purpose, status, company, vehicle_number)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, 'Pending', %s, %s)
+"""
+
+
+def insert_many(query, rows):
+    connection = get_db_connection()
+    if not connection:
+        raise SystemExit("❌ No database connection")
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(query, rows)
+        connection.commit()
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def seed_members(count, password):
+    hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    members = [('loadtest_admin', hashed, 'Admin', 'Load', 'Admin', 'ADMIN')]
+    members += [(f'loadtest_security_{i}', hashed, 'Security', 'Load', f'Guard {i}', 'SECURITY')
+                for i in range(max(1, count // 5))]
+    members += [(f'loadtest.faculty{i}.cse@sritcbe.ac.in', hashed, 'Faculty', 'Dr. Host', str(i), 'CSE')
+                for i in range(max(0, count - len(members)))]
+    # Re-seeding replaces the load-test members
+    execute_query("DELETE FROM members WHERE username LIKE 'loadtest%%'")
+    insert_many(
+        """
+            INSERT INTO members (username, pwd, role, firstname, lastname, department, suspended)
+            VALUES (%s, %s, %s, %s, %s, %s, 0)
+        """,
+        members
+    )
+    return len(members)
+
+
+def next_pass_number():
+    rows = execute_query("SELECT last_value FROM pass_sequence WHERE name = 'visitor_pass'", fetch=True)
+    if not rows:
+        raise SystemExit("❌ pass_sequence is not initialised - run python migrate.py")
+    return rows[0]['last_value'] + 1
+
+
+def visitor_row(rng, args, now, pass_number, inside):
+    mobile = MOBILE_BASE + rng.randrange(args.mobiles)
+    if inside:
+        in_time = now - timedelta(minutes=rng.randrange(5, 180))
+        out_time = None
+    else:
+        day = now.date() - timedelta(days=rng.randrange(1, args.days + 1))
+        in_time = datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randrange(8 * 60, 18 * 60))
+        out_time = in_time + timedelta(minutes=int(rng.lognormvariate(4, 0.7)))
+    host = rng.randrange(200)
+    # date is the entry day at midnight, as /api/entry stores it
+    entry_day = datetime.combine(in_time.date(), datetime.min.time())
+    return (entry_day, in_time, out_time, str(mobile), f"Visitor {mobile % 100000}",
+            rng.choice(DESIGNATIONS), rng.choice(COMPANIES), rng.choice(['-', 'Dell', 'HP', 'Lenovo']),
+            f"Dr. Host {host}", DEPARTMENTS[host % len(DEPARTMENTS)], 'loadtest_security_0',
+            f"TN{rng.randrange(10, 99)}AB{rng.randrange(1000, 9999)}" if rng.random() < 0.4 else '-',
+            pass_number)
+
+
+def seed_visitors(args, now):
+    rng = random.Random(args.seed)
+    pass_number = next_pass_number()
+    total = args.visitors + args.inside
+    batch = []
+    for n in range(total):
+        batch.append(visitor_row(rng, args, now, pass_number, inside=n >= args.visitors))
+        pass_number += 1
+        if len(batch) >= args.batch_size or n == total - 1:
+            insert_many(INSERT_VISITOR, batch)
+            batch = []
+            print(f"   👤 {n + 1}/{total} visitors")
+
+    # Admin search reads its own copy of the searchable columns
+    execute_query(f"""
+        INSERT IGNORE INTO visitor_search (visitor_id, date, {columns(VISITOR_SEARCH_COLUMNS)})
+        SELECT id, date, {columns(VISITOR_SEARCH_COLUMNS)} FROM visitors
+    """)
+
+    # Later passes continue after the seeded ones
+    execute_query(
+        "UPDATE pass_sequence SET last_value = GREATEST(last_value, %s) WHERE name = 'visitor_pass'",
+        (pass_number - 1,)
+    )
+    return total
+
+
+def seed_photos(count, batch_size):
+    if count <= 0:
+        return 0, 0
+    store = get_photo_store()
+    photos = [process_photo(webcam_like_photo(seed)) for seed in range(16)]
+    rows = execute_query("SELECT id FROM visitors ORDER BY id DESC LIMIT %s", (count,), fetch=True) or []
+
+    saved, stored_bytes = 0, 0
+    for start in range(0, len(rows), batch_size):
+        batch = []
+        for row in rows[start:start + batch_size]:
+            processed = photos[row['id'] % len(photos)]
+            for variant in ('full', 'medium', 'thumb'):
+                batch.append((row['id'], variant, processed[variant], 'image/jpeg'))
+                stored_bytes += len(processed[variant])
+        if not store.save_batch(batch):
+            raise SystemExit("❌ Photo batch failed")
+        saved += len(batch) // 3
+        print(f"   📷 {saved}/{len(rows)} photos")
+    return saved, stored_bytes
+
+
+def seed_bookings(args, now):
+    rng = random.Random(args.seed + 1)
+    bookings = []
+    for _ in range(args.bookings):
+        mobile = MOBILE_BASE + rng.randrange(args.mobiles)
+        host = rng.randrange(200)
+        bookings.append((now - timedelta(minutes=rng.randrange(0, 600)), 'loadtest_admin',
+                         f"Dr. Host {host}", DEPARTMENTS[host % len(DEPARTMENTS)], str(mobile),
+                         f"Visitor {mobile % 100000}", 'Meeting', rng.choice(COMPANIES), '-'))
+    if bookings:
+        insert_many(INSERT_BOOKING, bookings)
+    return len(bookings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a scratch database for load testing")
+    parser.add_argument('--members', type=int, default=50, help="Members to create (default: 50)")
+    parser.add_argument('--visitors', type=int, default=20000, help="Past visits (default: 20000)")
+    parser.add_argument('--inside', type=int, default=50, help="Visitors currently inside (default: 50)")
+    parser.add_argument('--mobiles', type=int, default=8000, help="Distinct visitor mobiles (default: 8000)")
+    parser.add_argument('--days', type=int, default=365, help="Days of history (default: 365)")
+    parser.add_argument('--photos', type=int, default=2000, help="Most recent visitors given photos (default: 2000)")
+    parser.add_argument('--bookings', type=int, default=200, help="Pending bookings (default: 200)")
+    parser.add_argument('--password', default='loadtest', help="Password for seeded members")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows per insert batch (default: 1000)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed")
+    parser.add_argument('--force', action='store_true', help="Seed even if DB_NAME does not contain 'loadtest'")
+    args = parser.parse_args()
+
+    db_name = os.getenv("DB_NAME", "visitor_management")
+    if 'loadtest' not in db_name and not args.force:
+        raise SystemExit(f"❌ Refusing to seed '{db_name}'. Use a scratch database (DB_NAME=..._loadtest) or --force.")
+
+    print("=" * 60)
+    print(f"🌱 LOAD TEST SEED ({db_name})")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    # Wall-clock IST like the app writes, without tzinfo
+    now = datetime.utcnow() + timedelta(hours=5, minutes=30)
+
+    members = seed_members(args.members, args.password)
+    visitors = seed_visitors(args, now)
+    photos, photo_bytes = seed_photos(min(args.photos, visitors), max(1, args.batch_size // 10))
+    bookings = seed_bookings(args, now)
+
+    print(f"\n📊 Seed Summary:")
+    print(f"   Members: {members} (password: {args.password})")
+    print(f"   Visitors: {visitors} ({args.inside} inside)")
+    print(f"   Photos: {photos} ({photo_bytes / 1024 / 1024:.1f} MB stored)")
+    print(f"   Pending bookings: {bookings}")
+    print(f"   Time: {time.perf_counter() - started:.1f}s")
+    print("💡 Run 'python rebuild_rollups.py' to fill the analytics rollups, then start the app")
+
+
+if __name__ == "__main__":
+    main()
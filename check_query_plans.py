@@ -0,0 +1,38 @@
+"""
+Check the query plans behind the app against a seeded database
+Runs tests/test_query_plans.py, which EXPLAINs every statement in app.py and
+the modules it queries through, and exits with status 1 if any plan does a
+full table scan or a filesort. The database is DB_NAME unless PLAN_CHECK_DB
+is set.
+
+On a near-empty table MySQL prefers a full scan, so run it against a seeded
+database:
+    DB_NAME=visitor_management_loadtest python benchmarks/seed_loadtest.py
+    DB_NAME=visitor_management_loadtest python check_query_plans.py
+"""
+
+import os
+import sys
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import pytest
+
+PLAN_TESTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'test_query_plans.py')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the app's queries and fail on full scans or filesorts")
+    parser.add_argument('--days', type=int, default=30, help="Date range used for range queries (default: 30)")
+    parser.add_argument('--verbose', action='store_true', help="List every statement checked")
+    args = parser.parse_args()
+
+    os.environ.setdefault('PLAN_CHECK_DB', os.getenv("DB_NAME", "visitor_management"))
+    os.environ['PLAN_CHECK_DAYS'] = str(args.days)
+    sys.exit(pytest.main([PLAN_TESTS, '-v' if args.verbose else '-q', '-rs']))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+"""
+MySQL connection pool and query helpers
+Every module goes through get_db_connection() / execute_query(); close() on a
+checked-out connection hands it back to the pool.
+
+The pool keeps DB_POOL_SIZE connections and opens up to DB_POOL_MAX_OVERFLOW
+more under load (closed again when returned). A connection idle longer than
+DB_POOL_PING_IDLE seconds is pinged before it is handed out, and one older than
+DB_POOL_RECYCLE seconds is replaced, so a MySQL restart or wait_timeout never
+reaches a gate entry as a dead connection. Checkouts wait at most
+DB_POOL_TIMEOUT seconds; connecting and statements that failed on a transient
+error (lost connection, deadlock) are retried with backoff.
+
+The pool belongs to the process that created it: a forked worker (gunicorn,
+uwsgi) drops what it inherited and opens its own connections.
+
+Admin reports can read from a replica (DB_REPLICA_HOST). Only reads made
+inside read_only() go there, and only while the replica is reachable and no
+more than DB_REPLICA_MAX_LAG seconds behind; otherwise they fall back to the
+primary. Writes, and reads outside read_only(), always use the primary, so
+the gate reads back what it has just written.
+"""
+
+import os
+import time
+import random
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+import mysql.connector
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_CONFIG = {
+    'host': os.getenv("DB_HOST", "localhost"),
+    'user': os.getenv("DB_USER", "root"),
+    'password': os.getenv("DB_PASSWORD", ""),
+    'database': os.getenv("DB_NAME", "visitor_management"),
+    'port': int(os.getenv("DB_PORT", 3306)),
+    'charset': 'utf8mb4',
+    'autocommit': False,
+    'connection_timeout': int(os.getenv("DB_CONNECT_TIMEOUT", 5)),
+}
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))
+POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", 1800))  # keep below MySQL wait_timeout
+POOL_PING_IDLE = float(os.getenv("DB_POOL_PING_IDLE", 30))
+DB_RETRIES = int(os.getenv("DB_RETRIES", 2))
+DB_RETRY_BACKOFF = float(os.getenv("DB_RETRY_BACKOFF", 0.1))
+
+REPLICA_HOST = os.getenv("DB_REPLICA_HOST")
+# Short, so a replica that just went down delays a report by at most this long
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", 1))
+REPLICA_CONFIG = {
+    **DB_CONFIG,
+    'host': REPLICA_HOST,
+    'port': int(os.getenv("DB_REPLICA_PORT", DB_CONFIG['port'])),
+    'user': os.getenv("DB_REPLICA_USER", DB_CONFIG['user']),
+    'password': os.getenv("DB_REPLICA_PASSWORD", DB_CONFIG['password']),
+    'connection_timeout': REPLICA_CONNECT_TIMEOUT,
+}
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", 10))
+REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 5))
+
+# Client/server errors meaning the connection itself is gone: server restart,
+# wait_timeout, network drop, or MySQL refusing new connections for a moment
+DISCONNECT_ERRORS = {1040, 1053, 2002, 2003, 2006, 2013, 2055, 4031}
+# The server rolled the statement back; running it again is safe
+RETRYABLE_ERRORS = DISCONNECT_ERRORS | {1205, 1213}
+
+
+class PoolTimeout(Exception):
+    """No connection became free within DB_POOL_TIMEOUT"""
+
+
+def is_disconnect(err):
+    if err.errno is None:
+        # "MySQL Connection not available" and friends carry no errno
+        return isinstance(err, (mysql.connector.InterfaceError, mysql.connector.OperationalError))
+    return err.errno in DISCONNECT_ERRORS
+
+
+def is_retryable(err):
+    return is_disconnect(err) or err.errno in RETRYABLE_ERRORS
+
+
+def backoff(attempt):
+    """Exponential backoff with jitter so workers don't reconnect in lockstep"""
+    delay = DB_RETRY_BACKOFF * (2 ** attempt)
+    return delay + random.uniform(0, delay)
+
+
+class PooledConnection:
+    """A checked-out connection; close() returns it to the pool"""
+
+    _raw = None  # set before anything can reach __getattr__
+
+    def __init__(self, pool, raw, created):
+        self._pool = pool
+        self._raw = raw
+        self._created = created
+        self._broken = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def discard(self):
+        """Close this connection instead of reusing it (it hit a connection error)"""
+        self._broken = True
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool.release(raw, self._created, self._broken)
+
+    def __del__(self):
+        # A caller that forgot close() must not shrink the pool for good
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of mysql.connector connections"""
+
+    def __init__(self, config, size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, ping_idle=POOL_PING_IDLE, retries=DB_RETRIES):
+        self.config = config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_idle = ping_idle
+        self.retries = retries
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self._idle = deque()  # (connection, created, last returned), most recent last
+        self._open = 0        # idle + checked out
+        self._available = threading.Condition(threading.RLock())
+        self._stats = dict.fromkeys(
+            ('checkouts', 'waits', 'timeouts', 'connects', 'connect_errors',
+             'recycled', 'ping_failures', 'discarded', 'retries'), 0)
+
+    def after_fork(self):
+        """Forget the parent's connections without closing them
+
+        Closing would send QUIT down sockets the parent is still using; the
+        objects are kept referenced so nothing finalizes them in the child.
+        """
+        self._inherited = list(self._idle)
+        self._reset()
+
+    def get(self):
+        """Check out a connection, raising PoolTimeout or mysql.connector.Error"""
+        if os.getpid() != self.pid:
+            self.after_fork()
+
+        deadline = time.monotonic() + self.timeout
+        entry = None
+        with self._available:
+            self._stats['checkouts'] += 1
+            waited = False
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s "
+                                      f"({self._open} open)")
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                self._available.wait(remaining)
+
+        try:
+            if entry is not None:
+                raw, created = self._validate(*entry)
+                if raw is not None:
+                    return PooledConnection(self, raw, created)
+            return PooledConnection(self, self._connect(deadline), time.monotonic())
+        except BaseException:
+            self._forget()
+            raise
+
+    def _validate(self, raw, created, last_used):
+        """Return (raw, created) if the idle connection is still usable, else (None, None)"""
+        now = time.monotonic()
+        if self.recycle and now - created > self.recycle:
+            self._count('recycled')
+            self._close(raw)
+            return None, None
+        if now - last_used > self.ping_idle:
+            try:
+                raw.ping(reconnect=False)
+            except mysql.connector.Error:
+                self._count('ping_failures')
+                self._close(raw)
+                return None, None
+        return raw, created
+
+    def _connect(self, deadline):
+        attempt = 0
+        while True:
+            try:
+                raw = mysql.connector.connect(**self.config)
+                self._count('connects')
+                return raw
+            except mysql.connector.Error as err:
+                self._count('connect_errors')
+                delay = backoff(attempt)
+                if (attempt >= self.retries or not is_retryable(err)
+                        or time.monotonic() + delay > deadline):
+                    raise
+                attempt += 1
+                time.sleep(delay)
+
+    def release(self, raw, created, broken=False):
+        if os.getpid() != self.pid:
+            return  # checked out before a fork; the parent owns it
+
+        if not broken:
+            try:
+                if getattr(raw, 'unread_result', False):
+                    broken = True  # an abandoned streaming cursor; not worth draining
+                elif raw.in_transaction:
+                    raw.rollback()
+            except mysql.connector.Error:
+                broken = True
+
+        with self._available:
+            keep = not broken and len(self._idle) < self.size
+            if keep:
+                self._idle.append((raw, created, time.monotonic()))
+            else:
+                self._open -= 1
+                if broken:
+                    self._stats['discarded'] += 1
+            self._available.notify()
+        if not keep:
+            self._close(raw)
+
+    def _forget(self):
+        """A slot reserved for a connection that could not be handed out"""
+        with self._available:
+            self._open -= 1
+            self._available.notify()
+
+    def _close(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _count(self, name, amount=1):
+        with self._available:
+            self._stats[name] += amount
+
+    def stats(self):
+        with self._available:
+            idle = len(self._idle)
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'idle': idle,
+                'in_use': self._open - idle,
+                **self._stats,
+            }
+
+
+class ReplicaRouter:
+    """Hands out replica connections while the replica is caught up
+
+    A background thread reads the lag from SHOW REPLICA STATUS every
+    check_interval seconds (the replica user needs REPLICATION CLIENT), so
+    requests only ever look at the last result. A server that is not
+    replicating, a stopped SQL thread or a failed connection all count as
+    unavailable until the next check.
+    """
+
+    def __init__(self, pool, max_lag=REPLICA_MAX_LAG, check_interval=REPLICA_CHECK_INTERVAL):
+        self.pool = pool
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = None
+        self.available = False
+        self._checks = 0
+        self._checker_pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'replica_reads': 0, 'primary_fallbacks': 0}
+
+    def connection(self):
+        """A replica connection, or None when the read should go to the primary"""
+        self._start_checker()
+        connection = None
+        if self.available:
+            try:
+                connection = self.pool.get()
+            except (PoolTimeout, mysql.connector.Error) as err:
+                self._mark_unavailable(f"Replica unavailable, reads go to the primary: {err}")
+        with self._stats_lock:
+            self._stats['replica_reads' if connection else 'primary_fallbacks'] += 1
+        return connection
+
+    def _start_checker(self):
+        """One lag-check thread per process (threads do not survive a fork)"""
+        if self._checker_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._checker_pid != os.getpid():
+                self._checker_pid = os.getpid()
+                threading.Thread(target=self._check_loop, name='replica-lag-check', daemon=True).start()
+
+    def _check_loop(self):
+        while True:
+            self._check()
+            time.sleep(self.check_interval)
+
+    def _check(self):
+        try:
+            self.lag = self._measure_lag()
+        except (PoolTimeout, mysql.connector.Error) as err:
+            self.lag = None
+            self._mark_unavailable(f"Replica unavailable, reads go to the primary: {err}")
+            return
+        finally:
+            self._checks += 1
+        if self.lag is None:
+            self._mark_unavailable("Replica is not replicating, reads go to the primary")
+        elif self.lag > self.max_lag:
+            self._mark_unavailable(f"Replica {self.lag:.0f}s behind, reads go to the primary")
+        elif not self.available:
+            self.available = True
+            print(f"✅ Replica caught up ({self.lag:.0f}s behind), serving read-only queries")
+
+    def _measure_lag(self):
+        """Seconds behind the primary, or None if the server is not replicating"""
+        connection = self.pool.get()
+        cursor = connection.cursor(dictionary=True)
+        try:
+            try:
+                cursor.execute("SHOW REPLICA STATUS")
+                key = 'Seconds_Behind_Source'
+            except mysql.connector.Error:
+                # MySQL before 8.0.22 / MariaDB
+                cursor.execute("SHOW SLAVE STATUS")
+                key = 'Seconds_Behind_Master'
+            row = cursor.fetchone()
+        finally:
+            cursor.close()
+            connection.close()
+        if not row or row.get(key) is None:
+            return None
+        return float(row[key])
+
+    def _mark_unavailable(self, message):
+        if self.available or self._checks <= 1:
+            print(f"⚠️ {message}")
+        self.available = False
+
+    def after_fork(self):
+        # Primary only until this process's own checker has looked
+        self.available = False
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.pool.after_fork()
+
+    def stats(self):
+        return {
+            'host': self.pool.config['host'],
+            'available': self.available,
+            'lag_seconds': self.lag,
+            'max_lag_seconds': self.max_lag,
+            **dict(self._stats),
+            'pool': self.pool.stats(),
+        }
+
+
+_pool = None
+_replica = None
+_pool_lock = threading.Lock()
+_read_only = contextvars.ContextVar('db_read_only', default=False)
+
+
+def _after_fork_in_child():
+    global _pool_lock
+    _pool_lock = threading.Lock()
+    if _pool is not None:
+        _pool.after_fork()
+    if _replica is not None:
+        _replica.after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_CONFIG)
+    return _pool
+
+
+def get_replica():
+    """The ReplicaRouter, or None when DB_REPLICA_HOST is not set"""
+    global _replica
+    if REPLICA_HOST and _replica is None:
+        with _pool_lock:
+            if _replica is None:
+                # No connect retries: falling back to the primary is the retry
+                _replica = ReplicaRouter(ConnectionPool(REPLICA_CONFIG, timeout=REPLICA_CONNECT_TIMEOUT,
+                                                        retries=0))
+    return _replica
+
+
+@contextmanager
+def read_only():
+    """Send reads in this block to the replica, if one is configured and caught up
+
+    Also works as a decorator (below @app.route). Only for reads that may be a
+    few seconds stale: reports and analytics, never the gate's own lookups.
+    """
+    token = _read_only.set(True)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+def reading_from_replica():
+    """True inside read_only()"""
+    return _read_only.get()
+
+
+def init_db_pool():
+    """Create the pool and open its first connection; False if MySQL is unreachable
+
+    The app keeps running either way: the pool connects on demand once MySQL is back.
+    """
+    connection = get_db_connection()
+    if not connection:
+        return False
+    connection.close()
+    print(f"✅ Database pool initialized successfully "
+          f"(size {POOL_SIZE}, overflow {POOL_MAX_OVERFLOW})")
+    return True
+
+
+def get_db_connection(replica=False):
+    """Check out a pooled connection, or None if none could be had
+
+    replica=True takes a replica connection when one is available and falls
+    back to the primary otherwise.
+    """
+    router = get_replica() if replica else None
+    if router is not None:
+        connection = router.connection()
+        if connection:
+            return connection
+    try:
+        return get_pool().get()
+    except PoolTimeout as e:
+        print(f"❌ Database pool exhausted: {e}")
+    except mysql.connector.Error as err:
+        print(f"❌ Database connection error: {err}")
+    return None
+
+
+def execute_query(query, params=None, fetch=False):
+    """Run one statement and commit it
+
+    Returns the rows (as dicts) when fetch=True, otherwise lastrowid or True;
+    None on error. A transient error is retried with backoff unless it struck
+    during COMMIT, where the write may already have been applied. Reads inside
+    read_only() may be served by the replica.
+    """
+    for attempt in range(DB_RETRIES + 1):
+        connection = get_db_connection(replica=fetch and reading_from_replica())
+        if not connection:
+            return None
+
+        cursor = None
+        committing = False
+        try:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(query, params or ())
+            if fetch:
+                return cursor.fetchall()
+            committing = True
+            connection.commit()
+            return cursor.lastrowid or True
+        except mysql.connector.Error as err:
+            if is_disconnect(err):
+                connection.discard()
+            else:
+                try:
+                    connection.rollback()
+                except mysql.connector.Error:
+                    connection.discard()
+            if committing or not is_retryable(err) or attempt == DB_RETRIES:
+                print(f"❌ Database error: {err}")
+                return None
+            get_pool()._count('retries')
+            time.sleep(backoff(attempt))
+        finally:
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except mysql.connector.Error:
+                    connection.discard()
+            connection.close()
+
+
+def pool_stats():
+    """Pool counters for /metrics and the admin cache stats"""
+    return get_pool().stats()
+
+
+def replica_stats():
+    """Replica lag and routing counters, or None without a replica"""
+    router = get_replica()
+    return router.stats() if router else None
+
+
+def test_connection():
+    """Check the database answers; used at startup and by the setup scripts"""
+    rows = execute_query("SELECT VERSION() AS version", fetch=True)
+    if not rows:
+        print("❌ Database connection failed!")
+        return False
+    print(f"✅ Connected to MySQL {rows[0]['version']} at {DB_CONFIG['host']}:{DB_CONFIG['port']}"
+          f"/{DB_CONFIG['database']}")
+    return True
@@ -27,8 +27,11 @@ CREATE TABLE IF NOT EXISTS members (
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
 
 -- Visitors Table (Entry/Exit Log)
+-- Partitioned by month of entry; maintain_partitions.py splits upcoming months
+-- out of p_future. Unique keys must contain the partition column, so pass
+-- numbers are kept unique by pass_reservations.
 CREATE TABLE IF NOT EXISTS visitors (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     date TIMESTAMP NOT NULL,
     in_time TIMESTAMP NOT NULL,
     mobile VARCHAR(15) NOT NULL,
@@ -38,20 +41,96 @@ CREATE TABLE IF NOT EXISTS visitors (
     laptop VARCHAR(50) DEFAULT '-',
     to_meet VARCHAR(255) NOT NULL,
     department VARCHAR(100) NOT NULL,
-    photo_data LONGBLOB,
+    photo_data LONGBLOB COMMENT 'Legacy inline photo - new photos go to visitor_photos',
     photo_mime_type VARCHAR(50) DEFAULT 'image/jpeg',
+    photo_thumb MEDIUMBLOB COMMENT 'Legacy thumbnail JPEG (160px)',
+    photo_medium MEDIUMBLOB COMMENT 'Legacy medium JPEG (480px)',
     out_time TIMESTAMP NULL,
     entered_by VARCHAR(255),
     vehicle_number VARCHAR(50) DEFAULT '-',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_mobile (mobile),
-    INDEX idx_date (date),
-    INDEX idx_out_time (out_time)
+    pass_number INT NULL COMMENT 'Printed gate pass number (from pass_sequence)',
+    PRIMARY KEY (id, date),
+    UNIQUE KEY uq_pass_number (pass_number, date),
+    INDEX idx_mobile_created_at (mobile, created_at),
+    INDEX idx_out_time_in_time (out_time, in_time),
+    INDEX idx_date_in_time_id (date, in_time, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (UNIX_TIMESTAMP(date)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- Visitor Search (searchable columns of each visit, for /api/admin/search)
+-- Partitioned tables cannot have FULLTEXT indexes, so /api/entry copies these
+-- columns here; they never change after entry
+CREATE TABLE IF NOT EXISTS visitor_search (
+    visitor_id INT NOT NULL PRIMARY KEY,
+    date TIMESTAMP NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    company VARCHAR(255),
+    designation VARCHAR(100),
+    to_meet VARCHAR(255) NOT NULL,
+    department VARCHAR(100) NOT NULL,
+    vehicle_number VARCHAR(50) DEFAULT '-',
+    FULLTEXT INDEX ft_visitor_search (name, company, designation, to_meet, department, vehicle_number)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Pass Number Sequence (one counter row per sequence)
+-- Gate terminals reserve numbers with
+--   UPDATE pass_sequence SET last_value = LAST_INSERT_ID(last_value + 1) WHERE name = 'visitor_pass'
+CREATE TABLE IF NOT EXISTS pass_sequence (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    last_value INT NOT NULL DEFAULT 0
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
--- Bookings Table (Pre-booking)
+INSERT IGNORE INTO pass_sequence (name, last_value) VALUES ('visitor_pass', 0);
+
+-- Pass Reservations (one row per number handed out by pass_sequence)
+-- /api/entry sets visitor_id in the same transaction as the visitor insert;
+-- a number that has no row, has expired or already has a visitor is rejected
+CREATE TABLE IF NOT EXISTS pass_reservations (
+    pass_number INT NOT NULL PRIMARY KEY,
+    reserved_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    visitor_id INT NULL COMMENT 'Visit that used the number; NULL while unused',
+    consumed_at TIMESTAMP NULL,
+    INDEX idx_visitor_id (visitor_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Visitor Photos Table (one row per visitor photo size variant)
+-- PHOTO_STORE=table keeps the bytes in `data`; PHOTO_STORE=filesystem leaves `data`
+-- NULL and stores the file under PHOTO_STORE_PATH named by its sha256.
+-- archive_photos.py moves old photos into ZIP files under PHOTO_ARCHIVE_PATH,
+-- clearing `data` and naming the file in `archived_in`
+CREATE TABLE IF NOT EXISTS visitor_photos (
+    visitor_id INT NOT NULL,
+    variant ENUM('full', 'medium', 'thumb') NOT NULL,
+    mime_type VARCHAR(50) NOT NULL DEFAULT 'image/jpeg',
+    sha256 CHAR(64) NOT NULL,
+    byte_size INT NOT NULL COMMENT 'Stored size in bytes',
+    original_size INT NULL COMMENT 'Uploaded size before normalization',
+    data LONGBLOB NULL,
+    archived_in VARCHAR(64) NULL COMMENT 'Archive file holding the photo (cold tier)',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (visitor_id, variant),
+    INDEX idx_sha256 (sha256)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Visitor Rollups (daily totals per dimension for /api/admin/analytics)
+-- Updated by entry/exit; rebuild_rollups.py recomputes any date range
+CREATE TABLE IF NOT EXISTS visitor_rollups (
+    day DATE NOT NULL,
+    dimension ENUM('total', 'department', 'host', 'hour') NOT NULL,
+    dim_key VARCHAR(255) NOT NULL DEFAULT '' COMMENT 'Department, host name or hour (00-23); empty for total',
+    visits INT NOT NULL DEFAULT 0,
+    exits INT NOT NULL DEFAULT 0,
+    dwell_seconds BIGINT NOT NULL DEFAULT 0 COMMENT 'Sum of out_time - in_time over exits',
+    PRIMARY KEY (day, dimension, dim_key),
+    INDEX idx_dimension_day (dimension, day)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Bookings Table (Pre-booking), partitioned by month like visitors
 CREATE TABLE IF NOT EXISTS bookings (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     booking_time TIMESTAMP NOT NULL,
     booked_by_email VARCHAR(255) NOT NULL,
     host_name VARCHAR(255) NOT NULL,
@@ -64,10 +143,14 @@ CREATE TABLE IF NOT EXISTS bookings (
     vehicle_number VARCHAR(50) DEFAULT '-',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_mobile (visitor_mobile),
-    INDEX idx_status (status),
+    PRIMARY KEY (id, booking_time),
+    INDEX idx_mobile_status (visitor_mobile, status, booking_time),
+    INDEX idx_status_booking_time (status, booking_time),
     INDEX idx_booking_time (booking_time)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (UNIX_TIMESTAMP(booking_time)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
 
 -- Insert Admin and Security members (REQUIRED - Must be in database)
 -- Default password for all members is 'password123' (hashed with md5)
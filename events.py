@@ -0,0 +1,74 @@
+"""
+Server-Sent Events broker for live dashboard updates
+Routes publish visitor/booking events; every connected dashboard has its own
+bounded queue. A client that falls too far behind is disconnected instead of
+growing memory, and its EventSource reconnects and reloads its lists.
+"""
+
+import json
+import queue
+import threading
+
+HEARTBEAT_SECONDS = 15
+
+
+class Subscriber:
+    def __init__(self, queue_size):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+
+class EventBroker:
+    """Fan-out of published events to per-client bounded queues"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped_clients = 0
+
+    def subscribe(self):
+        subscriber = Subscriber(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        """Queue an event for every connected client (never blocks the caller)"""
+        message = f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except queue.Full:
+                subscriber.overflowed = True
+                self.unsubscribe(subscriber)
+                self.dropped_clients += 1
+
+    def stream(self, subscriber):
+        """Generator of SSE text for one client; unsubscribes when the client goes away"""
+        try:
+            yield "retry: 3000\n\n"
+            while not subscriber.overflowed:
+                try:
+                    yield subscriber.queue.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': len(self._subscribers),
+                'published': self.published,
+                'dropped_clients': self.dropped_clients
+            }
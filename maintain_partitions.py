@@ -0,0 +1,90 @@
+"""
+Create the coming monthly partitions of visitors and bookings
+Run it monthly (Task Scheduler / cron) and once after setup. It splits the
+next --ahead months out of p_future while p_future is still empty, which takes
+no time and locks nothing the gate notices. Safe to re-run.
+
+    python maintain_partitions.py              add missing partitions
+    python maintain_partitions.py --status     rows and size per partition
+    python maintain_partitions.py --dry-run    show the ALTER statements only
+"""
+
+import os
+import time
+import argparse
+from datetime import date
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db_config import get_db_connection
+import partitions
+
+MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+
+
+def print_status(cursor, table):
+    for name, rows, size in partitions.list_partitions(cursor, table):
+        print(f"   {table}.{name}: ~{rows} rows, {size / 1024 / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create upcoming monthly partitions")
+    parser.add_argument('--ahead', type=int, default=MONTHS_AHEAD,
+                        help=f"Months to create past the current one (default: {MONTHS_AHEAD})")
+    parser.add_argument('--status', action='store_true', help="List partitions with rows and size")
+    parser.add_argument('--dry-run', action='store_true', help="Print the statements without running them")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗓️  PARTITION MAINTENANCE")
+    print("=" * 60)
+
+    connection = get_db_connection()
+    if not connection:
+        raise SystemExit("❌ Failed to get database connection")
+
+    current_month = date.today().replace(day=1)
+    through_month = partitions.add_months(current_month, args.ahead)
+    started = time.perf_counter()
+    added = {}
+    cursor = connection.cursor()
+    try:
+        for table in partitions.PARTITIONED_TABLES:
+            if args.status:
+                print_status(cursor, table)
+                continue
+
+            existing = partitions.list_partitions(cursor, table)
+            if not any(name == partitions.FUTURE_PARTITION for name, _, _ in existing):
+                print(f"⚠️  {table} is not partitioned - run 'python migrate.py' first")
+                continue
+
+            months = partitions.missing_months(existing, through_month, current_month)
+            if not months:
+                print(f"✅ {table}: partitions exist through {through_month:%Y-%m}")
+                continue
+
+            statement = partitions.reorganize_statement(table, months)
+            if args.dry_run:
+                print(f"   {statement};")
+            else:
+                cursor.execute(statement)
+                print(f"✅ {table}: added {', '.join(partitions.partition_name(m) for m in months)}")
+            added[table] = len(months)
+    finally:
+        cursor.close()
+        connection.close()
+
+    if args.status:
+        return
+
+    print(f"\n📊 Partition Summary:")
+    for table in partitions.PARTITIONED_TABLES:
+        print(f"   {table}: {added.get(table, 0)} {'to add' if args.dry_run else 'added'}")
+    print(f"   Through: {through_month:%Y-%m}")
+    print(f"   Time: {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
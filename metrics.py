@@ -0,0 +1,311 @@
+"""
+Request and database instrumentation exposed as Prometheus text on /metrics
+init_app() times every Flask route; instrument_db() wraps the db_config
+helpers so every query records its latency, rows returned, BLOB bytes read and
+the time spent waiting for a pooled connection. That includes statements run on
+a connection from get_db_connection() (streamed reports, multi-statement
+transactions): its cursors are timed too. Recording is a bisect and a few
+additions under a lock, cheap enough to leave on in production.
+"""
+
+import re
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from flask import g, request
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values"""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text}{"," if label_text else ""}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{braces(label_text)} {values[-1]}")
+            lines.append(f"{self.name}_count{braces(label_text)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{braces(format_labels(self.label_names, labels))} {value}")
+        return lines
+
+
+def format_labels(names, values):
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+def braces(label_text):
+    return f"{{{label_text}}}" if label_text else ''
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# --- Registry ---
+
+request_seconds = Histogram('gatepass_request_seconds', 'Time to response headers per route',
+                            ('method', 'route', 'status'), LATENCY_BUCKETS)
+query_seconds = Histogram('gatepass_query_seconds', 'Statement latency',
+                          ('statement',), LATENCY_BUCKETS)
+query_rows = Histogram('gatepass_query_rows', 'Rows returned per fetch query',
+                       ('statement',), ROW_BUCKETS)
+query_blob_bytes = Counter('gatepass_query_blob_bytes_total', 'BLOB bytes read by fetch queries',
+                           ('statement',))
+query_errors = Counter('gatepass_query_errors_total', 'Statements that failed (database error)',
+                       ('statement',))
+pool_wait_seconds = Histogram('gatepass_pool_wait_seconds', 'Time spent waiting for a pooled connection',
+                              (), WAIT_BUCKETS)
+
+_gauges = []  # (name, help, fn returning a number)
+
+
+def register_gauge(name, help_text, fn):
+    """Report fn() as a gauge on every scrape (e.g. cache sizes)"""
+    _gauges.append((name, help_text, fn))
+
+
+def render():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in (request_seconds, query_seconds, query_rows, query_blob_bytes, query_errors, pool_wait_seconds):
+        lines.extend(metric.render())
+    for name, help_text, fn in _gauges:
+        try:
+            value = fn()
+        except Exception:
+            continue
+        if value is None:
+            continue
+        lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"])
+    return '\n'.join(lines) + '\n'
+
+
+# --- Database hooks ---
+
+VERB_PATTERN = re.compile(r'^[\s(]*(\w+)')
+TABLE_PATTERN = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+`?(\w+)', re.IGNORECASE)
+_statement_labels = {}
+MAX_STATEMENT_LABELS = 500
+
+
+def statement_label(query):
+    """Bounded label for a query, e.g. 'SELECT visitors' (cached per query text)"""
+    label = _statement_labels.get(query)
+    if label is None:
+        verb = VERB_PATTERN.match(query)
+        table = TABLE_PATTERN.search(query)
+        label = verb.group(1).upper() if verb else 'OTHER'
+        if table:
+            label += ' ' + table.group(1)
+        if len(_statement_labels) < MAX_STATEMENT_LABELS:
+            _statement_labels[query] = label
+    return label
+
+
+def blob_bytes(rows):
+    return sum(len(value) for row in rows for value in (row.values() if isinstance(row, dict) else row)
+               if isinstance(value, (bytes, bytearray)))
+
+
+class TimedCursor:
+    """Cursor that records each statement like execute_query does
+
+    Latency is the execute() call; rows and BLOB bytes are counted as they are
+    fetched and recorded when the next statement runs or the cursor closes, so
+    a streamed result is counted in full.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._label = None  # statement with a result set still being fetched
+        self._rows = 0
+        self._blob_bytes = 0
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def execute(self, query, params=(), *args, **kwargs):
+        return self._timed(self._cursor.execute, query, params, *args, **kwargs)
+
+    def executemany(self, query, seq_params, *args, **kwargs):
+        return self._timed(self._cursor.executemany, query, seq_params, *args, **kwargs)
+
+    def _timed(self, method, query, *args, **kwargs):
+        self._record_rows()
+        label = (statement_label(query),)
+        started = time.perf_counter()
+        try:
+            result = method(query, *args, **kwargs)
+        except Exception:
+            query_errors.inc(label)
+            raise
+        finally:
+            query_seconds.observe(label, time.perf_counter() - started)
+        if getattr(self._cursor, 'with_rows', False):
+            self._label = label
+        return result
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count([row])
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def _count(self, rows):
+        self._rows += len(rows)
+        self._blob_bytes += blob_bytes(rows)
+        return rows
+
+    def _record_rows(self):
+        if self._label is not None:
+            query_rows.observe(self._label, self._rows)
+            if self._blob_bytes:
+                query_blob_bytes.inc(self._label, self._blob_bytes)
+        self._label, self._rows, self._blob_bytes = None, 0, 0
+
+    def close(self):
+        self._record_rows()
+        return self._cursor.close()
+
+
+class TimedConnection:
+    """A pooled connection whose cursors are TimedCursors"""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._connection.cursor(*args, **kwargs))
+
+
+_query_observers = []
+# Set while execute_query runs, which records its statement itself
+_in_execute_query = contextvars.ContextVar('metrics_in_execute_query', default=False)
+
+
+def add_query_observer(fn):
+    """Call fn(query, params, elapsed_seconds, result) after every execute_query"""
+    _query_observers.append(fn)
+
+
+def instrument_db(module):
+    """Wrap module.execute_query and module.get_db_connection in place
+
+    Call before anything does `from db_config import ...`, so every importer
+    picks up the wrapped functions. Connections handed out outside
+    execute_query time their own cursors.
+    """
+    execute_query = module.execute_query
+    get_db_connection = module.get_db_connection
+
+    def timed_execute_query(query, params=None, fetch=False):
+        started = time.perf_counter()
+        token = _in_execute_query.set(True)
+        try:
+            result = execute_query(query, params, fetch)
+        finally:
+            _in_execute_query.reset(token)
+        elapsed = time.perf_counter() - started
+
+        label = (statement_label(query),)
+        query_seconds.observe(label, elapsed)
+        if result is None:
+            query_errors.inc(label)
+        elif fetch:
+            query_rows.observe(label, len(result))
+            size = blob_bytes(result)
+            if size:
+                query_blob_bytes.inc(label, size)
+        for observer in _query_observers:
+            observer(query, params, elapsed, result)
+        return result
+
+    def timed_get_db_connection(replica=False):
+        started = time.perf_counter()
+        connection = get_db_connection(replica)
+        pool_wait_seconds.observe((), time.perf_counter() - started)
+        if connection is None or _in_execute_query.get():
+            return connection
+        return TimedConnection(connection)
+
+    timed_execute_query.__wrapped__ = execute_query
+    timed_get_db_connection.__wrapped__ = get_db_connection
+    module.execute_query = timed_execute_query
+    module.get_db_connection = timed_get_db_connection
+
+
+# --- Flask hooks ---
+
+def init_app(app):
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            # Route pattern, not the URL, so /api/photo/<id> stays one series
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            request_seconds.observe((request.method, route, str(response.status_code)),
+                                    time.perf_counter() - started)
+        return response
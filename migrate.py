@@ -0,0 +1,557 @@
+"""
+Versioned schema migrations
+Applies the numbered files in migrations/ in order and records each one in
+schema_migrations with a checksum, so every database knows which changes it
+has and an edited migration is caught instead of silently skipped:
+    NNNN_name.sql   statements run one at a time
+    NNNN_name.py    upgrade(migration) - statements plus batched backfills/copies
+
+MySQL commits DDL implicitly, so a migration cannot be rolled back as a whole.
+Progress is recorded after every step instead (for backfills after every
+batch, in the same transaction as the batch), and an interrupted migration
+resumes where it stopped.
+
+    python migrate.py               apply pending migrations
+    python migrate.py --dry-run     show what would run, without changing anything
+    python migrate.py --status      list applied and pending migrations
+    python migrate.py --baseline 5  record 0001-0005 as applied (databases migrated by hand)
+    python migrate.py --maintenance-window
+                                    also allow steps that block gate writes (off-hours only)
+
+An empty database gets db_schema.sql, which is always the current schema, and
+every migration is recorded as part of that baseline.
+"""
+
+import os
+import re
+import sys
+import time
+import hashlib
+import argparse
+import importlib.util
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import mysql.connector
+from db_config import get_db_connection
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(BASE_DIR, 'migrations')
+SCHEMA_FILE = os.path.join(BASE_DIR, 'db_schema.sql')
+FILE_PATTERN = re.compile(r'^(\d{4})_(\w+)\.(sql|py)$')
+LOCK_NAME = 'schema_migrations'
+
+BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 5000))
+BATCH_PAUSE = float(os.getenv('MIGRATION_PAUSE', 0.1))
+
+# Re-running a DDL statement that finished just before an interruption:
+# table exists, duplicate column, duplicate key, can't drop missing column/key,
+# trigger exists
+ALREADY_APPLIED_ERRORS = (1050, 1060, 1061, 1091, 1359)
+
+ALTER_TABLE_PATTERN = re.compile(r'\s*ALTER\s+TABLE\s+`?(\w+)', re.IGNORECASE)
+# Clauses that make an ALTER hold off writes until the whole table is rebuilt
+BLOCKING_PATTERN = re.compile(r'\bALGORITHM\s*=\s*COPY\b|\bLOCK\s*=\s*(SHARED|EXCLUSIVE)\b', re.IGNORECASE)
+
+CREATE_MIGRATIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT NOT NULL PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        status ENUM('running', 'applied', 'baseline') NOT NULL,
+        steps_done INT NOT NULL DEFAULT 0,
+        backfill_position BIGINT NULL COMMENT 'Last key done by the running backfill',
+        started_at TIMESTAMP NULL,
+        finished_at TIMESTAMP NULL,
+        duration_ms INT NULL
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+
+def split_statements(sql):
+    """Split SQL text on semicolons outside quotes and comments; comments are dropped"""
+    statements, current = [], []
+    quote = None
+    i = 0
+    while i < len(sql):
+        char = sql[i]
+        if quote:
+            current.append(char)
+            if char == '\\' and quote != '`' and i + 1 < len(sql):
+                current.append(sql[i + 1])
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+            current.append(char)
+        elif char == '#' or sql.startswith('-- ', i) or sql.startswith('--\n', i):
+            end = sql.find('\n', i)
+            i = len(sql) if end == -1 else end
+            continue
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = len(sql) if end == -1 else end + 2
+            continue
+        elif char == ';':
+            statement = ''.join(current).strip()
+            if statement:
+                statements.append(statement)
+            current = []
+        else:
+            current.append(char)
+        i += 1
+
+    statement = ''.join(current).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+
+def one_line(statement, width=100):
+    text = ' '.join(statement.split())
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+class MigrationFile:
+    """One numbered file in migrations/"""
+
+    def __init__(self, path):
+        match = FILE_PATTERN.match(os.path.basename(path))
+        self.version = int(match.group(1))
+        self.name = match.group(2)
+        self.kind = match.group(3)
+        self.path = path
+        with open(path, 'rb') as file:
+            self.content = file.read()
+        self.checksum = hashlib.sha256(self.content).hexdigest()
+
+    @property
+    def label(self):
+        return f"{self.version:04d}_{self.name}"
+
+    def apply(self, runner):
+        if self.kind == 'sql':
+            for statement in split_statements(self.content.decode('utf-8')):
+                runner.execute(statement)
+        else:
+            spec = importlib.util.spec_from_file_location(f"migration_{self.label}", self.path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.upgrade(runner)
+
+
+def discover():
+    """Migration files in version order"""
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if FILE_PATTERN.match(filename):
+            migrations.append(MigrationFile(os.path.join(MIGRATIONS_DIR, filename)))
+        elif not filename.startswith(('.', '__')):
+            print(f"⚠️  Ignoring {filename} (expected NNNN_name.sql or NNNN_name.py)")
+
+    versions = [migration.version for migration in migrations]
+    duplicates = sorted({version for version in versions if versions.count(version) > 1})
+    if duplicates:
+        raise SystemExit(f"❌ Duplicate migration versions: {', '.join(f'{v:04d}' for v in duplicates)}")
+    return migrations
+
+
+class BlockingStepRefused(Exception):
+    """A step would block gate writes and no maintenance window was given"""
+
+
+class Runner:
+    """Executes the steps of one migration at a time on a single connection
+
+    Passed to upgrade() in Python migrations. Steps are numbered in the order
+    they are called; on resume the steps already recorded are skipped.
+    """
+
+    def __init__(self, connection, dry_run=False, batch_size=BATCH_SIZE, pause=BATCH_PAUSE,
+                 maintenance_window=False):
+        self.connection = connection
+        self.dry_run = dry_run
+        self.maintenance_window = maintenance_window
+        self.batch_size = batch_size
+        self.pause = pause
+        self.version = None
+        self.step = 0
+        self.steps_done = 0
+        self.position = None
+        self.resuming = False
+
+    def start(self, migration, record):
+        self.version = migration.version
+        self.step = 0
+        self.steps_done = record['steps_done'] if record else 0
+        self.position = record['backfill_position'] if record else None
+        self.resuming = record is not None
+        if self.steps_done:
+            print(f"   ↪️  Resuming after step {self.steps_done}")
+        if self.dry_run:
+            return
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                """
+                    INSERT INTO schema_migrations (version, name, checksum, status, started_at)
+                    VALUES (%s, %s, %s, 'running', NOW())
+                    ON DUPLICATE KEY UPDATE started_at = COALESCE(started_at, NOW())
+                """,
+                (migration.version, migration.name, migration.checksum)
+            )
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def finish(self, duration_ms):
+        if self.dry_run:
+            return
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                """
+                    UPDATE schema_migrations
+                    SET status = 'applied', finished_at = NOW(), duration_ms = %s, backfill_position = NULL
+                    WHERE version = %s
+                """,
+                (int(duration_ms), self.version)
+            )
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def _next_step(self):
+        """Advance the step counter; False if this step finished in an earlier run"""
+        self.step += 1
+        return self.step > self.steps_done
+
+    def _record_step(self, cursor):
+        """Mark the current step done, committing it together with any pending DML"""
+        if self.version is not None:
+            cursor.execute(
+                "UPDATE schema_migrations SET steps_done = %s, backfill_position = NULL WHERE version = %s",
+                (self.step, self.version)
+            )
+        self.connection.commit()
+        self.position = None
+
+    def query(self, statement, params=None):
+        """Read-only query for upgrade() to inspect the data (not a step; runs in dry runs too)"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(statement, params)
+            rows = cursor.fetchall()
+            self.connection.commit()
+            return rows
+        finally:
+            cursor.close()
+
+    def execute(self, statement, params=None):
+        """Run one statement as a step"""
+        if not self._next_step():
+            return
+
+        if re.match(r'\s*ALTER\s+TABLE', statement, re.IGNORECASE) and not re.search(r'\bLOCK\s*=', statement, re.IGNORECASE):
+            print(f"   ⚠️  [{self.step}] ALTER TABLE without LOCK= may block writes while it runs")
+        blocking = self._blocking_reason(statement)
+        if blocking and not self.dry_run:
+            raise BlockingStepRefused(blocking)
+        if blocking:
+            print(f"   ⛔ [{self.step}] needs --maintenance-window: {blocking}")
+        if self.dry_run:
+            print(f"   [{self.step}] {one_line(statement)}")
+            return
+
+        started = time.perf_counter()
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(statement, params)
+            if cursor.with_rows:
+                cursor.fetchall()
+            rows = cursor.rowcount
+            self._record_step(cursor)
+        except mysql.connector.Error as err:
+            resumed = self.resuming and self.step == self.steps_done + 1
+            if not (resumed and err.errno in ALREADY_APPLIED_ERRORS):
+                self.connection.rollback()
+                raise
+            # The statement completed before the interruption but its step was not recorded
+            print(f"   ⚠️  [{self.step}] {err.msg} - already applied before the interruption")
+            self._record_step(cursor)
+            return
+        finally:
+            cursor.close()
+
+        elapsed = (time.perf_counter() - started) * 1000
+        row_text = f", {rows} rows" if rows and rows > 0 else ''
+        print(f"   ✅ [{self.step}] {one_line(statement, 80)} ({elapsed:.0f} ms{row_text})")
+
+    def _blocking_reason(self, statement):
+        """Why an ALTER would block writes to a table with rows, or None (also None in a maintenance window)"""
+        altered = ALTER_TABLE_PATTERN.match(statement)
+        if not altered or not BLOCKING_PATTERN.search(statement) or self.maintenance_window:
+            return None
+        table = altered.group(1)
+        if table_exists(self.connection, table) and self.query(f"SELECT 1 FROM {table} LIMIT 1"):
+            return f"step {self.step} blocks writes to {table} while it rebuilds"
+        return None
+
+    def backfill(self, table, assignments, condition, key='id'):
+        """UPDATE table SET assignments WHERE condition, batch_size keys at a time
+
+        Rows the application writes meanwhile must already have the new values,
+        since the key range is fixed when the backfill starts.
+        """
+        self.batched(
+            table,
+            f"UPDATE {table} SET {assignments} WHERE {key} > %s AND {key} <= %s AND ({condition})",
+            f"backfill {table} SET {assignments} WHERE {condition}",
+            key
+        )
+
+    def batched(self, table, statement, description, key='id'):
+        """Run statement once per key range of table, batch_size keys at a time
+
+        statement takes the range as two parameters: key > %s AND key <= %s.
+        Each batch commits together with its position, so the gate only ever
+        waits on one small batch and an interrupted step resumes after the
+        last committed one. key must be an integer (leading primary key) column.
+        """
+        if not self._next_step():
+            return
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"SELECT MIN({key}), MAX({key}) FROM {table}")
+            low, high = cursor.fetchone()
+            self.connection.commit()
+            if low is None:
+                print(f"   ✅ [{self.step}] {description}: {table} is empty")
+                if not self.dry_run:
+                    self._record_step(cursor)
+                return
+
+            position = self.position if self.position is not None else low - 1
+            batches = -(-(high - position) // self.batch_size) if high > position else 0
+            if self.dry_run:
+                print(f"   [{self.step}] {description}: {key} {position + 1}..{high}, "
+                      f"{batches} batches of {self.batch_size}")
+                return
+
+            started = time.perf_counter()
+            updated = 0
+            for batch in range(1, batches + 1):
+                upper = min(position + self.batch_size, high)
+                cursor.execute(statement, (position, upper))
+                updated += cursor.rowcount
+                cursor.execute(
+                    "UPDATE schema_migrations SET backfill_position = %s WHERE version = %s",
+                    (upper, self.version)
+                )
+                self.connection.commit()
+                position = upper
+
+                if batch % 20 == 0 or batch == batches:
+                    elapsed = time.perf_counter() - started
+                    print(f"   ⏳ [{self.step}] {table}: {key} {upper}/{high}, {updated} rows ({elapsed:.1f}s)")
+                # Give the live gate room between batches
+                if self.pause and batch < batches:
+                    time.sleep(self.pause)
+
+            self._record_step(cursor)
+        except mysql.connector.Error:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"   ✅ [{self.step}] {description} ({elapsed:.0f} ms, {updated} rows)")
+
+
+# --- Database state ---
+
+def table_exists(connection, table):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SHOW TABLES LIKE %s", (table,))
+        return cursor.fetchone() is not None
+    finally:
+        cursor.close()
+
+
+def load_records(connection):
+    """schema_migrations rows by version ({} before the first run)"""
+    if not table_exists(connection, 'schema_migrations'):
+        return {}
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT * FROM schema_migrations ORDER BY version")
+        return {row['version']: row for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def record_baseline(connection, migrations, records):
+    cursor = connection.cursor()
+    try:
+        for migration in migrations:
+            if migration.version in records:
+                continue
+            cursor.execute(
+                """
+                    INSERT INTO schema_migrations (version, name, checksum, status, finished_at)
+                    VALUES (%s, %s, %s, 'baseline', NOW())
+                """,
+                (migration.version, migration.name, migration.checksum)
+            )
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def apply_schema_file(runner):
+    """Create the current schema from db_schema.sql in the configured database"""
+    with open(SCHEMA_FILE, 'r', encoding='utf-8') as file:
+        statements = split_statements(file.read())
+    for statement in statements:
+        # db_schema.sql names the database for phpMyAdmin; use the one DB_NAME points at
+        if re.match(r'(CREATE\s+DATABASE|USE)\b', statement, re.IGNORECASE):
+            continue
+        runner.execute(statement)
+
+
+def check_checksums(migrations, records):
+    """Stop if an applied migration was edited or is missing from migrations/"""
+    by_version = {migration.version: migration for migration in migrations}
+    problems = []
+    for version, record in records.items():
+        migration = by_version.get(version)
+        if migration is None:
+            problems.append(f"{version:04d}_{record['name']} is recorded but its file is missing")
+        elif migration.checksum != record['checksum']:
+            problems.append(f"{migration.label} changed after it was applied ({record['status']})")
+    if problems:
+        for problem in problems:
+            print(f"❌ {problem}")
+        raise SystemExit("💡 Never edit an applied migration - add a new one. Restore the original file to continue.")
+
+
+def print_status(migrations, records):
+    for migration in migrations:
+        record = records.get(migration.version)
+        if record is None:
+            state = "pending"
+        elif record['status'] == 'running':
+            state = f"interrupted after step {record['steps_done']}"
+        elif record['status'] == 'baseline':
+            state = "baseline"
+        else:
+            state = f"applied {record['finished_at']} ({record['duration_ms']} ms)"
+        changed = " ⚠️ changed" if record and record['checksum'] != migration.checksum else ""
+        print(f"   {migration.label}: {state}{changed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument('--dry-run', action='store_true', help="Show what would run without changing anything")
+    parser.add_argument('--status', action='store_true', help="List applied and pending migrations")
+    parser.add_argument('--baseline', type=int, metavar='VERSION',
+                        help="Record migrations up to VERSION as already applied by hand")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f"Rows per backfill batch (default: {BATCH_SIZE})")
+    parser.add_argument('--pause', type=float, default=BATCH_PAUSE,
+                        help=f"Seconds to sleep between backfill batches (default: {BATCH_PAUSE})")
+    parser.add_argument('--maintenance-window', action='store_true',
+                        help="Allow steps that block gate writes while a table is rebuilt (run off-hours)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🗃️  DATABASE MIGRATIONS{' (DRY RUN)' if args.dry_run else ''}")
+    print("=" * 60)
+
+    migrations = discover()
+    connection = get_db_connection()
+    if not connection:
+        raise SystemExit("❌ Failed to get database connection")
+
+    runner = Runner(connection, args.dry_run, args.batch_size, args.pause, args.maintenance_window)
+    started = time.perf_counter()
+    applied = []
+    cursor = connection.cursor()
+    try:
+        # One runner per database at a time
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (LOCK_NAME,))
+        if not cursor.fetchone()[0]:
+            raise SystemExit("❌ Another migrate.py is running against this database")
+
+        records = load_records(connection)
+        if args.status:
+            print_status(migrations, records)
+            return
+
+        if not args.dry_run:
+            cursor.execute(CREATE_MIGRATIONS_TABLE)
+
+        if args.baseline is not None:
+            baseline = [migration for migration in migrations if migration.version <= args.baseline]
+            if not args.dry_run:
+                record_baseline(connection, baseline, records)
+            print(f"✅ Recorded {len(baseline)} migrations up to {args.baseline:04d} as baseline")
+            return
+
+        if not records:
+            if table_exists(connection, 'visitors'):
+                print("❌ This database has tables but no migration history.")
+                print("💡 Record the migrations already applied by hand, e.g. 'python migrate.py --baseline 9',")
+                print("   then run 'python migrate.py' for the rest (see 'python migrate.py --status').")
+                sys.exit(1)
+            print(f"📁 Empty database - creating the current schema from {os.path.basename(SCHEMA_FILE)}")
+            apply_schema_file(runner)
+            if not args.dry_run:
+                record_baseline(connection, migrations, records)
+            print(f"✅ Recorded {len(migrations)} migrations as baseline")
+            return
+
+        check_checksums(migrations, records)
+        pending = [migration for migration in migrations
+                   if records.get(migration.version, {}).get('status') not in ('applied', 'baseline')]
+        if not pending:
+            print("✅ Database is up to date")
+
+        for migration in pending:
+            print(f"\n▶️  {migration.label}")
+            migration_started = time.perf_counter()
+            runner.start(migration, records.get(migration.version))
+            try:
+                migration.apply(runner)
+            except mysql.connector.Error as err:
+                print(f"❌ {migration.label} failed at step {runner.step}: {err}")
+                print("💡 Fix the cause and re-run 'python migrate.py' - it resumes at this step")
+                sys.exit(1)
+            except BlockingStepRefused as err:
+                print(f"❌ {migration.label} stopped: {err}")
+                print("💡 Run it off-hours with 'python migrate.py --maintenance-window' - it resumes at this step")
+                sys.exit(1)
+            duration = (time.perf_counter() - migration_started) * 1000
+            runner.finish(duration)
+            applied.append(migration)
+            print(f"   ⏱️  {duration / 1000:.1f}s")
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        cursor.fetchall()
+        cursor.close()
+        connection.close()
+
+    print(f"\n📊 Migration Summary:")
+    print(f"   Migrations: {len(migrations)}")
+    print(f"   {'Would apply' if args.dry_run else 'Applied'}: {len(applied)}")
+    print(f"   Time: {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Move inline visitor photos into the configured photo store
+Run this after migration 0003 (python migrate.py). Safe to re-run: it resumes
+from the rows that still have photo_data set.
+"""
+
+import time
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db_config import execute_query
+from photo_store import get_photo_store
+
+def migrate(batch_size, keep_source, pause):
+    """Copy photos batch by batch (id order), then clear the inline columns"""
+    store = get_photo_store()
+    last_id = 0
+    moved = 0
+    moved_bytes = 0
+
+    while True:
+        rows = execute_query(
+            """
+                SELECT id, photo_data, photo_mime_type, photo_thumb, photo_medium FROM visitors
+                WHERE id > %s AND photo_data IS NOT NULL
+                ORDER BY id LIMIT %s
+            """,
+            (last_id, batch_size),
+            fetch=True
+        )
+        if not rows:
+            break
+
+        done_ids = []
+        for row in rows:
+            last_id = row['id']
+            if not store.save(row['id'], 'full', row['photo_data'], row['photo_mime_type'] or 'image/jpeg'):
+                print(f"❌ Visitor {row['id']}: could not save photo, leaving it in place")
+                continue
+            for variant in ('thumb', 'medium'):
+                if row[f'photo_{variant}']:
+                    store.save(row['id'], variant, row[f'photo_{variant}'], 'image/jpeg')
+            done_ids.append(row['id'])
+            moved_bytes += len(row['photo_data'])
+
+        if done_ids and not keep_source:
+            placeholders = ", ".join(["%s"] * len(done_ids))
+            execute_query(
+                f"UPDATE visitors SET photo_data = NULL, photo_thumb = NULL, photo_medium = NULL WHERE id IN ({placeholders})",
+                tuple(done_ids)
+            )
+
+        moved += len(done_ids)
+        print(f"✅ Moved up to visitor {last_id} ({moved} photos, {moved_bytes / 1024 / 1024:.1f} MB)")
+
+        # Give the live gate room between batches
+        if pause:
+            time.sleep(pause)
+
+    return moved, moved_bytes
+
+def main():
+    parser = argparse.ArgumentParser(description="Move inline visitor photos into the photo store")
+    parser.add_argument('--batch-size', type=int, default=200, help="Rows per batch (default: 200)")
+    parser.add_argument('--pause', type=float, default=0.5, help="Seconds to sleep between batches (default: 0.5)")
+    parser.add_argument('--keep-source', action='store_true', help="Copy only; do not clear visitors.photo_data")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📦 PHOTO STORE MIGRATION")
+    print("=" * 60)
+
+    moved, moved_bytes = migrate(args.batch_size, args.keep_source, args.pause)
+
+    print(f"\n📊 Migration Summary:")
+    print(f"   Photos moved: {moved}")
+    print(f"   Data moved: {moved_bytes / 1024 / 1024:.1f} MB")
+    if moved and not args.keep_source:
+        print("💡 Run 'OPTIMIZE TABLE visitors;' in phpMyAdmin to reclaim the freed space")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+-- Store visitor photos as BLOBs instead of file paths
+
+ALTER TABLE visitors DROP COLUMN photo_path, ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE visitors
+ADD COLUMN photo_data LONGBLOB COMMENT 'Binary photo data',
+ADD COLUMN photo_mime_type VARCHAR(100) COMMENT 'Photo content type (image/jpeg, etc)',
+ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,7 @@
+-- Pre-generated photo size variants on the visitors table
+-- Existing rows are filled in by: python backfill_photo_variants.py
+
+ALTER TABLE visitors
+ADD COLUMN photo_thumb MEDIUMBLOB COMMENT 'Thumbnail JPEG (160px)' AFTER photo_mime_type,
+ADD COLUMN photo_medium MEDIUMBLOB COMMENT 'Medium JPEG (480px)' AFTER photo_thumb,
+ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,14 @@
+-- visitor_photos table used by the pluggable photo store
+-- Existing photos are moved by: python migrate_photos_to_store.py
+
+CREATE TABLE IF NOT EXISTS visitor_photos (
+    visitor_id INT NOT NULL,
+    variant ENUM('full', 'medium', 'thumb') NOT NULL,
+    mime_type VARCHAR(50) NOT NULL DEFAULT 'image/jpeg',
+    sha256 CHAR(64) NOT NULL,
+    byte_size INT NOT NULL,
+    data LONGBLOB NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (visitor_id, variant),
+    INDEX idx_sha256 (sha256)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
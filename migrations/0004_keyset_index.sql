@@ -0,0 +1,3 @@
+-- Index backing keyset pagination in /api/admin/filter_data
+
+ALTER TABLE visitors ADD INDEX idx_date_in_time_id (date, in_time, id), ALGORITHM=INPLACE, LOCK=NONE;
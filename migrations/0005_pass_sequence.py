@@ -0,0 +1,29 @@
+"""
+Race-free gate pass numbers: pass_number on visitors and the pass_sequence counter
+Existing visitors keep their id as their pass number, filled in batches.
+"""
+
+
+def upgrade(migration):
+    migration.execute("""
+        ALTER TABLE visitors
+        ADD COLUMN pass_number INT NULL COMMENT 'Printed gate pass number (from pass_sequence)',
+        ADD UNIQUE KEY uq_pass_number (pass_number),
+        ALGORITHM=INPLACE, LOCK=NONE
+    """)
+
+    migration.backfill('visitors', "pass_number = id", "pass_number IS NULL")
+
+    migration.execute("""
+        CREATE TABLE IF NOT EXISTS pass_sequence (
+            name VARCHAR(50) NOT NULL PRIMARY KEY,
+            last_value INT NOT NULL DEFAULT 0
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+    # Continue numbering after the highest existing pass
+    migration.execute("""
+        INSERT INTO pass_sequence (name, last_value)
+        SELECT 'visitor_pass', COALESCE(MAX(pass_number), 0) FROM visitors
+        ON DUPLICATE KEY UPDATE last_value = GREATEST(last_value, VALUES(last_value))
+    """)
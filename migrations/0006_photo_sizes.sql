@@ -0,0 +1,6 @@
+-- Record the uploaded size of each photo before ingest normalization
+
+ALTER TABLE visitor_photos
+MODIFY COLUMN byte_size INT NOT NULL COMMENT 'Stored size in bytes',
+ADD COLUMN original_size INT NULL COMMENT 'Uploaded size before normalization' AFTER byte_size,
+ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,11 @@
+-- Full-text index backing /api/admin/search
+--
+-- InnoDB keeps the index current on every INSERT/UPDATE, so no extra upkeep
+-- is needed. Words shorter than innodb_ft_min_token_size (default 3) are not
+-- indexed; changing it needs a MySQL restart and rebuilding this index.
+-- The first FULLTEXT index rebuilds the visitors table and MySQL cannot build
+-- it without blocking writes (LOCK=SHARED) - run off-hours.
+
+ALTER TABLE visitors
+    ADD FULLTEXT INDEX ft_visitor_search (name, company, designation, to_meet, department, vehicle_number),
+    ALGORITHM=INPLACE, LOCK=SHARED;
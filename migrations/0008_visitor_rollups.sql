@@ -0,0 +1,13 @@
+-- Daily rollups behind /api/admin/analytics
+-- History is filled in by: python rebuild_rollups.py
+
+CREATE TABLE IF NOT EXISTS visitor_rollups (
+    day DATE NOT NULL,
+    dimension ENUM('total', 'department', 'host', 'hour') NOT NULL,
+    dim_key VARCHAR(255) NOT NULL DEFAULT '' COMMENT 'Department, host name or hour (00-23); empty for total',
+    visits INT NOT NULL DEFAULT 0,
+    exits INT NOT NULL DEFAULT 0,
+    dwell_seconds BIGINT NOT NULL DEFAULT 0 COMMENT 'Sum of out_time - in_time over exits',
+    PRIMARY KEY (day, dimension, dim_key),
+    INDEX idx_dimension_day (dimension, day)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
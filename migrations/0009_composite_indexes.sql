@@ -0,0 +1,26 @@
+-- Composite indexes for the hot lookups in app.py
+-- Check the plans afterwards with: python check_query_plans.py
+--
+-- Each new index starts with the column of the index it replaces, so no
+-- query loses its access path:
+--   visitors (mobile, created_at)   last / active visit by mobile, newest first
+--   visitors (out_time, in_time)    visitors inside (out_time IS NULL), by entry time
+--   bookings (visitor_mobile, status, booking_time)
+--                                   pending booking for a mobile, newest first
+--   bookings (status, booking_time) pending bookings list, newest first
+-- idx_date is a prefix of idx_date_in_time_id and is dropped too.
+
+ALTER TABLE visitors
+    ADD INDEX idx_mobile_created_at (mobile, created_at),
+    ADD INDEX idx_out_time_in_time (out_time, in_time),
+    DROP INDEX idx_mobile,
+    DROP INDEX idx_out_time,
+    DROP INDEX idx_date,
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE bookings
+    ADD INDEX idx_mobile_status (visitor_mobile, status, booking_time),
+    ADD INDEX idx_status_booking_time (status, booking_time),
+    DROP INDEX idx_mobile,
+    DROP INDEX idx_status,
+    ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,136 @@
+"""
+Monthly RANGE partitions on visitors and bookings (see partitions.py)
+Partitioned InnoDB tables cannot have FULLTEXT indexes, so admin search moves
+to visitor_search first: a copy of the searchable columns of each visit, which
+never change after entry. Unique keys must contain the partition column, so
+the primary keys become (id, date) and (id, booking_time) and uq_pass_number
+becomes (pass_number, date); pass_sequence keeps pass numbers unique.
+
+Partitioning an existing table in place rebuilds it with writes blocked, so
+each table is rebuilt online instead:
+    1. an empty partitioned copy, <table>_new
+    2. triggers that mirror every insert, update and delete into it
+    3. a batched copy of the existing rows (INSERT IGNORE: rows the triggers
+       already wrote are newer and win)
+    4. RENAME TABLE swapping the two in one step, then the old table dropped
+The gate keeps writing throughout; it only waits on one copy batch at a time
+and on the rename itself. Needs space for a second copy of each table, and
+the TRIGGER privilege (SUPER as well when binary logging is on, unless
+log_bin_trust_function_creators=1). Deploy the matching app version right
+after. 'python maintain_partitions.py --status' lists the partitions.
+"""
+
+import os
+from datetime import date
+
+import partitions
+
+MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+SEARCH_COLUMNS = "name, company, designation, to_meet, department, vehicle_number"
+COPY_TO_SEARCH = f"""
+    INSERT IGNORE INTO visitor_search (visitor_id, date, {SEARCH_COLUMNS})
+    SELECT id, date, {SEARCH_COLUMNS} FROM visitors
+"""
+
+
+def first_month(migration, table, column):
+    first = migration.query(f"SELECT MIN({column}) FROM {table}")[0][0]
+    return (first.date() if first else date.today()).replace(day=1)
+
+
+def table_columns(migration, table):
+    rows = migration.query(
+        """
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ORDER BY ORDINAL_POSITION
+        """,
+        (table,)
+    )
+    return [f"`{name}`" for name, in rows]
+
+
+def mirror_triggers(table, column, columns):
+    """(name, CREATE TRIGGER) keeping <table>_new in step with table"""
+    shadow = f"{table}_new"
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"NEW.{name}" for name in columns)
+    replace_new = f"REPLACE INTO {shadow} ({column_list}) VALUES ({new_values})"
+    return [
+        (f"{table}_mirror_insert",
+         f"CREATE TRIGGER {table}_mirror_insert AFTER INSERT ON {table} FOR EACH ROW {replace_new}"),
+        (f"{table}_mirror_update",
+         f"""CREATE TRIGGER {table}_mirror_update AFTER UPDATE ON {table} FOR EACH ROW
+            BEGIN
+                IF NOT (OLD.{column} <=> NEW.{column}) THEN
+                    DELETE FROM {shadow} WHERE id = OLD.id AND {column} = OLD.{column};
+                END IF;
+                {replace_new};
+            END"""),
+        (f"{table}_mirror_delete",
+         f"CREATE TRIGGER {table}_mirror_delete AFTER DELETE ON {table} FOR EACH ROW "
+         f"DELETE FROM {shadow} WHERE id = OLD.id AND {column} = OLD.{column}"),
+    ]
+
+
+def partition_online(migration, table, column, keys):
+    """Rebuild table as a partitioned copy while the gate keeps writing to it"""
+    shadow = f"{table}_new"
+    last_month = partitions.add_months(date.today().replace(day=1), MONTHS_AHEAD)
+    clause = partitions.partition_clause(column, first_month(migration, table, column), last_month)
+    columns = table_columns(migration, table)
+    column_list = ", ".join(columns)
+
+    migration.execute(f"CREATE TABLE IF NOT EXISTS {shadow} LIKE {table}")
+    # Still empty, so rebuilding it blocks nothing
+    migration.execute(f"ALTER TABLE {shadow}\n    {keys},\n    LOCK=EXCLUSIVE\n{clause}")
+
+    for name, create in mirror_triggers(table, column, columns):
+        migration.execute(f"DROP TRIGGER IF EXISTS {name}")
+        migration.execute(create)
+
+    migration.batched(
+        table,
+        f"INSERT IGNORE INTO {shadow} ({column_list}) SELECT {column_list} FROM {table} "
+        f"WHERE id > %s AND id <= %s",
+        f"copy {table} to {shadow}"
+    )
+
+    migration.execute(f"RENAME TABLE {table} TO {table}_old, {shadow} TO {table}")
+    # Takes the mirror triggers with it
+    migration.execute(f"DROP TABLE IF EXISTS {table}_old")
+
+
+def upgrade(migration):
+    # Created with its FULLTEXT index: adding one later would block writes while it builds
+    migration.execute(f"""
+        CREATE TABLE IF NOT EXISTS visitor_search (
+            visitor_id INT NOT NULL PRIMARY KEY,
+            date TIMESTAMP NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            company VARCHAR(255),
+            designation VARCHAR(100),
+            to_meet VARCHAR(255) NOT NULL,
+            department VARCHAR(100) NOT NULL,
+            vehicle_number VARCHAR(50) DEFAULT '-',
+            FULLTEXT INDEX ft_visitor_search ({SEARCH_COLUMNS})
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+    migration.batched('visitors', COPY_TO_SEARCH + " WHERE id > %s AND id <= %s", "copy visitors to visitor_search")
+
+    migration.execute("ALTER TABLE visitors DROP INDEX ft_visitor_search, ALGORITHM=INPLACE, LOCK=NONE")
+
+    partition_online(
+        migration, 'visitors', 'date',
+        "DROP PRIMARY KEY, ADD PRIMARY KEY (id, date),\n    "
+        "DROP INDEX uq_pass_number, ADD UNIQUE KEY uq_pass_number (pass_number, date)"
+    )
+
+    partition_online(
+        migration, 'bookings', 'booking_time',
+        "DROP PRIMARY KEY, ADD PRIMARY KEY (id, booking_time)"
+    )
+
+    # Visits recorded while the copies ran
+    migration.execute(COPY_TO_SEARCH + " WHERE id > (SELECT COALESCE(MAX(visitor_id), 0) FROM visitor_search)")
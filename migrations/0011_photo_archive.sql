@@ -0,0 +1,6 @@
+-- Cold tier for old photos: the archive file each archived photo moved to
+-- Photos are moved by: python archive_photos.py
+
+ALTER TABLE visitor_photos
+ADD COLUMN archived_in VARCHAR(64) NULL COMMENT 'Archive file holding the photo (cold tier)' AFTER data,
+ALGORITHM=INPLACE, LOCK=NONE;
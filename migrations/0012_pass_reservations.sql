@@ -0,0 +1,14 @@
+-- One row per reserved pass number, marked with the visit that used it
+-- uq_pass_number became (pass_number, date) when visitors was partitioned, so
+-- the database alone no longer stops a printed pass being entered twice.
+-- /api/entry consumes the reservation in the same transaction as the visitor
+-- insert and rejects numbers that were never reserved, have expired or are used.
+-- Numbers handed out before this migration have no row and are rejected.
+
+CREATE TABLE IF NOT EXISTS pass_reservations (
+    pass_number INT NOT NULL PRIMARY KEY,
+    reserved_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    visitor_id INT NULL COMMENT 'Visit that used the number; NULL while unused',
+    consumed_at TIMESTAMP NULL,
+    INDEX idx_visitor_id (visitor_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,103 @@
+"""
+In-memory prefix index of known visitor mobile numbers
+Backs /api/suggest_mobile. Mobiles are kept in a sorted list so the numbers
+starting with a prefix form one contiguous range found with bisect; that range
+is then ranked by the most recent visit or booking. MySQL is never asked for
+LIKE 'prefix%' scans.
+
+The index is loaded on a background thread. A forked worker that inherited
+an index still loading starts its own load on first use.
+"""
+
+import os
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+
+class MobileIndex:
+    """Known mobiles with the latest name/company seen for each"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mobiles = []  # sorted
+        self._info = {}     # mobile -> {'mobile', 'name', 'company', 'last_seen'}
+        self.loaded = False
+        self._loader = None
+        self._loader_pid = None
+        self._start_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.after_fork)
+
+    def start_loader(self, loader):
+        """Run loader() (which calls load()) on a daemon thread, once per process until loaded"""
+        self._loader = loader
+        self._start_loader()
+
+    def _start_loader(self):
+        if self.loaded or self._loader is None or self._loader_pid == os.getpid():
+            return
+        with self._start_lock:
+            if not self.loaded and self._loader_pid != os.getpid():
+                self._loader_pid = os.getpid()
+                threading.Thread(target=self._loader, name='mobile-index', daemon=True).start()
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    def load(self, rows):
+        """Rebuild from rows with mobile, name, company and last_seen (naive datetime)"""
+        info = {}
+        for row in rows:
+            current = info.get(row['mobile'])
+            if current is None or row['last_seen'] > current['last_seen']:
+                info[row['mobile']] = {
+                    'mobile': row['mobile'],
+                    'name': row['name'],
+                    'company': row['company'] or '',
+                    'last_seen': row['last_seen']
+                }
+        mobiles = sorted(info)
+        with self._lock:
+            self._info = info
+            self._mobiles = mobiles
+            self.loaded = True
+
+    def record(self, mobile, name, company, last_seen):
+        """Add or refresh a mobile after an entry or booking"""
+        self._start_loader()
+        with self._lock:
+            current = self._info.get(mobile)
+            if current is None:
+                insort(self._mobiles, mobile)
+            elif current['last_seen'] > last_seen:
+                return
+            self._info[mobile] = {
+                'mobile': mobile,
+                'name': name,
+                'company': company or '',
+                'last_seen': last_seen
+            }
+
+    def suggest(self, prefix, limit=8):
+        """Up to limit known visitors whose mobile starts with prefix, most recent first"""
+        self._start_loader()
+        with self._lock:
+            lo = bisect_left(self._mobiles, prefix)
+            # Smallest string greater than every string starting with prefix
+            hi = bisect_left(self._mobiles, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+            candidates = (self._info[self._mobiles[i]] for i in range(lo, hi))
+            best = heapq.nlargest(limit, candidates, key=lambda item: item['last_seen'])
+        return [{'mobile': b['mobile'], 'name': b['name'], 'company': b['company']} for b in best]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._mobiles)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'mobiles': len(self._mobiles),
+                'loaded': self.loaded
+            }
@@ -0,0 +1,156 @@
+"""
+In-memory registry of visitors currently on campus
+Loaded once at startup, kept current by /api/entry, /api/exit and
+/api/checkout_visitor, and reconciled against the database periodically so
+changes made by other processes (or directly in phpMyAdmin) are picked up.
+A forked worker starts its own reconciler on first use (threads do not
+survive a fork); until then it serves what it inherited.
+"""
+
+import os
+import time
+import threading
+
+
+class OccupancyRegistry:
+    """Active visitors indexed by visitor id and by mobile number"""
+
+    def __init__(self, loader):
+        # loader() returns the active visitor rows from the database, or None on error
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._by_mobile = {}
+        self._journal = None  # changes made while a reconcile is reading the DB
+        self.loaded = False
+        self.last_reconciled = None
+        self.reconciles = 0
+        self._interval = None
+        self._reconciler_pid = None
+        self._start_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.after_fork)
+
+    # --- Updates ---
+
+    def add(self, row):
+        """Register a visitor who has just entered"""
+        self._start_reconciler()
+        with self._lock:
+            self._add(row)
+            if self._journal is not None:
+                self._journal.append(('add', row))
+
+    def remove(self, visitor_id):
+        """Drop a visitor who has exited; returns their row or None"""
+        self._start_reconciler()
+        with self._lock:
+            row = self._remove(visitor_id)
+            if self._journal is not None:
+                self._journal.append(('remove', visitor_id))
+            return row
+
+    def _add(self, row):
+        self._by_id[row['id']] = row
+        self._by_mobile.setdefault(row['mobile'], {})[row['id']] = row
+
+    def _remove(self, visitor_id):
+        row = self._by_id.pop(visitor_id, None)
+        if row is not None:
+            visits = self._by_mobile.get(row['mobile'], {})
+            visits.pop(visitor_id, None)
+            if not visits:
+                self._by_mobile.pop(row['mobile'], None)
+        return row
+
+    # --- Lookups ---
+
+    def get(self, visitor_id):
+        with self._lock:
+            return self._by_id.get(visitor_id)
+
+    def find_by_mobile(self, mobile):
+        """Latest active visit for a mobile number, or None"""
+        self._start_reconciler()
+        with self._lock:
+            visits = self._by_mobile.get(mobile)
+            if not visits:
+                return None
+            return max(visits.values(), key=lambda row: (row['in_time'], row['id']))
+
+    def list(self):
+        """All active visitors, most recent entry first"""
+        self._start_reconciler()
+        with self._lock:
+            rows = list(self._by_id.values())
+        return sorted(rows, key=lambda row: (row['in_time'], row['id']), reverse=True)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_id)
+
+    # --- Reconcile ---
+
+    def reconcile(self):
+        """Reload from the database, keeping any updates made during the reload"""
+        with self._lock:
+            self._journal = []
+
+        rows = self._loader()
+
+        with self._lock:
+            journal, self._journal = self._journal, None
+            if rows is None:
+                print("⚠️ Occupancy reconcile failed; keeping current registry")
+                return False
+
+            self._by_id = {}
+            self._by_mobile = {}
+            for row in rows:
+                self._add(row)
+            for action, value in journal:
+                if action == 'add':
+                    self._add(value)
+                else:
+                    self._remove(value)
+
+            self.loaded = True
+            self.last_reconciled = time.time()
+            self.reconciles += 1
+        return True
+
+    def start_reconciler(self, interval):
+        """Reconcile every interval seconds on a daemon thread, one per process"""
+        self._interval = interval
+        self._start_reconciler()
+
+    def _start_reconciler(self):
+        if self._interval is None or self._reconciler_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._reconciler_pid != os.getpid():
+                self._reconciler_pid = os.getpid()
+                threading.Thread(target=self._reconcile_loop, name='occupancy-reconcile', daemon=True).start()
+
+    def _reconcile_loop(self):
+        while True:
+            time.sleep(self._interval)
+            try:
+                self.reconcile()
+            except Exception as e:
+                print(f"⚠️ Occupancy reconcile error: {e}")
+
+    def after_fork(self):
+        # The parent's reconcile, if one was running, does not continue here
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._journal = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'active': len(self._by_id),
+                'loaded': self.loaded,
+                'last_reconciled': self.last_reconciled,
+                'reconciles': self.reconciles
+            }
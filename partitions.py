@@ -0,0 +1,93 @@
+"""
+Monthly RANGE partitions for visitors and bookings
+Each month lives in its own partition (pYYYYMM), so a date-range query only
+reads the months it covers and old months can be backed up or archived on
+their own. p_future (VALUES LESS THAN MAXVALUE) catches anything past the last
+month partition, so inserts never fail when maintenance is late;
+maintain_partitions.py splits the coming months out of it while it is still
+empty, which is instant.
+
+Partitions are on UNIX_TIMESTAMP(column) because the columns are TIMESTAMPs.
+Boundaries are evaluated in the session time zone, the same one the app
+writes its wall-clock times in.
+"""
+
+from datetime import date
+
+# table -> TIMESTAMP column it is partitioned by
+PARTITIONED_TABLES = {
+    'visitors': 'date',
+    'bookings': 'booking_time',
+}
+FUTURE_PARTITION = 'p_future'
+
+
+def add_months(month, count):
+    years, month_index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def months_between(first, last):
+    """First days of every month from first to last, inclusive"""
+    month = first.replace(day=1)
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def month_from_name(name):
+    """date for a pYYYYMM partition name, None for anything else"""
+    if len(name) == 7 and name[0] == 'p' and name[1:].isdigit():
+        return date(int(name[1:5]), int(name[5:]), 1)
+    return None
+
+
+def month_definition(month):
+    """Partition holding every row before the end of month"""
+    return (f"PARTITION {partition_name(month)} "
+            f"VALUES LESS THAN (UNIX_TIMESTAMP('{add_months(month, 1):%Y-%m-%d} 00:00:00'))")
+
+
+def future_definition():
+    return f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE"
+
+
+def partition_clause(column, first_month, last_month):
+    """PARTITION BY clause with one partition per month plus p_future"""
+    definitions = [month_definition(month) for month in months_between(first_month, last_month)]
+    definitions.append(future_definition())
+    return (f"PARTITION BY RANGE (UNIX_TIMESTAMP({column})) (\n    "
+            + ",\n    ".join(definitions) + "\n)")
+
+
+def list_partitions(cursor, table):
+    """(name, approximate rows, bytes) per partition, in order; [] if not partitioned"""
+    cursor.execute(
+        """
+            SELECT PARTITION_NAME, TABLE_ROWS, DATA_LENGTH + INDEX_LENGTH
+            FROM information_schema.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+            ORDER BY PARTITION_ORDINAL_POSITION
+        """,
+        (table,)
+    )
+    return [(name, rows or 0, size or 0) for name, rows, size in cursor.fetchall()]
+
+
+def missing_months(partitions, through_month, current_month):
+    """Months up to through_month that still need a partition split out of p_future"""
+    months = [month_from_name(name) for name, _, _ in partitions]
+    months = [month for month in months if month]
+    first = add_months(max(months), 1) if months else current_month
+    return list(months_between(first, through_month)) if first <= through_month else []
+
+
+def reorganize_statement(table, months):
+    """Split months out of p_future (instant while p_future is empty)"""
+    definitions = [month_definition(month) for month in months] + [future_definition()]
+    return (f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO (\n    "
+            + ",\n    ".join(definitions) + "\n)")
@@ -0,0 +1,102 @@
+"""
+Gate pass number allocation
+Numbers come from a single-row counter in pass_sequence. Incrementing it with
+LAST_INSERT_ID(expr) is one primary-key row update, so every gate terminal gets
+a unique number in constant time, however large visitors grows.
+
+Each number handed out gets a row in pass_reservations. /api/entry consumes it
+in the same transaction as the visitor insert, so a printed pass is used at
+most once, whichever terminal enters it; visitors itself only keeps
+(pass_number, date) unique since it was partitioned.
+"""
+
+import os
+from db_config import get_db_connection, execute_query
+
+PASS_SEQUENCE = 'visitor_pass'
+# A pass printed but not entered within this long is no longer accepted
+RESERVATION_TTL_HOURS = int(os.getenv("PASS_RESERVATION_TTL_HOURS", 24))
+
+
+class PassNumberRejected(Exception):
+    """The pass number was never reserved, has expired or is already used"""
+
+
+def reserve_pass_number():
+    """Atomically reserve the next pass number, or return None on failure"""
+    connection = get_db_connection()
+    if not connection:
+        return None
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "UPDATE pass_sequence SET last_value = LAST_INSERT_ID(last_value + 1) WHERE name = %s",
+            (PASS_SEQUENCE,)
+        )
+        if cursor.rowcount == 0:
+            print("❌ pass_sequence is not initialised - run python migrate.py")
+            connection.rollback()
+            return None
+
+        # LAST_INSERT_ID() is per-connection, so this reads our own increment
+        cursor.execute("SELECT LAST_INSERT_ID()")
+        pass_number = cursor.fetchone()[0]
+        cursor.execute("INSERT INTO pass_reservations (pass_number) VALUES (%s)", (pass_number,))
+        connection.commit()
+        return pass_number
+    except Exception as e:
+        print(f"❌ Pass number reservation error: {e}")
+        connection.rollback()
+        return None
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def insert_visitor(query, params, pass_number):
+    """Run the visitor INSERT and consume pass_number in one transaction
+
+    Returns the new visitor id, or None on a database error. Raises
+    PassNumberRejected, with nothing written, if pass_number is not an unused
+    reservation from the last RESERVATION_TTL_HOURS. Two terminals entering
+    the same number serialize on its reservation row; the second is rejected.
+    """
+    connection = get_db_connection()
+    if not connection:
+        return None
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(query, params)
+        visitor_id = cursor.lastrowid
+        cursor.execute(
+            """
+                UPDATE pass_reservations SET visitor_id = %s, consumed_at = NOW()
+                WHERE pass_number = %s AND visitor_id IS NULL
+                  AND reserved_at >= NOW() - INTERVAL %s HOUR
+            """,
+            (visitor_id, pass_number, RESERVATION_TTL_HOURS)
+        )
+        if cursor.rowcount == 0:
+            connection.rollback()
+            raise PassNumberRejected(pass_number)
+        connection.commit()
+        return visitor_id
+    except PassNumberRejected:
+        raise
+    except Exception as e:
+        print(f"❌ Visitor insert error: {e}")
+        connection.rollback()
+        return None
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def release_pass_number(visitor_id):
+    """Make a deleted visit's pass number usable again (entry failed after the insert)"""
+    return execute_query(
+        "UPDATE pass_reservations SET visitor_id = NULL, consumed_at = NULL WHERE visitor_id = %s",
+        (visitor_id,)
+    )
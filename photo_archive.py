@@ -0,0 +1,68 @@
+"""
+Cold tier for old visitor photos
+archive_photos.py moves the photos of months older than PHOTO_ARCHIVE_AFTER_DAYS
+out of the photo store into ZIP files under PHOTO_ARCHIVE_PATH, one or more per
+month. The visitor_photos row stays with its bytes cleared and archived_in
+naming the file, so load_visitor_photo() finds archived photos by the same key.
+
+Archive files are written once and never modified (a later run for the same
+month writes a new file), so backups copy each of them once and readers can
+keep them open. JPEGs are already compressed, so entries are stored as-is.
+"""
+
+import os
+import zipfile
+import threading
+from collections import OrderedDict
+from photo_store import PhotoRecord, MIME_EXTENSIONS
+from db_config import execute_query
+
+ARCHIVED_PHOTO_QUERY = """
+    SELECT archived_in, mime_type, sha256, byte_size FROM visitor_photos
+    WHERE visitor_id = %s AND variant = %s AND archived_in IS NOT NULL
+"""
+
+
+def member_name(visitor_id, variant, mime_type):
+    return f"{visitor_id}/{variant}{MIME_EXTENSIONS.get(mime_type, '.jpg')}"
+
+
+class PhotoArchive:
+    """Reads photos back from archive files, keeping the last few open"""
+
+    def __init__(self, root, max_open=8):
+        self.root = root
+        self.max_open = max_open
+        self._open = OrderedDict()  # file name -> ZipFile, least recently used first
+        self._lock = threading.Lock()
+
+    def path_for(self, name):
+        return os.path.join(self.root, name)
+
+    def load(self, visitor_id, variant):
+        """Return a PhotoRecord for an archived photo, or None if it is not archived"""
+        rows = execute_query(ARCHIVED_PHOTO_QUERY, (visitor_id, variant), fetch=True)
+        if not rows:
+            return None
+        row = rows[0]
+        try:
+            data = self._read(row['archived_in'], member_name(visitor_id, variant, row['mime_type']))
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            print(f"⚠️ Archived photo missing for visitor {visitor_id} ({variant}) in {row['archived_in']}: {e}")
+            return None
+        return PhotoRecord(data, None, row['mime_type'], row['sha256'], row['byte_size'])
+
+    def _read(self, name, member):
+        # Cold reads are rare; one lock keeps evicting and reading simple
+        with self._lock:
+            archive = self._open.pop(name, None)
+            if archive is None:
+                archive = zipfile.ZipFile(self.path_for(name))
+                while len(self._open) >= self.max_open:
+                    self._open.popitem(last=False)[1].close()
+            self._open[name] = archive
+            return archive.read(member)
+
+
+def get_photo_archive():
+    return PhotoArchive(os.getenv("PHOTO_ARCHIVE_PATH", "visitor_photo_archive"))
@@ -0,0 +1,260 @@
+"""
+Visitor photo storage backends
+Photos live outside the visitors table so visitor queries never drag BLOBs along.
+
+Select the backend with PHOTO_STORE in .env:
+    table       - bytes stored in the visitor_photos table (default)
+    filesystem  - bytes stored under PHOTO_STORE_PATH, named by SHA-256 so
+                  repeat captures are stored once; visitor_photos keeps the index
+"""
+
+import os
+import time
+import hashlib
+import tempfile
+from collections import namedtuple, deque
+from db_config import execute_query, get_db_connection
+
+# data is None for filesystem photos; path is None for table photos
+PhotoRecord = namedtuple('PhotoRecord', 'data path mime_type sha256 byte_size')
+
+# Seconds a replaced photo file is kept, so a request that already looked up
+# its path can still send it
+DELETE_GRACE_SECONDS = float(os.getenv("PHOTO_DELETE_GRACE_SECONDS", 30))
+
+MIME_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+}
+
+UPSERT_PHOTO_QUERY = """
+    INSERT INTO visitor_photos (visitor_id, variant, mime_type, sha256, byte_size, original_size, data)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE mime_type = VALUES(mime_type), sha256 = VALUES(sha256),
+                            byte_size = VALUES(byte_size), data = VALUES(data), archived_in = NULL,
+                            original_size = COALESCE(VALUES(original_size), original_size)
+"""
+
+# Rewrites an existing photo, unless it has been archived meanwhile
+REPLACE_PHOTO_QUERY = """
+    UPDATE visitor_photos
+    SET mime_type = %s, sha256 = %s, byte_size = %s, data = %s, original_size = %s
+    WHERE visitor_id = %s AND variant = %s AND archived_in IS NULL
+"""
+
+
+class PhotoStore:
+    """Interface for photo backends. Photos are keyed by (visitor_id, variant)."""
+
+    def save(self, visitor_id, variant, data, mime_type, original_size=None):
+        """Store photo bytes; return the SHA-256 hex digest or None on failure
+
+        original_size is the uploaded size before normalization, when known.
+        """
+        row = self._prepare(visitor_id, variant, data, mime_type, original_size)
+        return row[3] if execute_query(UPSERT_PHOTO_QUERY, row) else None
+
+    def load(self, visitor_id, variant):
+        """Return a PhotoRecord, or None if the photo does not exist"""
+        raise NotImplementedError
+
+    def load_bytes(self, visitor_id, variant):
+        """Return (bytes, mime_type) regardless of backend, or (None, None)"""
+        record = self.load(visitor_id, variant)
+        if record is None:
+            return None, None
+        if record.data is not None:
+            return record.data, record.mime_type
+        with open(record.path, 'rb') as f:
+            return f.read(), record.mime_type
+
+    def save_batch(self, photos):
+        """Store many photos in one transaction
+
+        photos is a list of (visitor_id, variant, data, mime_type) tuples.
+        Returns True if the batch was committed.
+        """
+        rows = [self._prepare(visitor_id, variant, data, mime_type)
+                for visitor_id, variant, data, mime_type in photos]
+        return upsert_rows(rows)
+
+    def replace_batch(self, photos):
+        """Rewrite existing photos in one transaction, leaving archived ones alone
+
+        photos is a list of (visitor_id, variant, data, mime_type, original_size)
+        tuples. Returns the (visitor_id, variant) pairs written, or None if the
+        batch was not committed.
+        """
+        rows = [self._prepare(visitor_id, variant, data, mime_type, original_size)
+                for visitor_id, variant, data, mime_type, original_size in photos]
+        return replace_rows(rows)
+
+    def _prepare(self, visitor_id, variant, data, mime_type, original_size=None):
+        """Return the visitor_photos row for a photo (writing any file it needs)"""
+        raise NotImplementedError
+
+
+def upsert_rows(rows):
+    """Write visitor_photos rows on one connection and commit them together"""
+    connection = get_db_connection()
+    if not connection:
+        return False
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(UPSERT_PHOTO_QUERY, rows)
+        connection.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Photo batch write error: {e}")
+        connection.rollback()
+        return False
+    finally:
+        cursor.close()
+        connection.close()
+
+
+def replace_rows(rows):
+    """Update visitor_photos rows that are not archived; return the keys written"""
+    connection = get_db_connection()
+    if not connection:
+        return None
+    cursor = connection.cursor()
+    try:
+        written = []
+        for visitor_id, variant, mime_type, sha256, byte_size, original_size, data in rows:
+            cursor.execute(REPLACE_PHOTO_QUERY,
+                           (mime_type, sha256, byte_size, data, original_size, visitor_id, variant))
+            if cursor.rowcount:
+                written.append((visitor_id, variant))
+        connection.commit()
+        return written
+    except Exception as e:
+        print(f"❌ Photo batch write error: {e}")
+        connection.rollback()
+        return None
+    finally:
+        cursor.close()
+        connection.close()
+
+
+class TablePhotoStore(PhotoStore):
+    """Photos stored as BLOBs in the dedicated visitor_photos table"""
+
+    def _prepare(self, visitor_id, variant, data, mime_type, original_size=None):
+        sha256 = hashlib.sha256(data).hexdigest()
+        return (visitor_id, variant, mime_type, sha256, len(data), original_size, data)
+
+    def load(self, visitor_id, variant):
+        rows = execute_query(
+            """
+                SELECT data, mime_type, sha256, byte_size FROM visitor_photos
+                WHERE visitor_id = %s AND variant = %s AND data IS NOT NULL
+            """,
+            (visitor_id, variant),
+            fetch=True
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        return PhotoRecord(row['data'], None, row['mime_type'], row['sha256'], row['byte_size'])
+
+
+class FilesystemPhotoStore(PhotoStore):
+    """Content-addressed files under root; identical captures share one file"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, sha256, mime_type):
+        extension = MIME_EXTENSIONS.get(mime_type, '.jpg')
+        return os.path.join(self.root, sha256[:2], sha256 + extension)
+
+    def _prepare(self, visitor_id, variant, data, mime_type, original_size=None):
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.path_for(sha256, mime_type)
+
+        if not os.path.exists(path):
+            # Write to a temp file and rename so readers never see a partial photo
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
+
+        return (visitor_id, variant, mime_type, sha256, len(data), original_size, None)
+
+    def remove_unreferenced(self, sha256, mime_type):
+        """Delete a photo file once no visitor_photos row points at it"""
+        rows = execute_query(
+            "SELECT COUNT(*) AS refs FROM visitor_photos WHERE sha256 = %s AND archived_in IS NULL",
+            (sha256,),
+            fetch=True
+        )
+        if rows and rows[0]['refs'] == 0:
+            path = self.path_for(sha256, mime_type)
+            if os.path.exists(path):
+                os.unlink(path)
+
+    def load(self, visitor_id, variant):
+        rows = execute_query(
+            """
+                SELECT mime_type, sha256, byte_size FROM visitor_photos
+                WHERE visitor_id = %s AND variant = %s AND archived_in IS NULL
+            """,
+            (visitor_id, variant),
+            fetch=True
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        path = self.path_for(row['sha256'], row['mime_type'])
+        if not os.path.exists(path):
+            print(f"⚠️ Photo file missing for visitor {visitor_id} ({variant}): {path}")
+            return None
+        return PhotoRecord(None, path, row['mime_type'], row['sha256'], row['byte_size'])
+
+
+class PendingRemovals:
+    """Old photo files to remove_unreferenced() once the grace period has passed
+
+    Used by the batch jobs that replace or archive filesystem photos. Call
+    remove_due() between batches and flush() at the end of the run.
+    """
+
+    def __init__(self, store, grace=DELETE_GRACE_SECONDS):
+        self.store = store
+        self.grace = grace
+        self._pending = deque()  # (queued at, sha256, mime_type), oldest first
+
+    def add(self, sha256, mime_type):
+        self._pending.append((time.monotonic(), sha256, mime_type))
+
+    def remove_due(self):
+        while self._pending and time.monotonic() - self._pending[0][0] >= self.grace:
+            _, sha256, mime_type = self._pending.popleft()
+            self.store.remove_unreferenced(sha256, mime_type)
+
+    def flush(self):
+        """Wait out the grace period of the newest file, then remove everything"""
+        if self._pending:
+            wait = self.grace - (time.monotonic() - self._pending[-1][0])
+            if wait > 0:
+                print(f"⏳ Waiting {wait:.0f}s before deleting {len(self._pending)} replaced photo files")
+                time.sleep(wait)
+        self.remove_due()
+
+
+def get_photo_store():
+    """Build the photo store selected by PHOTO_STORE"""
+    backend = os.getenv("PHOTO_STORE", "table").lower()
+    if backend == 'filesystem':
+        root = os.getenv("PHOTO_STORE_PATH", os.getenv("UPLOAD_FOLDER", "visitor_photos"))
+        return FilesystemPhotoStore(root)
+    if backend == 'table':
+        return TablePhotoStore()
+    raise ValueError(f"Unknown PHOTO_STORE backend: {backend}")
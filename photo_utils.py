@@ -0,0 +1,63 @@
+"""
+Photo processing helpers
+Normalizes captures at ingest and generates the smaller size variants served
+by /api/photo/<visitor_id>
+"""
+
+import os
+from io import BytesIO
+from PIL import Image, ImageOps
+
+# Size variants: name -> longest edge in pixels
+# 'full' is the normalized capture (bounded by PHOTO_MAX_DIMENSION)
+PHOTO_SIZES = {
+    'thumb': 160,
+    'medium': 480,
+}
+PHOTO_VARIANTS = ('thumb', 'medium', 'full')
+VARIANT_JPEG_QUALITY = 80
+
+# Ingest normalization settings
+PHOTO_MAX_DIMENSION = int(os.getenv("PHOTO_MAX_DIMENSION", 1024))
+PHOTO_JPEG_QUALITY = int(os.getenv("PHOTO_JPEG_QUALITY", 80))
+
+
+def encode_jpeg(img, quality):
+    """Encode a PIL image as JPEG without any metadata"""
+    out = BytesIO()
+    img.save(out, format='JPEG', quality=quality, optimize=True)
+    return out.getvalue()
+
+
+def normalize_photo(image_bytes, max_dimension=PHOTO_MAX_DIMENSION, quality=PHOTO_JPEG_QUALITY):
+    """Return JPEG bytes bounded to max_dimension, re-encoded at quality, EXIF stripped"""
+    with Image.open(BytesIO(image_bytes)) as img:
+        # Apply the EXIF orientation before the metadata is dropped
+        img = ImageOps.exif_transpose(img).convert('RGB')
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        return encode_jpeg(img, quality)
+
+
+def make_photo_variants(image_bytes):
+    """Return {'thumb': bytes, 'medium': bytes} JPEG variants of a photo"""
+    variants = {}
+    with Image.open(BytesIO(image_bytes)) as img:
+        img = img.convert('RGB')
+        for name, edge in PHOTO_SIZES.items():
+            resized = img.copy()
+            resized.thumbnail((edge, edge), Image.LANCZOS)
+            variants[name] = encode_jpeg(resized, VARIANT_JPEG_QUALITY)
+    return variants
+
+
+def process_photo(image_bytes):
+    """Full ingest pipeline: normalized original plus variants
+
+    Returns {'full': bytes, 'thumb': bytes, 'medium': bytes, 'original_size': int}.
+    All photos are stored as image/jpeg.
+    """
+    full = normalize_photo(image_bytes)
+    processed = make_photo_variants(full)
+    processed['full'] = full
+    processed['original_size'] = len(image_bytes)
+    return processed
@@ -0,0 +1,259 @@
+"""
+Query layer for app.py
+Each route selects a named column set instead of SELECT *, so only the photo
+routes ever read photo BLOB columns.
+"""
+
+from db_config import get_db_connection, reading_from_replica
+
+
+def columns(column_set, table=None):
+    """Render a column set for a SELECT list, qualified by a table alias if given"""
+    if table:
+        return ", ".join(f"{table}.{column}" for column in column_set)
+    return ", ".join(column_set)
+
+
+def iter_query(query, params=None, batch_size=1000):
+    """Yield rows one at a time from an unbuffered (server-side) cursor
+
+    Rows are pulled from MySQL in batches of batch_size, so memory use does not
+    grow with the size of the result set. The connection is held until the
+    generator is exhausted or closed.
+
+    Inside db_config.read_only() the rows come from the replica. That is decided
+    here, at call time, because a streamed response reads them after the route
+    has returned.
+    """
+    return _iter_rows(query, params, batch_size, reading_from_replica())
+
+
+def _iter_rows(query, params, batch_size, replica):
+    connection = get_db_connection(replica)
+    if not connection:
+        raise RuntimeError("No database connection available")
+
+    cursor = connection.cursor(dictionary=True, buffered=False)
+    try:
+        cursor.execute(query, params or ())
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            # Abandoned mid-stream (client disconnected); drop unread rows with the connection
+            pass
+        connection.close()
+
+
+# --- Column sets ---
+
+# Dashboards and on-screen tables
+VISITOR_LIST_COLUMNS = (
+    'id', 'date', 'in_time', 'out_time', 'mobile', 'name', 'designation', 'company',
+    'laptop', 'to_meet', 'department', 'entered_by', 'vehicle_number', 'pass_number'
+)
+
+# CSV report / filtered data (same fields as the report columns)
+VISITOR_EXPORT_COLUMNS = (
+    'id', 'date', 'in_time', 'mobile', 'name', 'designation', 'company', 'laptop',
+    'to_meet', 'department', 'out_time', 'entered_by', 'vehicle_number', 'pass_number'
+)
+
+# Autofill and exit lookups by mobile
+VISITOR_LOOKUP_COLUMNS = (
+    'id', 'name', 'designation', 'company', 'laptop', 'to_meet', 'department',
+    'vehicle_number', 'out_time'
+)
+
+# Legacy inline photo columns - only the photo routes may select these
+VISITOR_PHOTO_COLUMNS = ('photo_data', 'photo_mime_type')
+
+BOOKING_LIST_COLUMNS = (
+    'id', 'booking_time', 'host_name', 'host_department', 'visitor_mobile',
+    'visitor_name', 'purpose', 'status', 'company', 'vehicle_number'
+)
+
+
+# --- Visitors ---
+
+# id follows insertion order like created_at, and reads the primary key backwards
+RECENT_VISITORS = f"""
+    SELECT {columns(VISITOR_LIST_COLUMNS)} FROM visitors
+    ORDER BY id DESC LIMIT 20
+"""
+
+# Served by idx_out_time_in_time without a filesort
+ACTIVE_VISITORS = f"""
+    SELECT {columns(VISITOR_LIST_COLUMNS)} FROM visitors
+    WHERE out_time IS NULL
+    ORDER BY in_time DESC
+"""
+
+VISITORS_IN_RANGE = f"""
+    SELECT {columns(VISITOR_EXPORT_COLUMNS)} FROM visitors
+    WHERE date >= %s AND date <= %s
+    ORDER BY date DESC, in_time DESC, id DESC
+"""
+
+# Keyset pagination over (date, in_time, id), served by idx_date_in_time_id.
+# Params: from, to, limit
+VISITORS_IN_RANGE_FIRST_PAGE = f"""
+    SELECT {columns(VISITOR_EXPORT_COLUMNS)} FROM visitors
+    WHERE date >= %s AND date <= %s
+    ORDER BY date DESC, in_time DESC, id DESC
+    LIMIT %s
+"""
+
+# Params: from, to, date, date, in_time, in_time, id, limit (the cursor is the last row sent)
+VISITORS_IN_RANGE_NEXT_PAGE = f"""
+    SELECT {columns(VISITOR_EXPORT_COLUMNS)} FROM visitors
+    WHERE date >= %s AND date <= %s
+      AND (date < %s OR (date = %s AND (in_time < %s OR (in_time = %s AND id < %s))))
+    ORDER BY date DESC, in_time DESC, id DESC
+    LIMIT %s
+"""
+
+COUNT_VISITORS_IN_RANGE = """
+    SELECT COUNT(*) AS total FROM visitors
+    WHERE date >= %s AND date <= %s
+"""
+
+# idx_mobile_created_at: one index dive, no filesort
+LAST_VISIT_BY_MOBILE = f"""
+    SELECT {columns(VISITOR_LOOKUP_COLUMNS)} FROM visitors
+    WHERE mobile = %s
+    ORDER BY created_at DESC LIMIT 1
+"""
+
+ACTIVE_VISIT_BY_MOBILE = f"""
+    SELECT {columns(VISITOR_LOOKUP_COLUMNS)} FROM visitors
+    WHERE mobile = %s AND out_time IS NULL
+    ORDER BY created_at DESC LIMIT 1
+"""
+
+LEGACY_PHOTO = f"""
+    SELECT {columns(VISITOR_PHOTO_COLUMNS)} FROM visitors
+    WHERE id = %s AND photo_data IS NOT NULL
+"""
+
+# --- Bookings ---
+
+PENDING_BOOKINGS = f"""
+    SELECT {columns(BOOKING_LIST_COLUMNS)} FROM bookings
+    WHERE status = 'Pending'
+    ORDER BY booking_time DESC
+"""
+
+# Walks idx_booking_time backwards and stops after 50 matches
+PAST_BOOKINGS = f"""
+    SELECT {columns(BOOKING_LIST_COLUMNS)} FROM bookings
+    WHERE status != 'Pending'
+    ORDER BY booking_time DESC LIMIT 50
+"""
+
+PENDING_BOOKING_EXISTS = """
+    SELECT id FROM bookings
+    WHERE visitor_mobile = %s AND status = 'Pending' LIMIT 1
+"""
+
+# --- Autofill lookup ---
+
+# Pending booking and last visit for a mobile in one round trip. At most two
+# rows come back, tagged by source; the booking row wins when both exist.
+# Params: mobile, mobile
+VISITOR_LOOKUP_BY_MOBILE = """
+    (SELECT 'booking' AS source, visitor_name AS name, purpose, host_name AS booked_by,
+            host_department AS department, company, vehicle_number,
+            NULL AS designation, NULL AS laptop, host_name AS to_meet
+     FROM bookings
+     WHERE visitor_mobile = %s AND status = 'Pending'
+     ORDER BY booking_time DESC LIMIT 1)
+    UNION ALL
+    (SELECT 'visit' AS source, name, NULL AS purpose, NULL AS booked_by,
+            department, company, vehicle_number,
+            designation, laptop, to_meet
+     FROM visitors
+     WHERE mobile = %s
+     ORDER BY created_at DESC LIMIT 1)
+"""
+
+# --- Mobile prefix index (see mobile_index.py) ---
+
+# Latest visit per mobile; MAX(id) per mobile is read from idx_mobile_created_at
+# alone (InnoDB secondary indexes carry the primary key)
+MOBILE_INDEX_VISITS = """
+    SELECT v.mobile, v.name, v.company, v.in_time AS last_seen
+    FROM visitors v
+    JOIN (SELECT mobile, MAX(id) AS id FROM visitors GROUP BY mobile) latest
+      ON latest.id = v.id
+"""
+
+MOBILE_INDEX_BOOKINGS = """
+    SELECT visitor_mobile AS mobile, visitor_name AS name, company, booking_time AS last_seen
+    FROM bookings
+    WHERE status = 'Pending'
+"""
+
+# --- Admin search (FULLTEXT ft_visitor_search on visitor_search) ---
+
+# Searchable columns copied from each visit at entry; visitors is partitioned
+# and cannot carry a FULLTEXT index itself
+VISITOR_SEARCH_COLUMNS = ('name', 'company', 'designation', 'to_meet', 'department', 'vehicle_number')
+
+# Params: visitor_id, date, then VISITOR_SEARCH_COLUMNS
+INSERT_VISITOR_SEARCH = f"""
+    INSERT INTO visitor_search (visitor_id, date, {columns(VISITOR_SEARCH_COLUMNS)})
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+VISITOR_SEARCH_MATCH = f"MATCH({columns(VISITOR_SEARCH_COLUMNS, 's')}) AGAINST (%s IN BOOLEAN MODE)"
+
+# Joined on (id, date) so each match reads one partition. Params: terms, terms, limit, offset
+VISITOR_SEARCH = f"""
+    SELECT {columns(VISITOR_EXPORT_COLUMNS, 'v')}, {VISITOR_SEARCH_MATCH} AS score
+    FROM visitor_search s
+    JOIN visitors v ON v.id = s.visitor_id AND v.date = s.date
+    WHERE {VISITOR_SEARCH_MATCH}
+    ORDER BY score DESC, s.visitor_id DESC
+    LIMIT %s OFFSET %s
+"""
+
+# Params: terms, terms, from, to, limit, offset
+VISITOR_SEARCH_IN_RANGE = f"""
+    SELECT {columns(VISITOR_EXPORT_COLUMNS, 'v')}, {VISITOR_SEARCH_MATCH} AS score
+    FROM visitor_search s
+    JOIN visitors v ON v.id = s.visitor_id AND v.date = s.date
+    WHERE {VISITOR_SEARCH_MATCH} AND s.date >= %s AND s.date <= %s
+    ORDER BY score DESC, s.visitor_id DESC
+    LIMIT %s OFFSET %s
+"""
+
+COUNT_VISITOR_SEARCH = f"""
+    SELECT COUNT(*) AS total FROM visitor_search s
+    WHERE {VISITOR_SEARCH_MATCH}
+"""
+
+COUNT_VISITOR_SEARCH_IN_RANGE = f"""
+    SELECT COUNT(*) AS total FROM visitor_search s
+    WHERE {VISITOR_SEARCH_MATCH} AND s.date >= %s AND s.date <= %s
+"""
+
+# --- Vectorized analytics (see visit_analytics.py) ---
+
+# Times as wall-clock seconds since 1970-01-01 (not UTC), so hours and
+# weekdays need no timezone math. Filters on date (the entry day) so the range
+# is read from idx_date_in_time_id. Params: from, to (entry days, inclusive)
+VISIT_FRAME = """
+    SELECT id,
+           TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', in_time) AS in_s,
+           TIMESTAMPDIFF(SECOND, '1970-01-01 00:00:00', out_time) AS out_s,
+           department, to_meet
+    FROM visitors
+    WHERE date >= %s AND date < %s + INTERVAL 1 DAY
+"""
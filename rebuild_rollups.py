@@ -0,0 +1,71 @@
+"""
+Recompute visitor_rollups from the visitors table
+Run once after migration 0008 (python migrate.py) to fill in history, or for any range
+whose rollups are suspect. Each day is rebuilt in its own short transaction.
+Rebuilding today while the gate is busy can miss or double-count a visit that
+is in flight, so rebuild today's rollups off-hours.
+"""
+
+import time
+import argparse
+from datetime import date, datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db_config import execute_query
+from rollups import rebuild_day
+
+
+def parse_day(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def first_visit_day():
+    rows = execute_query("SELECT MIN(in_time) AS first FROM visitors", fetch=True)
+    if not rows or rows[0]['first'] is None:
+        return None
+    return rows[0]['first'].date()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild visitor analytics rollups")
+    parser.add_argument('--from', dest='start', type=parse_day, help="First day, YYYY-MM-DD (default: first visit)")
+    parser.add_argument('--to', dest='end', type=parse_day, help="Last day, YYYY-MM-DD (default: today)")
+    parser.add_argument('--pause', type=float, default=0.1, help="Seconds to sleep between days (default: 0.1)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📈 VISITOR ROLLUP REBUILD")
+    print("=" * 60)
+
+    start = args.start or first_visit_day()
+    end = args.end or date.today()
+    if start is None:
+        print("ℹ️  No visitors yet - nothing to rebuild")
+        return
+
+    started = time.perf_counter()
+    day, rebuilt, failed = start, 0, []
+    while day <= end:
+        if rebuild_day(day):
+            rebuilt += 1
+        else:
+            failed.append(day)
+        if day.day == 1 or day == end:
+            print(f"✅ Rebuilt up to {day}")
+        day += timedelta(days=1)
+        if args.pause:
+            time.sleep(args.pause)
+
+    print(f"\n📊 Rebuild Summary:")
+    print(f"   Range: {start} to {end}")
+    print(f"   Days rebuilt: {rebuilt}")
+    print(f"   Days failed: {len(failed)}")
+    for day in failed[:10]:
+        print(f"   ❌ {day}")
+    print(f"   Time: {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Recompress historical visitor photos with the ingest settings
+Walks photos in visitor id order, re-encodes each batch in parallel across CPU
+cores (PHOTO_MAX_DIMENSION / PHOTO_JPEG_QUALITY), and writes every batch back
+in a single transaction. Progress is checkpointed after each batch, so the job
+can be stopped at any time and resumed later. The thumb and medium variants
+are regenerated from each rewritten photo so they keep matching it.
+
+Sources:
+    store   - full-size photos in the configured photo store (default). Photos
+              normalized at ingest (original_size set) are skipped, and so are
+              photos archived before their batch is written.
+    legacy  - photos still inline in visitors.photo_data
+
+Test against a local copy first by pointing .env (or the environment) at it:
+    DB_HOST=127.0.0.1 DB_NAME=visitor_management_copy python recompact_photos.py --max-batches 5
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from db_config import execute_query, get_db_connection
+from photo_store import get_photo_store, FilesystemPhotoStore, PendingRemovals
+from photo_utils import normalize_photo, make_photo_variants
+
+# Only rewrite a photo if it shrinks by at least this fraction
+MIN_SAVING = 0.05
+
+
+def lower_priority():
+    """Process pool initializer: keep workers behind the live gate for CPU"""
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass  # Not available on Windows
+
+
+def recompress(item):
+    """Worker: return (visitor_id, new_bytes or None, variants, old_size, error)"""
+    visitor_id, data = item
+    try:
+        new_data = normalize_photo(data)
+        if len(new_data) > len(data) * (1 - MIN_SAVING):
+            return visitor_id, None, None, len(data), None
+        return visitor_id, new_data, make_photo_variants(new_data), len(data), None
+    except Exception as e:
+        return visitor_id, None, None, len(data), str(e)
+
+
+# --- Sources ---
+
+def read_store_batch(store, last_id, batch_size):
+    rows = execute_query(
+        """
+            SELECT visitor_id, sha256, mime_type FROM visitor_photos
+            WHERE variant = 'full' AND visitor_id > %s AND archived_in IS NULL
+              AND original_size IS NULL
+            ORDER BY visitor_id LIMIT %s
+        """,
+        (last_id, batch_size),
+        fetch=True
+    )
+    items, old_files = [], {}
+    for row in rows or []:
+        data, _ = store.load_bytes(row['visitor_id'], 'full')
+        if data:
+            items.append((row['visitor_id'], data))
+            old_files[(row['visitor_id'], 'full')] = (row['sha256'], row['mime_type'])
+    if items:
+        ids = [visitor_id for visitor_id, _ in items]
+        variants = execute_query(
+            f"""
+                SELECT visitor_id, variant, sha256, mime_type FROM visitor_photos
+                WHERE visitor_id IN ({', '.join(['%s'] * len(ids))}) AND variant != 'full'
+                  AND archived_in IS NULL
+            """,
+            tuple(ids),
+            fetch=True
+        )
+        for row in variants or []:
+            old_files[(row['visitor_id'], row['variant'])] = (row['sha256'], row['mime_type'])
+    last_seen = rows[-1]['visitor_id'] if rows else None
+    return items, last_seen, old_files
+
+
+def write_store_batch(store, results, old_files, removals):
+    """Write a batch; returns the visitor ids whose photo was replaced, or None"""
+    photos = []
+    for visitor_id, data, variants, old_size in results:
+        # original_size marks the photo as normalized, so later runs skip it
+        photos.append((visitor_id, 'full', data, 'image/jpeg', old_size))
+        photos.extend((visitor_id, name, variant, 'image/jpeg', None) for name, variant in variants.items())
+    written = store.replace_batch(photos)
+    if written is None:
+        return None
+    if isinstance(store, FilesystemPhotoStore):
+        # The app may still hold the old path; delete after the grace period.
+        # A photo archived meanwhile keeps its row, so its new file goes instead.
+        written_keys = set(written)
+        for visitor_id, variant, data, mime_type, _ in photos:
+            if (visitor_id, variant) in written_keys:
+                if (visitor_id, variant) in old_files:
+                    removals.add(*old_files[(visitor_id, variant)])
+            else:
+                removals.add(hashlib.sha256(data).hexdigest(), mime_type)
+        removals.remove_due()
+    return {visitor_id for visitor_id, variant in written if variant == 'full'}
+
+
+def read_legacy_batch(last_id, batch_size):
+    rows = execute_query(
+        """
+            SELECT id, photo_data FROM visitors
+            WHERE id > %s AND photo_data IS NOT NULL
+            ORDER BY id LIMIT %s
+        """,
+        (last_id, batch_size),
+        fetch=True
+    )
+    items = [(row['id'], row['photo_data']) for row in rows or []]
+    return items, rows[-1]['id'] if rows else None
+
+
+def write_legacy_batch(results):
+    """Write a batch; returns the visitor ids whose photo was replaced, or None"""
+    connection = get_db_connection()
+    if not connection:
+        return None
+    cursor = connection.cursor()
+    try:
+        # A photo moved to the store meanwhile has photo_data cleared; leave it
+        written = set()
+        for visitor_id, data, variants, _ in results:
+            cursor.execute(
+                """
+                    UPDATE visitors SET photo_data = %s, photo_thumb = %s, photo_medium = %s,
+                                        photo_mime_type = 'image/jpeg'
+                    WHERE id = %s AND photo_data IS NOT NULL
+                """,
+                (data, variants['thumb'], variants['medium'], visitor_id)
+            )
+            if cursor.rowcount:
+                written.add(visitor_id)
+        connection.commit()
+        return written
+    except Exception as e:
+        print(f"❌ Batch write error: {e}")
+        connection.rollback()
+        return None
+    finally:
+        cursor.close()
+        connection.close()
+
+
+# --- Checkpoint ---
+
+def load_checkpoint(path, source):
+    if not os.path.exists(path):
+        return {'source': source, 'last_id': 0, 'photos': 0, 'bytes_before': 0, 'bytes_after': 0}
+    with open(path, 'r', encoding='utf-8') as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('source') != source:
+        raise SystemExit(f"❌ Checkpoint {path} belongs to source '{checkpoint.get('source')}'. Use --restart.")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run(args):
+    store = get_photo_store() if args.source == 'store' else None
+    checkpoint = {'source': args.source, 'last_id': 0, 'photos': 0, 'bytes_before': 0, 'bytes_after': 0}
+    if not args.restart:
+        checkpoint = load_checkpoint(args.checkpoint, args.source)
+    if checkpoint['last_id']:
+        print(f"↩️  Resuming after visitor {checkpoint['last_id']}")
+
+    removals = PendingRemovals(store) if store else None
+    try:
+        return process_batches(args, store, checkpoint, removals)
+    finally:
+        if removals:
+            removals.flush()
+
+
+def process_batches(args, store, checkpoint, removals):
+    batches = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=lower_priority) as pool:
+        while args.max_batches is None or batches < args.max_batches:
+            started = time.perf_counter()
+            if store:
+                items, last_seen, old_files = read_store_batch(store, checkpoint['last_id'], args.batch_size)
+            else:
+                items, last_seen = read_legacy_batch(checkpoint['last_id'], args.batch_size)
+            if last_seen is None:
+                break
+
+            results, failed = [], 0
+            for visitor_id, new_data, variants, old_size, error in pool.map(recompress, items, chunksize=4):
+                if error:
+                    print(f"⚠️  Visitor {visitor_id}: {error}")
+                    failed += 1
+                elif new_data is not None:
+                    results.append((visitor_id, new_data, variants, old_size))
+
+            if results and not args.dry_run:
+                written = write_store_batch(store, results, old_files, removals) if store else write_legacy_batch(results)
+                if written is None:
+                    print(f"❌ Batch ending at visitor {last_seen} was not written; stopping (re-run to retry)")
+                    return checkpoint
+                results = [result for result in results if result[0] in written]
+            before = sum(old_size for _, _, _, old_size in results)
+            after = sum(len(data) for _, data, _, _ in results)
+
+            checkpoint['last_id'] = last_seen
+            checkpoint['photos'] += len(results)
+            checkpoint['bytes_before'] += before
+            checkpoint['bytes_after'] += after
+            if not args.dry_run:
+                save_checkpoint(args.checkpoint, checkpoint)
+
+            batches += 1
+            print(f"✅ Batch {batches}: up to visitor {last_seen} | {len(results)}/{len(items)} recompressed, "
+                  f"{failed} failed | saved {(before - after) / 1024 / 1024:.2f} MB "
+                  f"in {time.perf_counter() - started:.1f}s")
+
+            # Throttle so the live gate keeps its share of MySQL
+            if args.sleep:
+                time.sleep(args.sleep)
+
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompress historical visitor photos")
+    parser.add_argument('--source', choices=['store', 'legacy'], default='store',
+                        help="store: photo store (default), legacy: visitors.photo_data")
+    parser.add_argument('--batch-size', type=int, default=200, help="Photos per batch (default: 200)")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="Worker processes (default: CPU cores - 1)")
+    parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to pause between batches (default: 1)")
+    parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches")
+    parser.add_argument('--checkpoint', default='recompact_checkpoint.json', help="Checkpoint file")
+    parser.add_argument('--restart', action='store_true', help="Ignore the checkpoint and start from the beginning")
+    parser.add_argument('--dry-run', action='store_true', help="Report savings without writing anything")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗜️  PHOTO RECOMPACTION" + (" (dry run)" if args.dry_run else ""))
+    print("=" * 60)
+
+    checkpoint = run(args)
+    saved = checkpoint['bytes_before'] - checkpoint['bytes_after']
+
+    print(f"\n📊 Recompaction Summary:")
+    print(f"   Last visitor processed: {checkpoint['last_id']}")
+    print(f"   Photos recompressed: {checkpoint['photos']}")
+    print(f"   Before: {checkpoint['bytes_before'] / 1024 / 1024:.1f} MB")
+    print(f"   After: {checkpoint['bytes_after'] / 1024 / 1024:.1f} MB")
+    print(f"   Saved: {saved / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Daily visitor rollups for the admin analytics view
+visitor_rollups keeps one row per (day, dimension, key) with visit, exit and
+dwell-time totals. /api/entry adds a visit and exit/checkout add the dwell
+time, so analytics read a few hundred rollup rows instead of scanning visitors.
+Rows are attributed to the day and hour of entry. rebuild_rollups.py recomputes
+any date range from visitors.
+"""
+
+import time
+from db_config import execute_query, get_db_connection, backoff, DB_RETRIES
+
+# Deadlock / lock wait timeout: InnoDB rolled the work back, safe to run again
+LOCK_ERRORS = (1205, 1213)
+
+# dimension -> visitors expression giving its key (used by the rebuild)
+ROLLUP_DIMENSIONS = {
+    'total': "''",
+    'department': 'department',
+    'host': 'to_meet',
+    'hour': "LPAD(HOUR(in_time), 2, '0')",
+}
+
+
+def upsert_query(row_count):
+    """Add deltas to row_count rollup rows, creating them as needed"""
+    values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * row_count)
+    return f"""
+        INSERT INTO visitor_rollups (day, dimension, dim_key, visits, exits, dwell_seconds)
+        VALUES {values}
+        ON DUPLICATE KEY UPDATE visits = visits + VALUES(visits),
+                                exits = exits + VALUES(exits),
+                                dwell_seconds = dwell_seconds + VALUES(dwell_seconds)
+    """
+
+
+def dimension_keys(in_time, department, host):
+    return [
+        ('total', ''),
+        ('department', department or ''),
+        ('host', host or ''),
+        ('hour', f"{in_time.hour:02d}"),
+    ]
+
+
+def delta_params(in_time, department, host, visits, exits, dwell_seconds):
+    params = []
+    for dimension, key in dimension_keys(in_time, department, host):
+        params.extend((in_time.date(), dimension, key, visits, exits, dwell_seconds))
+    return tuple(params)
+
+
+def dwell_seconds(in_time, out_time):
+    return max(0, int((out_time - in_time).total_seconds()))
+
+
+# --- Live updates ---
+
+def record_entry(in_time, department, host):
+    """Count a new visit (in_time is naive IST, like values read back from MySQL)"""
+    params = delta_params(in_time, department, host, 1, 0, 0)
+    if not execute_query(upsert_query(len(params) // 6), params):
+        print("⚠️ Rollup update failed - run rebuild_rollups.py for this day")
+
+
+def set_out_time(visitor_id, out_time, only_if_inside=False):
+    """Set a visitor's out_time and adjust the rollups in the same transaction
+
+    A correction to an existing out_time only moves the dwell total. Returns
+    True only once the visitor row's update is committed. A deadlock or lock
+    wait timeout rolls the whole transaction back, so it is retried.
+    """
+    for attempt in range(DB_RETRIES + 1):
+        try:
+            return _set_out_time(visitor_id, out_time, only_if_inside)
+        except Exception as e:
+            if getattr(e, 'errno', None) not in LOCK_ERRORS or attempt == DB_RETRIES:
+                print(f"❌ Out time update error: {e}")
+                return False
+            time.sleep(backoff(attempt))
+
+
+def _set_out_time(visitor_id, out_time, only_if_inside):
+    connection = get_db_connection()
+    if not connection:
+        return False
+
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            "SELECT in_time, out_time, department, to_meet FROM visitors WHERE id = %s FOR UPDATE",
+            (visitor_id,)
+        )
+        row = cursor.fetchone()
+        if row is None or (only_if_inside and row['out_time'] is not None):
+            connection.rollback()
+            return False
+
+        cursor.execute("UPDATE visitors SET out_time = %s WHERE id = %s", (out_time, visitor_id))
+
+        # Stored without tzinfo, like the TIMESTAMP values read back from MySQL
+        dwell = dwell_seconds(row['in_time'], out_time.replace(tzinfo=None))
+        if row['out_time'] is None:
+            exits, dwell_delta = 1, dwell
+        else:
+            exits, dwell_delta = 0, dwell - dwell_seconds(row['in_time'], row['out_time'])
+
+        # The exit itself must not fail because of the rollups: undo just the
+        # rollup change. A lock error has already undone the exit too - re-raise.
+        cursor.execute("SAVEPOINT rollup_delta")
+        try:
+            params = delta_params(row['in_time'], row['department'], row['to_meet'], 0, exits, dwell_delta)
+            cursor.execute(upsert_query(len(params) // 6), params)
+        except Exception as e:
+            if getattr(e, 'errno', None) in LOCK_ERRORS:
+                raise
+            cursor.execute("ROLLBACK TO SAVEPOINT rollup_delta")
+            print(f"⚠️ Rollup update failed ({e}) - run rebuild_rollups.py for this day")
+
+        connection.commit()
+        return True
+    except Exception:
+        try:
+            connection.rollback()
+        except Exception:
+            connection.discard()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+
+# --- Rebuild ---
+
+def rebuild_day(day):
+    """Recompute every rollup row for one day from visitors, atomically"""
+    connection = get_db_connection()
+    if not connection:
+        return False
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM visitor_rollups WHERE day = %s", (day,))
+        for dimension, key_expr in ROLLUP_DIMENSIONS.items():
+            cursor.execute(
+                f"""
+                    INSERT INTO visitor_rollups (day, dimension, dim_key, visits, exits, dwell_seconds)
+                    SELECT %s, %s, {key_expr} AS dim_key, COUNT(*), COUNT(out_time),
+                           COALESCE(SUM(GREATEST(TIMESTAMPDIFF(SECOND, in_time, out_time), 0)), 0)
+                    FROM visitors
+                    WHERE date >= %s AND date < %s + INTERVAL 1 DAY
+                    GROUP BY dim_key
+                """,
+                (day, dimension, day, day)
+            )
+        connection.commit()
+        return True
+    except Exception as e:
+        print(f"❌ Rollup rebuild error for {day}: {e}")
+        connection.rollback()
+        return False
+    finally:
+        cursor.close()
+        connection.close()
+
+
+# --- Reads ---
+
+PERIOD_FORMATS = {
+    'day': '%%Y-%%m-%%d',
+    'month': '%%Y-%%m',
+}
+
+
+def traffic(start_day, end_day, granularity='day'):
+    """Visits, exits and average dwell per day or month"""
+    rows = execute_query(
+        f"""
+            SELECT DATE_FORMAT(day, '{PERIOD_FORMATS[granularity]}') AS period,
+                   SUM(visits) AS visits, SUM(exits) AS exits, SUM(dwell_seconds) AS dwell_seconds
+            FROM visitor_rollups
+            WHERE dimension = 'total' AND day >= %s AND day <= %s
+            GROUP BY period ORDER BY period
+        """,
+        (start_day, end_day),
+        fetch=True
+    )
+    return None if rows is None else [summary(row, period=row['period']) for row in rows]
+
+
+def breakdown(dimension, start_day, end_day, limit=None):
+    """Totals per key of one dimension; busiest first (hours in clock order)"""
+    order = 'dim_key' if dimension == 'hour' else 'visits DESC, dim_key'
+    query = f"""
+        SELECT dim_key, SUM(visits) AS visits, SUM(exits) AS exits, SUM(dwell_seconds) AS dwell_seconds
+        FROM visitor_rollups
+        WHERE dimension = %s AND day >= %s AND day <= %s
+        GROUP BY dim_key ORDER BY {order}
+    """
+    params = (dimension, start_day, end_day)
+    if limit:
+        query += " LIMIT %s"
+        params += (limit,)
+    rows = execute_query(query, params, fetch=True)
+    return None if rows is None else [summary(row, key=row['dim_key']) for row in rows]
+
+
+def summary(row, **fields):
+    exits = int(row['exits'] or 0)
+    fields.update({
+        'visits': int(row['visits'] or 0),
+        'exits': exits,
+        'avg_dwell_minutes': round(int(row['dwell_seconds'] or 0) / exits / 60, 1) if exits else None
+    })
+    return fields
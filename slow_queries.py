@@ -0,0 +1,182 @@
+"""
+Slow-query log with EXPLAIN capture
+Every execute_query call is reported here (see metrics.add_query_observer).
+Statements slower than SLOW_QUERY_MS are logged with redacted parameters,
+duration and row count. Each distinct statement is also EXPLAINed once, so a
+plan with a full table scan or filesort is logged the first time it runs, even
+while the table is still small enough for it to be fast. EXPLAIN runs on a
+background thread, started in each process on its first query (so forked
+workers get their own), and never delays the request.
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+MAX_PLANS = 1000
+
+
+def redact(params):
+    """Keep numbers, dates and NULLs; hide strings and bytes (mobiles, names, photos)"""
+    if params is None:
+        return None
+    redacted = []
+    for value in params:
+        if isinstance(value, (bytes, bytearray)):
+            redacted.append(f"<{len(value)} bytes>")
+        elif isinstance(value, str):
+            redacted.append(f"<str:{len(value)}>")
+        else:
+            redacted.append(value if value is None or isinstance(value, (int, float)) else str(value))
+    return redacted
+
+
+def plan_warnings(plan):
+    warnings = []
+    for step in plan:
+        table = step.get('table') or '?'
+        extra = step.get('Extra') or ''
+        if step.get('type') == 'ALL':
+            warnings.append(f"full table scan on {table} (~{step.get('rows')} rows)")
+        if 'Using filesort' in extra:
+            warnings.append(f"filesort on {table}")
+        if 'Using temporary' in extra:
+            warnings.append(f"temporary table for {table}")
+    return warnings
+
+
+class SlowQueryLog:
+    """Ring buffer of slow or badly planned statements"""
+
+    def __init__(self, connect, threshold_ms=200, capacity=200):
+        # connect() returns a pooled connection (db_config.get_db_connection)
+        self._connect = connect
+        self.threshold_ms = threshold_ms
+        self._entries = deque(maxlen=capacity)
+        self._plans = {}  # query text -> plan, for statements already EXPLAINed
+        self._pending = set()  # queued for EXPLAIN, not run yet
+        self._jobs = queue.Queue(maxsize=100)
+        self._lock = threading.Lock()
+        self.slow = 0
+        self.flagged_plans = 0
+        self.dropped = 0
+        self._worker_pid = None
+        self._start_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.after_fork)
+
+    def _start_worker(self):
+        """One EXPLAIN thread per process (threads do not survive a fork)"""
+        if self._worker_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._worker_pid != os.getpid():
+                self._worker_pid = os.getpid()
+                threading.Thread(target=self._explain_loop, name='slow-query-explain', daemon=True).start()
+
+    def after_fork(self):
+        # Jobs queued in the parent are never run here; their statements are tried again
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._jobs = queue.Queue(maxsize=self._jobs.maxsize)
+        self._pending = set()
+
+    def observe(self, query, params, elapsed, result):
+        """Query observer: called after every execute_query"""
+        self._start_worker()
+        duration_ms = elapsed * 1000
+        is_slow = duration_ms >= self.threshold_ms
+        with self._lock:
+            first_run = (query not in self._plans and query not in self._pending
+                         and len(self._plans) < MAX_PLANS)
+            if first_run:
+                self._pending.add(query)
+        if not (is_slow or first_run):
+            return
+
+        rows = len(result) if isinstance(result, list) else None
+        job = (query, params, round(duration_ms, 1), rows, is_slow)
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            self.dropped += 1
+            if first_run:
+                # Not explained yet; the next run of the statement tries again
+                with self._lock:
+                    self._pending.discard(query)
+
+    def _explain_loop(self):
+        while True:
+            query, params, duration_ms, rows, is_slow = self._jobs.get()
+            try:
+                plan = self._explain(query, params)
+            except Exception as e:
+                plan = [{'error': str(e)}]
+
+            with self._lock:
+                self._pending.discard(query)
+                first_plan = plan is not None and query not in self._plans
+                if plan is not None:
+                    self._plans[query] = plan
+            warnings = plan_warnings(plan or [])
+            if not is_slow and not (warnings and first_plan):
+                continue
+
+            self._add({
+                'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'reason': 'slow' if is_slow else 'plan',
+                'duration_ms': duration_ms,
+                'rows': rows,
+                'query': ' '.join(query.split()),
+                'params': redact(params),
+                'plan': plan if plan is not None else [{'error': 'No database connection'}],
+                'warnings': warnings
+            })
+            if is_slow:
+                print(f"🐢 Slow query ({duration_ms} ms): {' '.join(query.split())[:120]}")
+            else:
+                print(f"⚠️ Query plan: {'; '.join(warnings)} - {' '.join(query.split())[:120]}")
+
+    def _explain(self, query, params):
+        """The plan rows, or None if EXPLAIN could not run (retried on a later run)"""
+        if not query.lstrip(' \n\t(').upper().startswith(EXPLAINABLE):
+            return []
+        connection = self._connect()
+        if not connection:
+            return None
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute("EXPLAIN " + query, params or ())
+            return [{key: value for key, value in row.items() if value is not None}
+                    for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            connection.close()
+
+    def _add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            if entry['reason'] == 'slow':
+                self.slow += 1
+            else:
+                self.flagged_plans += 1
+
+    def entries(self):
+        """Logged statements, newest first"""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'threshold_ms': self.threshold_ms,
+                'entries': len(self._entries),
+                'capacity': self._entries.maxlen,
+                'slow': self.slow,
+                'flagged_plans': self.flagged_plans,
+                'statements_explained': len(self._plans),
+                'dropped': self.dropped
+            }
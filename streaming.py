@@ -0,0 +1,37 @@
+"""
+Streaming response helpers
+Used by large exports so memory stays flat no matter how many rows are sent.
+"""
+
+import csv
+import zlib
+from io import StringIO
+
+
+def csv_chunks(header, rows, to_record, chunk_rows=500):
+    """Yield CSV text in chunks of chunk_rows records; to_record maps a row to a list"""
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(to_record(row))
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    yield buffer.getvalue()
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress a stream of text chunks incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
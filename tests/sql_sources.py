@@ -0,0 +1,100 @@
+"""
+SQL statements as written in the app's modules, found by reading their source
+The query guards and the plan check use this instead of a list of their own,
+so a statement added to any of these modules is checked without being listed.
+"""
+
+import os
+import re
+import ast
+import builtins
+import itertools
+from collections import namedtuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules whose statements reach the database on behalf of a route or the gate
+SQL_MODULES = ('app.py', 'queries.py', 'rollups.py', 'pass_numbers.py', 'photo_store.py', 'photo_archive.py')
+
+SQL_START = re.compile(r'^[\s(]*(SELECT|INSERT|UPDATE|DELETE|REPLACE)\b')
+
+# module, enclosing function (None at module level), line, the literal or f-string node
+SqlLiteral = namedtuple('SqlLiteral', 'module function line node')
+Statement = namedtuple('Statement', 'id text')
+
+
+def template(node):
+    """Text of a literal, with each f-string placeholder shown as {}"""
+    if isinstance(node, ast.Constant):
+        return node.value
+    return ''.join(part.value if isinstance(part, ast.Constant) else '{}' for part in node.values)
+
+
+def sql_literals(module):
+    """Every string literal or f-string in module that starts like a SQL statement"""
+    with open(os.path.join(ROOT, module), encoding='utf-8') as f:
+        tree = ast.parse(f.read(), module)
+
+    found = []
+
+    def visit(node, function):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            function = node.name
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            return  # docstring
+        if isinstance(node, (ast.Constant, ast.JoinedStr)):
+            if isinstance(node, ast.JoinedStr) or isinstance(node.value, str):
+                if SQL_START.match(template(node)):
+                    found.append(SqlLiteral(module, function, node.lineno, node))
+            return  # the literal parts of an f-string are not statements of their own
+        for child in ast.iter_child_nodes(node):
+            visit(child, function)
+
+    visit(tree, None)
+    return found
+
+
+def local_names(node, namespace):
+    """Names an f-string uses that the module namespace does not define"""
+    names = {name.id for name in ast.walk(node) if isinstance(name, ast.Name)}
+    return sorted(name for name in names if name not in namespace and not hasattr(builtins, name))
+
+
+def render(literal, namespace, samples):
+    """(suffix, text) for each way an f-string can come out
+
+    Names local to the function that builds the statement take each of their
+    values in samples; a name with no samples raises KeyError.
+    """
+    if isinstance(literal.node, ast.Constant):
+        return [('', literal.node.value)]
+
+    names = local_names(literal.node, namespace)
+    missing = [name for name in names if name not in samples]
+    if missing:
+        raise KeyError(f"{literal.module}:{literal.line} builds SQL from {', '.join(missing)}; "
+                       f"add sample values for it")
+
+    code = compile(ast.Expression(literal.node), literal.module, 'eval')
+    rendered = []
+    for values in itertools.product(*(samples[name] for name in names)):
+        local = dict(zip(names, values))
+        suffix = ''.join(f"[{name}={value!r}]" for name, value in local.items())
+        rendered.append((suffix, eval(code, dict(namespace), local)))
+    return rendered
+
+
+def statements(namespaces, samples):
+    """Every distinct statement in SQL_MODULES, as Statement(id, text)
+
+    namespaces maps a module file to the globals its f-strings are evaluated
+    in; a module left out (app.py, which connects on import) gets none.
+    """
+    seen = {}
+    for module in SQL_MODULES:
+        namespace = namespaces.get(module, {})
+        for literal in sql_literals(module):
+            for suffix, text in render(literal, namespace, samples):
+                key = ' '.join(text.split())
+                seen.setdefault(key, Statement(f"{module}:{literal.line}{suffix}", text))
+    return list(seen.values())
@@ -0,0 +1,116 @@
+"""
+Pass number reservations: a printed pass is entered at most once
+Uses an in-memory stand-in for the connection; no MySQL server needed.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip('mysql.connector')
+
+import pass_numbers
+
+INSERT = "INSERT INTO visitors (name, pass_number) VALUES (%s, %s)"
+
+
+class FakeDatabase:
+    """visitors and pass_reservations, with commit/rollback"""
+
+    def __init__(self):
+        self.visitors = {}
+        self.reservations = {}  # pass_number -> {'reserved_at', 'visitor_id'}
+        self._undo = []
+
+    def reserve(self, pass_number, age=timedelta(0)):
+        self.reservations[pass_number] = {'reserved_at': datetime.now() - age, 'visitor_id': None}
+
+    def connection(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.db._undo.clear()
+
+    def rollback(self):
+        while self.db._undo:
+            self.db._undo.pop()()
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.lastrowid = None
+        self.rowcount = 0
+
+    def execute(self, query, params=()):
+        db = self.db
+        if query.startswith("INSERT INTO visitors"):
+            self.lastrowid = len(db.visitors) + 1
+            db.visitors[self.lastrowid] = params
+            db._undo.append(lambda visitor_id=self.lastrowid: db.visitors.pop(visitor_id))
+            self.rowcount = 1
+        elif "UPDATE pass_reservations SET visitor_id = %s" in query:
+            visitor_id, pass_number, ttl_hours = params
+            row = db.reservations.get(pass_number)
+            self.rowcount = 0
+            if (row and row['visitor_id'] is None
+                    and row['reserved_at'] >= datetime.now() - timedelta(hours=ttl_hours)):
+                row['visitor_id'] = visitor_id
+                db._undo.append(lambda: row.update(visitor_id=None))
+                self.rowcount = 1
+        else:
+            raise AssertionError(f"unexpected statement: {query}")
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(pass_numbers, 'get_db_connection', db.connection)
+    return db
+
+
+def test_reserved_number_is_consumed_with_the_insert(db):
+    db.reserve(7)
+    visitor_id = pass_numbers.insert_visitor(INSERT, ('Asha', 7), 7)
+    assert visitor_id == 1
+    assert db.reservations[7]['visitor_id'] == 1
+
+
+def test_replayed_number_is_rejected_and_writes_nothing(db):
+    db.reserve(7)
+    pass_numbers.insert_visitor(INSERT, ('Asha', 7), 7)
+    with pytest.raises(pass_numbers.PassNumberRejected):
+        pass_numbers.insert_visitor(INSERT, ('Ravi', 7), 7)
+    assert list(db.visitors) == [1]
+    assert db.reservations[7]['visitor_id'] == 1
+
+
+def test_stale_reservation_is_rejected(db):
+    db.reserve(8, age=timedelta(hours=pass_numbers.RESERVATION_TTL_HOURS + 1))
+    with pytest.raises(pass_numbers.PassNumberRejected):
+        pass_numbers.insert_visitor(INSERT, ('Asha', 8), 8)
+    assert db.visitors == {}
+
+
+def test_number_never_reserved_is_rejected(db):
+    with pytest.raises(pass_numbers.PassNumberRejected):
+        pass_numbers.insert_visitor(INSERT, ('Asha', 99), 99)
+    assert db.visitors == {}
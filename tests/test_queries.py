@@ -0,0 +1,80 @@
+"""
+Guard: only the photo queries may read the visitors photo BLOB columns
+Needs no database; run with: python -m pytest tests
+The queries.py checks import it, and so need the MySQL driver installed; the
+inline SQL in app.py is read from the source and is always checked.
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sql_sources
+
+PHOTO_CONSTANTS = {'LEGACY_PHOTO', 'VISITOR_PHOTO_COLUMNS'}
+# app.py functions serving a photo; every other route must leave the BLOBs alone
+PHOTO_FUNCTIONS = {'load_legacy_photo'}
+# photo_{size} picks a BLOB column at run time
+BLOB_COLUMNS = re.compile(r'\bphoto_(data|thumb|medium|\{\})(?!\w)')
+SELECT_STAR = re.compile(r'\bSELECT\s+(\w+\.)?\*', re.IGNORECASE)
+
+
+@pytest.fixture(scope='module')
+def queries():
+    pytest.importorskip('mysql.connector')
+    import queries
+    return queries
+
+
+def query_constants(queries):
+    """(name, text) for every column set and query in queries.py"""
+    for name, value in vars(queries).items():
+        if not name.isupper():
+            continue
+        if isinstance(value, tuple):
+            yield name, ' '.join(value)
+        elif isinstance(value, str):
+            yield name, value
+
+
+def test_found_the_queries(queries):
+    names = {name for name, _ in query_constants(queries)}
+    assert {'RECENT_VISITORS', 'VISITOR_LIST_COLUMNS', 'LEGACY_PHOTO'} <= names
+
+
+def test_only_photo_queries_read_photo_blobs(queries):
+    offenders = [name for name, text in query_constants(queries)
+                 if name not in PHOTO_CONSTANTS and BLOB_COLUMNS.search(text)]
+    assert offenders == []
+
+
+def test_no_select_star(queries):
+    offenders = [name for name, text in query_constants(queries) if SELECT_STAR.search(text)]
+    assert offenders == []
+
+
+def test_legacy_photo_reads_the_blob(queries):
+    assert 'photo_data' in queries.LEGACY_PHOTO
+
+
+def test_found_the_app_statements():
+    functions = {literal.function for literal in sql_sources.sql_literals('app.py')}
+    assert {'entry', 'load_legacy_photo'} <= functions
+
+
+def test_only_photo_routes_read_photo_blobs_in_app():
+    offenders = [f"{literal.function} (app.py:{literal.line})"
+                 for literal in sql_sources.sql_literals('app.py')
+                 if literal.function not in PHOTO_FUNCTIONS
+                 and BLOB_COLUMNS.search(sql_sources.template(literal.node))]
+    assert offenders == []
+
+
+def test_legacy_photo_variant_reads_the_blob():
+    photo_reads = [literal for literal in sql_sources.sql_literals('app.py')
+                   if BLOB_COLUMNS.search(sql_sources.template(literal.node))]
+    assert {literal.function for literal in photo_reads} == PHOTO_FUNCTIONS
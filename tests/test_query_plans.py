@@ -0,0 +1,192 @@
+"""
+Query plans of every statement the app runs, against a seeded database
+EXPLAINs each statement in sql_sources.SQL_MODULES, with parameters taken from
+the data, and fails on any full table scan or filesort. Skipped unless
+PLAN_CHECK_DB names the database; on a near-empty table MySQL prefers a full
+scan, so seed it first:
+    DB_NAME=visitor_management_loadtest python benchmarks/seed_loadtest.py
+    PLAN_CHECK_DB=visitor_management_loadtest python -m pytest tests/test_query_plans.py
+"""
+
+import os
+import re
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PLAN_CHECK_DB = os.getenv("PLAN_CHECK_DB")
+PLAN_CHECK_DAYS = int(os.getenv("PLAN_CHECK_DAYS", 30))
+
+if not PLAN_CHECK_DB:
+    pytest.skip("PLAN_CHECK_DB is not set (a seeded database)", allow_module_level=True)
+
+pytest.importorskip('mysql.connector')
+
+import queries
+import rollups
+import pass_numbers
+import photo_store
+import photo_archive
+from db_config import ConnectionPool, DB_CONFIG
+from slow_queries import plan_warnings
+import sql_sources
+
+# Values taken by names local to the functions that build statements
+LOCAL_SAMPLES = {
+    'size': ('thumb', 'medium'),                              # app.load_legacy_photo
+    'values': ('(%s, %s, %s, %s, %s, %s)',),                  # rollups.upsert_query
+    'granularity': tuple(rollups.PERIOD_FORMATS),             # rollups.traffic
+    'key_expr': tuple(rollups.ROLLUP_DIMENSIONS.values()),    # rollups.rebuild_day
+    'order': ('dim_key', 'visits DESC, dim_key'),             # rollups.breakdown
+}
+
+STATEMENTS = sql_sources.statements(
+    {'queries.py': vars(queries), 'rollups.py': vars(rollups), 'pass_numbers.py': vars(pass_numbers),
+     'photo_store.py': vars(photo_store), 'photo_archive.py': vars(photo_archive)},
+    LOCAL_SAMPLES
+)
+
+TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN|INTO|UPDATE)\s+`?(\w+)', re.IGNORECASE)
+INSERT_COLUMNS = re.compile(r'^\s*(?:INSERT|REPLACE)\s+(?:IGNORE\s+)?INTO\s+\w+\s*\(([^)]*)\)\s*'
+                            r'(?:VALUES\s*\(|SELECT\b)', re.IGNORECASE)
+COMPARED_COLUMN = re.compile(r'([\w.]+)\s*(<=|>=|!=|<>|=|<|>)\s*$')
+LOWER_BOUND = ('>=', '>')
+
+
+@pytest.fixture(scope='module')
+def cursor():
+    connection = ConnectionPool({**DB_CONFIG, 'database': PLAN_CHECK_DB}, size=1, max_overflow=0).get()
+    cursor = connection.cursor(dictionary=True)
+    yield cursor
+    cursor.close()
+    connection.close()
+
+
+@pytest.fixture(scope='module')
+def samples(cursor):
+    """A recent row of each table, by table and column, to build parameters from"""
+    rows = {}
+    for table, order in (('visitors', 'id DESC'), ('bookings', "status = 'Pending' DESC, id DESC"),
+                         ('members', 'id'), ('visitor_photos', 'visitor_id DESC'),
+                         ('pass_reservations', 'pass_number DESC')):
+        cursor.execute(f"SELECT * FROM {table} ORDER BY {order} LIMIT 1")
+        rows[table] = cursor.fetchone() or {}
+
+    visitor = rows['visitors']
+    if not visitor:
+        pytest.fail(f"No visitors in {PLAN_CHECK_DB} - seed it first (benchmarks/seed_loadtest.py)")
+
+    rows['visitor_search'] = dict(visitor, visitor_id=visitor['id'])
+    rows['visitor_rollups'] = {'day': visitor['date'].date(), 'dimension': 'total', 'dim_key': '',
+                               'visits': 1, 'exits': 0, 'dwell_seconds': 0}
+    rows['pass_reservations'] = rows['pass_reservations'] or {'pass_number': visitor['pass_number'],
+                                                              'visitor_id': visitor['id']}
+    rows['bookings'].setdefault('visitor_mobile', visitor['mobile'])
+    return rows
+
+
+def column_value(column, tables, samples):
+    """Sample value of a column, from the statement's own tables first"""
+    for table in tables + [table for table in samples if table not in tables]:
+        if column in samples.get(table, {}):
+            return samples[table][column]
+    raise LookupError(column)
+
+
+def lower_bound(value):
+    """Start of a PLAN_CHECK_DAYS range ending at value (dates and times only)"""
+    if isinstance(value, date):  # datetime too
+        return value - timedelta(days=PLAN_CHECK_DAYS)
+    return value
+
+
+def top_level_items(text):
+    """Comma-separated items of a VALUES tuple or SELECT list, up to its end"""
+    items, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            if depth == 0:
+                break
+            depth -= 1
+        elif char == ',' and depth == 0:
+            items.append(text[start:i].strip())
+            start = i + 1
+    items.append(text[start:i].strip())
+    return items
+
+
+def inserted_columns(text):
+    """Column filled by each %s of an INSERT's VALUES tuple or SELECT list, in order"""
+    insert = INSERT_COLUMNS.match(text)
+    if not insert:
+        return []
+    columns = [column.strip().strip('`') for column in insert.group(1).split(',')]
+    items = top_level_items(text[insert.end():])
+    return [column for column, item in zip(columns, items) if item == '%s']
+
+
+def sample_params(text, samples):
+    """A value for each %s, worked out from what the placeholder is compared or assigned to"""
+    tables = TABLE_PATTERN.findall(text)
+    insert_columns = inserted_columns(text)
+    visitor = samples['visitors']
+
+    params = []
+    for match in re.finditer(r'%s', text):
+        before = text[:match.start()]
+        compared = COMPARED_COLUMN.search(before)
+        if re.search(r'\bLIMIT\s*$', before, re.IGNORECASE):
+            params.append(50)
+        elif re.search(r'\bOFFSET\s*$', before, re.IGNORECASE):
+            params.append(0)
+        elif re.search(r'\bAGAINST\s*\(\s*$', before, re.IGNORECASE):
+            params.append(f"+{visitor['name'].split()[0]}*")
+        elif re.search(r'\bINTERVAL\s*$', before, re.IGNORECASE):
+            params.append(1)
+        elif compared:
+            column, operator = compared.group(1).split('.')[-1], compared.group(2)
+            value = column_value(column, tables, samples)
+            params.append(lower_bound(value) if operator in LOWER_BOUND else value)
+        elif len(params) < len(insert_columns):
+            params.append(column_value(insert_columns[len(params)], tables, samples))
+        else:
+            raise LookupError(f"placeholder {len(params) + 1}")
+    return tuple(params)
+
+
+def blocking_warnings(plan):
+    """Full scans and filesorts on real tables (not <derived>/<union> results,
+    nor the row an INSERT writes)"""
+    base_steps = [step for step in plan
+                  if not str(step.get('table') or '').startswith('<')
+                  and step.get('select_type') not in ('INSERT', 'REPLACE')]
+    return [warning for warning in plan_warnings(base_steps)
+            if warning.startswith(('full table scan', 'filesort'))]
+
+
+def format_plan(plan):
+    return '\n'.join(f"{step.get('table')} type={step.get('type')} key={step.get('key')} "
+                     f"rows={step.get('rows')} {step.get('Extra') or ''}" for step in plan)
+
+
+def test_found_the_statements():
+    ids = [statement.id.split(':')[0] for statement in STATEMENTS]
+    assert set(ids) == set(sql_sources.SQL_MODULES)
+
+
+@pytest.mark.parametrize('statement', STATEMENTS, ids=[statement.id for statement in STATEMENTS])
+def test_plan_has_no_full_scan_or_filesort(cursor, samples, statement):
+    try:
+        params = sample_params(statement.text, samples)
+    except LookupError as e:
+        pytest.fail(f"No sample value for {e} in: {' '.join(statement.text.split())}")
+
+    cursor.execute("EXPLAIN " + statement.text, params)
+    plan = cursor.fetchall()
+    warnings = blocking_warnings(plan)
+    assert not warnings, f"{'; '.join(warnings)}\n{format_plan(plan)}"
@@ -0,0 +1,162 @@
+"""
+Vectorized visit analytics: dwell-time distribution, hour-by-weekday heatmap
+and per-department overstays over any date range
+Rows streamed by queries.VISIT_FRAME are packed into NumPy arrays (times as
+wall-clock seconds since 1970-01-01, departments and hosts as integer codes),
+and every report is computed with array operations instead of per-row loops.
+"""
+
+import numpy as np
+from datetime import datetime
+
+EPOCH = datetime(1970, 1, 1)
+NOT_OUT = -1  # out_s for visitors still inside
+
+DWELL_BINS_MINUTES = [0, 15, 30, 60, 120, 240, 480]
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+class VisitFrame:
+    """Column arrays for a set of visits; departments/hosts hold the code labels"""
+
+    def __init__(self, ids, in_s, out_s, dept_codes, departments, host_codes, hosts):
+        self.ids = ids
+        self.in_s = in_s
+        self.out_s = out_s
+        self.dept_codes = dept_codes
+        self.departments = departments
+        self.host_codes = host_codes
+        self.hosts = hosts
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def pack(ids, in_s, out_s, depts, hosts):
+    """One batch of column lists -> arrays (out_s None becomes NOT_OUT)"""
+    return (
+        np.array(ids, dtype=np.int64),
+        np.array(in_s, dtype=np.int64),
+        np.nan_to_num(np.array(out_s, dtype=np.float64), nan=NOT_OUT).astype(np.int64),
+        np.array(depts, dtype=np.int32),
+        np.array(hosts, dtype=np.int32),
+    )
+
+
+def build_frame(rows, batch_size=50000):
+    """Turn an iterable of visitor rows (queries.VISIT_FRAME shape) into a VisitFrame
+
+    Rows are packed into arrays batch by batch, so the Python lists never hold
+    more than batch_size rows. Departments and hosts get codes in order of
+    first appearance.
+    """
+    dept_codes, host_codes = {}, {}
+    columns = ids, in_s, out_s, depts, hosts = [], [], [], [], []
+    chunks = []
+
+    for row in rows:
+        ids.append(row['id'])
+        in_s.append(row['in_s'])
+        out_s.append(row['out_s'])
+        depts.append(dept_codes.setdefault(row['department'] or '', len(dept_codes)))
+        hosts.append(host_codes.setdefault(row['to_meet'] or '', len(host_codes)))
+        if len(ids) >= batch_size:
+            chunks.append(pack(*columns))
+            for column in columns:
+                column.clear()
+    if ids or not chunks:
+        chunks.append(pack(*columns))
+
+    arrays = [np.concatenate(parts) for parts in zip(*chunks)]
+    return VisitFrame(arrays[0], arrays[1], arrays[2], arrays[3], list(dept_codes),
+                      arrays[4], list(host_codes))
+
+
+def wall_clock_seconds(moment):
+    """Naive wall-clock datetime -> seconds since 1970-01-01 (same scale as in_s)"""
+    return int((moment - EPOCH).total_seconds())
+
+
+# --- Reports ---
+
+def dwell_distribution(frame, bins_minutes=DWELL_BINS_MINUTES):
+    """Histogram and percentiles of dwell minutes over visits that have exited"""
+    exited = frame.out_s != NOT_OUT
+    minutes = np.maximum(frame.out_s[exited] - frame.in_s[exited], 0) / 60.0
+    edges = np.array(list(bins_minutes) + [np.inf])
+    counts, _ = np.histogram(minutes, bins=edges)
+
+    labels = [f"{lo}-{hi}" for lo, hi in zip(bins_minutes, bins_minutes[1:])] + [f"{bins_minutes[-1]}+"]
+    result = {
+        'exited': int(exited.sum()),
+        'inside': int(len(frame) - exited.sum()),
+        'histogram': [{'minutes': label, 'visits': int(c)} for label, c in zip(labels, counts)],
+    }
+    if minutes.size:
+        p50, p90, p95, p99 = np.percentile(minutes, [50, 90, 95, 99])
+        result.update({
+            'mean_minutes': round(float(minutes.mean()), 1),
+            'p50_minutes': round(float(p50), 1),
+            'p90_minutes': round(float(p90), 1),
+            'p95_minutes': round(float(p95), 1),
+            'p99_minutes': round(float(p99), 1),
+        })
+    return result
+
+
+def hour_weekday_heatmap(frame):
+    """7 x 24 visit counts: rows Monday..Sunday, columns hour of entry"""
+    days = frame.in_s // 86400
+    weekday = (days + 3) % 7  # 1970-01-01 was a Thursday
+    hour = (frame.in_s % 86400) // 3600
+    counts = np.bincount(weekday * 24 + hour, minlength=7 * 24).reshape(7, 24)
+    return {'weekdays': WEEKDAYS, 'counts': counts.tolist()}
+
+
+def department_overstays(frame, now_s, limit_minutes=None, percentile=95, top=5):
+    """Visits that stayed longer than their department's norm
+
+    The threshold is limit_minutes when given, otherwise the department's own
+    dwell percentile. Visitors still inside count with their time so far.
+    """
+    dwell = np.where(frame.out_s == NOT_OUT, now_s, frame.out_s) - frame.in_s
+    exited = frame.out_s != NOT_OUT
+
+    # Group rows by department with one sort; each group is a contiguous slice
+    order = np.argsort(frame.dept_codes, kind='stable')
+    codes = frame.dept_codes[order]
+    bounds = np.searchsorted(codes, np.arange(len(frame.departments) + 1))
+
+    report = []
+    for code, name in enumerate(frame.departments):
+        group = order[bounds[code]:bounds[code + 1]]
+        if group.size == 0:
+            continue
+        if limit_minutes is not None:
+            threshold = limit_minutes * 60
+        else:
+            finished = dwell[group][exited[group]]
+            if finished.size == 0:
+                continue
+            threshold = float(np.percentile(finished, percentile))
+
+        over = group[dwell[group] > threshold]
+        over = over[np.argsort(-dwell[over], kind='stable')]
+        report.append({
+            'department': name,
+            'visits': int(group.size),
+            'threshold_minutes': round(threshold / 60, 1),
+            'overstays': int(over.size),
+            'still_inside': int((~exited[over]).sum()),
+            'worst': [
+                {
+                    'visitor_id': int(frame.ids[i]),
+                    'to_meet': frame.hosts[frame.host_codes[i]],
+                    'minutes': round(float(dwell[i]) / 60, 1),
+                    'inside': bool(not exited[i])
+                }
+                for i in over[:top]
+            ]
+        })
+    report.sort(key=lambda item: item['overstays'], reverse=True)
+    return report